@@ -0,0 +1,333 @@
+"""
+Importação de tenants em lote.
+Lê definições de tenants em NDJSON (um tenant por linha, com os mesmos
+campos de POST /tenants) ou CSV (uma phrase por linha, com as colunas
+tenant_id, phrase, label e, opcionalmente, language e engine; as linhas de
+cada tenant devem ser contíguas). Cada tenant é validado enquanto o arquivo é
+lido, os tenants são criados em lotes, com uma única gravação por lote, e
+os modelos são treinados em paralelo em um pool de processos.
+
+O relatório tem uma entrada por tenant, produzida assim que o tenant
+termina, e um resumo no final. Em memória ficam apenas o lote em
+montagem e os treinos em andamento, qualquer que seja o tamanho do arquivo.
+
+Uso:
+    python -m app.bulk_import tenants.ndjson --report relatorio.ndjson
+    python -m app.bulk_import tenants.csv --workers 8 --no-train
+"""
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, Executor, Future, ProcessPoolExecutor, wait
+from typing import Dict, Iterable, Iterator, List, Optional, TextIO, Tuple, TYPE_CHECKING
+import argparse
+import csv
+import itertools
+import json
+import logging
+import multiprocessing
+import os
+import sys
+import time
+
+from . import config
+from .scorer import DEFAULT_ENGINE
+
+# Os gerenciadores são importados sob demanda: com o método "spawn", os
+# processos de treinamento importam este módulo (quando ele é o principal) e
+# não devem criar as instâncias globais de tenants e modelos
+if TYPE_CHECKING:
+    from .model import ModelManager
+    from .tenant_manager import TenantConfig, TenantManager
+
+logger = logging.getLogger(__name__)
+
+FORMATS = ("ndjson", "csv")
+
+# Colunas obrigatórias do formato CSV
+CSV_COLUMNS = ("tenant_id", "phrase", "label")
+
+# Tamanho a partir do qual o corpo recebido pela API vai para o disco
+SPOOL_MAX_BYTES = 1024 * 1024
+
+
+def detect_format(name: str) -> str:
+    """Formato pelo nome do arquivo ou Content-Type: csv ou, por padrão, ndjson"""
+    name = name.lower()
+    return "csv" if name.endswith(".csv") or "csv" in name else "ndjson"
+
+
+def _invalid(line: int, error: str, tenant_id: Optional[str] = None) -> dict:
+    return {"line": line, "tenant_id": tenant_id, "error": error}
+
+
+def _is_string_list(value) -> bool:
+    return isinstance(value, list) and all(isinstance(item, str) for item in value)
+
+
+def parse_ndjson(lines: Iterable[str]) -> Iterator[dict]:
+    """
+    Converte linhas NDJSON em definições de tenants
+
+    Cada definição tem line, tenant_id, language, engine, phrases e labels; linhas
+    inválidas viram um item com 'error', sem interromper a leitura.
+    """
+    for line_number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            data = json.loads(line)
+            tenant_id = data["tenant_id"]
+        except (ValueError, KeyError, TypeError) as e:
+            yield _invalid(line_number, f"Linha inválida: {str(e)}")
+            continue
+
+        language = data.get("language", "portuguese")
+        engine = data.get("engine", DEFAULT_ENGINE)
+        phrases = data.get("phrases", [])
+        labels = data.get("labels", [])
+        if not isinstance(tenant_id, str) or not tenant_id:
+            yield _invalid(line_number, "Linha inválida: 'tenant_id' deve ser uma string não vazia")
+        elif not isinstance(language, str) or not isinstance(engine, str):
+            yield _invalid(line_number, "Linha inválida: 'language' e 'engine' devem ser strings", tenant_id)
+        elif not _is_string_list(phrases) or not _is_string_list(labels):
+            yield _invalid(line_number, "Linha inválida: 'phrases' e 'labels' devem ser listas de strings", tenant_id)
+        else:
+            yield {
+                "line": line_number,
+                "tenant_id": tenant_id,
+                "language": language,
+                "engine": engine,
+                "phrases": phrases,
+                "labels": labels,
+            }
+
+
+def parse_csv(lines: Iterable[str]) -> Iterator[dict]:
+    """
+    Converte linhas CSV (uma phrase por linha) em definições de tenants
+
+    As linhas consecutivas com o mesmo tenant_id formam um tenant; apenas
+    o tenant em montagem fica em memória. O idioma e o engine são os das
+    colunas language (padrão "portuguese") e engine (padrão "tfidf") e devem
+    ser os mesmos em todas as linhas do tenant.
+    """
+    reader = csv.DictReader(lines)
+    missing = [column for column in CSV_COLUMNS if column not in (reader.fieldnames or [])]
+    if missing:
+        yield _invalid(1, f"Cabeçalho CSV sem as colunas: {', '.join(missing)}")
+        return
+
+    current: Optional[dict] = None
+    for row in reader:
+        tenant_id = row["tenant_id"]
+        if current is None or tenant_id != current["tenant_id"]:
+            if current is not None:
+                yield current
+            current = {
+                "line": reader.line_num,
+                "tenant_id": tenant_id,
+                "language": row.get("language") or "portuguese",
+                "engine": row.get("engine") or DEFAULT_ENGINE,
+                "phrases": [],
+                "labels": [],
+            }
+        if "error" in current:
+            continue
+
+        language = row.get("language") or "portuguese"
+        engine = row.get("engine") or DEFAULT_ENGINE
+        if not tenant_id:
+            current = _invalid(reader.line_num, "Linha inválida: 'tenant_id' vazio", tenant_id)
+        elif row["phrase"] is None or row["label"] is None:
+            current = _invalid(reader.line_num, "Linha inválida: colunas faltando", tenant_id)
+        elif language != current["language"]:
+            current = _invalid(
+                current["line"],
+                f"Linha {reader.line_num}: idioma '{language}' difere do idioma '{current['language']}' do tenant",
+                tenant_id
+            )
+        elif engine != current["engine"]:
+            current = _invalid(
+                current["line"],
+                f"Linha {reader.line_num}: engine '{engine}' difere do engine '{current['engine']}' do tenant",
+                tenant_id
+            )
+        else:
+            current["phrases"].append(row["phrase"])
+            current["labels"].append(row["label"])
+
+    if current is not None:
+        yield current
+
+
+def read_definitions(stream: TextIO, file_format: str) -> Iterator[dict]:
+    """Definições de tenants lidas de um arquivo texto no formato informado"""
+    if file_format not in FORMATS:
+        raise ValueError(f"Formato inválido: '{file_format}' (use {' ou '.join(FORMATS)})")
+    return parse_csv(stream) if file_format == "csv" else parse_ndjson(stream)
+
+
+def _batches(items: Iterable[dict], size: int) -> Iterator[List[dict]]:
+    iterator = iter(items)
+    while True:
+        batch = list(itertools.islice(iterator, max(1, size)))
+        if not batch:
+            return
+        yield batch
+
+
+def create_pool(workers: int = config.IMPORT_WORKERS) -> ProcessPoolExecutor:
+    """
+    Pool de processos de treinamento da importação (0 workers usa todos os núcleos)
+
+    Os processos são iniciados com "spawn" e importam apenas o módulo do
+    modelo (app.tenant_model), sem os gerenciadores globais.
+    """
+    workers = workers if workers > 0 else (os.cpu_count() or 1)
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+
+
+def import_tenants(
+    definitions: Iterable[dict],
+    batch_size: int = config.IMPORT_BATCH_SIZE,
+    workers: int = config.IMPORT_WORKERS,
+    train: bool = True,
+    tenants: Optional["TenantManager"] = None,
+    models: Optional["ModelManager"] = None,
+    pool: Optional[Executor] = None
+) -> Iterator[dict]:
+    """
+    Cria e treina os tenants das definições, produzindo o relatório por tenant
+
+    Os tenants são criados de 'batch_size' em 'batch_size'. Com 'train', os
+    modelos são treinados em um pool de 'workers' processos (0 usa todos os
+    núcleos), com no máximo dois treinos por processo em andamento; a
+    leitura das definições espera quando esse limite é atingido. Sem 'pool',
+    um pool é criado para a importação e encerrado ao final; a API passa o
+    pool compartilhado, criado na inicialização.
+
+    Args:
+        definitions: Definições de parse_ndjson ou parse_csv
+        batch_size: Número de tenants gravados por vez
+        workers: Processos de treinamento
+        train: Treina os modelos dos tenants criados
+        tenants: Gerenciador de tenants (padrão: o global)
+        models: Gerenciador de modelos (padrão: o global)
+        pool: Pool de processos de treinamento (padrão: um pool próprio de 'workers' processos)
+
+    Returns:
+        Iterador de entradas {"line", "tenant_id", "status", ...}, com status
+        "ready" (criado e treinado), "created" (criado sem treino), "failed"
+        (criado, mas o treino falhou) ou "error" (não criado), seguidas de
+        {"summary": {...}} com as contagens por status
+    """
+    if tenants is None:
+        from .tenant_manager import tenant_manager
+        tenants = tenant_manager
+    if models is None:
+        from .model import model_manager
+        models = model_manager
+    workers = workers if workers > 0 else (os.cpu_count() or 1)
+    max_in_flight = workers * 2
+    counts: Counter = Counter()
+    start = time.perf_counter()
+
+    def entry(line: int, tenant_id: Optional[str], status: str, **extra) -> dict:
+        counts[status] += 1
+        return {"line": line, "tenant_id": tenant_id, "status": status, **extra}
+
+    def collect(in_flight: Dict[Future, Tuple[int, "TenantConfig"]], return_when: str) -> Iterator[dict]:
+        done, _ = wait(list(in_flight), return_when=return_when)
+        for fit in done:
+            line, tenant = in_flight.pop(fit)
+            try:
+                models.complete_fit(tenant, fit)
+            except Exception as e:
+                yield entry(line, tenant.tenant_id, "failed", phrase_count=tenant.phrase_count, error=str(e))
+            else:
+                yield entry(line, tenant.tenant_id, "ready", phrase_count=tenant.phrase_count)
+
+    own_pool = train and pool is None
+    if own_pool:
+        pool = create_pool(workers)
+    in_flight: Dict[Future, Tuple[int, "TenantConfig"]] = {}
+    try:
+        for batch in _batches(definitions, batch_size):
+            created = iter(tenants.create_tenants([item for item in batch if "error" not in item]))
+            for item in batch:
+                if "error" in item:
+                    yield entry(item["line"], item["tenant_id"], "error", error=item["error"])
+                    continue
+
+                tenant, error = next(created)
+                if tenant is None:
+                    yield entry(item["line"], item["tenant_id"], "error", error=error)
+                elif not train or tenant.phrase_count == 0:
+                    yield entry(item["line"], tenant.tenant_id, "created", phrase_count=tenant.phrase_count)
+                else:
+                    while len(in_flight) >= max_in_flight:
+                        yield from collect(in_flight, FIRST_COMPLETED)
+                    in_flight[models.submit_fit(tenant, pool)] = (item["line"], tenant)
+
+        while in_flight:
+            yield from collect(in_flight, FIRST_COMPLETED)
+    finally:
+        # Leitura interrompida: publica (ou marca como falhos) os treinos já iniciados
+        for fit, (_, tenant) in list(in_flight.items()):
+            try:
+                models.complete_fit(tenant, fit)
+            except Exception:
+                pass
+        if own_pool:
+            pool.shutdown()
+
+    yield {"summary": {
+        "tenants": sum(counts.values()),
+        **{status: counts[status] for status in ("ready", "created", "failed", "error")},
+        "seconds": round(time.perf_counter() - start, 3),
+    }}
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Importa tenants em lote de um arquivo NDJSON ou CSV",
+        epilog="Use TENANT_DB_PATH e MODEL_STORE_DIR para que os tenants e os modelos sejam persistidos."
+    )
+    parser.add_argument("path", help="Arquivo NDJSON ou CSV ('-' para a entrada padrão)")
+    parser.add_argument("--format", choices=FORMATS, help="Formato do arquivo (padrão: pela extensão)")
+    parser.add_argument("--batch-size", type=int, default=config.IMPORT_BATCH_SIZE, help="Tenants gravados por vez")
+    parser.add_argument("--workers", type=int, default=config.IMPORT_WORKERS, help="Processos de treinamento (0: todos os núcleos)")
+    parser.add_argument("--no-train", action="store_true", help="Apenas cria os tenants, sem treinar os modelos")
+    parser.add_argument("--report", help="Arquivo do relatório NDJSON (padrão: saída padrão)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    if not config.TENANT_DB_PATH:
+        logger.warning("TENANT_DB_PATH não configurado: os tenants importados existirão apenas neste processo")
+
+    file_format = args.format or detect_format(args.path)
+    source = sys.stdin if args.path == "-" else open(args.path, encoding="utf-8", newline="")
+    report = open(args.report, "w", encoding="utf-8") if args.report else sys.stdout
+    summary = {}
+    try:
+        entries = import_tenants(
+            read_definitions(source, file_format),
+            batch_size=args.batch_size,
+            workers=args.workers,
+            train=not args.no_train
+        )
+        for item in entries:
+            report.write(json.dumps(item, ensure_ascii=False) + "\n")
+            summary = item.get("summary", summary)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if report is not sys.stdout:
+            report.close()
+
+    print(json.dumps(summary, ensure_ascii=False), file=sys.stderr)
+    if summary.get("failed") or summary.get("error"):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
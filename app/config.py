@@ -0,0 +1,107 @@
+"""
+Configurações da aplicação lidas de variáveis de ambiente.
+"""
+import os
+
+
+def _env_int(name: str, default: int) -> int:
+    """Lê uma variável de ambiente inteira, usando o valor padrão se ausente"""
+    value = os.getenv(name)
+    if value is None or value.strip() == "":
+        return default
+    return int(value)
+
+
+# Número de threads que executam retreinos em segundo plano
+TRAINING_WORKERS = _env_int("TRAINING_WORKERS", 1)
+
+# Fração de phrases alteradas incrementalmente, em relação ao total do tenant,
+# a partir da qual o modelo passa por um retreino completo
+INCREMENTAL_REFIT_RATIO = float(os.getenv("INCREMENTAL_REFIT_RATIO", "0.2"))
+
+# Número de colunas do engine "hashing" (feature hashing): cada modelo ocupa
+# classes x HASHING_FEATURES log-probabilidades em float32
+HASHING_FEATURES = _env_int("HASHING_FEATURES", 2 ** 14)
+
+# Phrases vetorizadas por vez no treino do engine "hashing"
+HASHING_CHUNK_ROWS = _env_int("HASHING_CHUNK_ROWS", 10000)
+
+# Diretório onde os modelos treinados são salvos; vazio desativa a persistência
+MODEL_STORE_DIR = os.getenv("MODEL_STORE_DIR", "")
+
+# Número máximo de modelos mantidos em memória; 0 desativa o limite
+MAX_RESIDENT_MODELS = _env_int("MAX_RESIDENT_MODELS", 0)
+
+# Memória estimada máxima, em MB, ocupada pelos modelos; 0 desativa o limite
+MODEL_MEMORY_BUDGET_MB = _env_int("MODEL_MEMORY_BUDGET_MB", 0)
+
+# Onde o treinamento roda: "thread" (no próprio processo) ou "process"
+# (em um ProcessPoolExecutor com TRAINING_WORKERS processos)
+TRAINING_EXECUTOR = os.getenv("TRAINING_EXECUTOR", "thread")
+
+# Número máximo de treinamentos aguardando na fila; 0 desativa o limite
+TRAINING_QUEUE_SIZE = _env_int("TRAINING_QUEUE_SIZE", 1000)
+
+# Diretórios de dados do NLTK onde as stopwords são procuradas (mesma
+# variável usada pelo próprio NLTK)
+NLTK_DATA_DIRS = [
+    path for path in os.getenv("NLTK_DATA", "").split(os.pathsep) if path
+] + [os.path.expanduser("~/nltk_data")]
+
+# Quando ativo, as stopwords são lidas apenas do cache local, sem downloads
+NLTK_OFFLINE = os.getenv("NLTK_OFFLINE", "0") == "1"
+
+# Treina o tenant padrão durante a inicialização, antes de aceitar requisições
+WARMUP_ON_STARTUP = os.getenv("WARMUP_ON_STARTUP", "0") == "1"
+
+# Tamanho máximo do cache de predições de cada tenant; 0 desativa o cache
+PREDICTION_CACHE_SIZE = _env_int("PREDICTION_CACHE_SIZE", 0)
+
+# Tempo de vida, em segundos, de cada predição em cache
+PREDICTION_CACHE_TTL = float(os.getenv("PREDICTION_CACHE_TTL", "300"))
+
+# Número de mensagens por micro-lote no endpoint de streaming NDJSON
+STREAM_BATCH_SIZE = _env_int("STREAM_BATCH_SIZE", 256)
+
+# Agrupa requisições concorrentes de /classify do mesmo tenant em lotes
+MICROBATCH_ENABLED = os.getenv("MICROBATCH_ENABLED", "0") == "1"
+
+# Janela máxima, em milissegundos, que uma mensagem espera pelo seu lote
+MICROBATCH_WINDOW_MS = float(os.getenv("MICROBATCH_WINDOW_MS", "2"))
+
+# Tamanho máximo de um lote; ao atingi-lo o lote é enviado imediatamente
+MICROBATCH_MAX_SIZE = _env_int("MICROBATCH_MAX_SIZE", 64)
+
+# Compartilha os modelos entre os workers do uvicorn: cada modelo é treinado
+# por um único worker e os arrays são usados via memory-map a partir de
+# MODEL_STORE_DIR (obrigatório neste modo)
+SHARED_MODELS = os.getenv("SHARED_MODELS", "0") == "1"
+
+# Banco SQLite onde os tenants e suas phrases são persistidos; vazio mantém
+# os tenants apenas em memória
+TENANT_DB_PATH = os.getenv("TENANT_DB_PATH", "")
+
+# Expõe métricas no formato do Prometheus em /metrics e mede a latência
+# de cada requisição
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+
+# Número máximo de tenants com séries próprias nas métricas; os demais são
+# agregados no rótulo "_other". 0 desativa o limite
+METRICS_MAX_TENANTS = _env_int("METRICS_MAX_TENANTS", 1000)
+
+# Mede o tempo de cada etapa das requisições e o devolve no header
+# Server-Timing
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "0") == "1"
+
+# Fração das requisições perfiladas (entre 0 e 1)
+PROFILING_SAMPLE_RATE = float(os.getenv("PROFILING_SAMPLE_RATE", "1"))
+
+# Fração das requisições perfiladas que também são registradas em log (JSON)
+PROFILING_LOG_SAMPLE_RATE = float(os.getenv("PROFILING_LOG_SAMPLE_RATE", "0"))
+
+# Número de tenants gravados por vez na importação em lote
+IMPORT_BATCH_SIZE = _env_int("IMPORT_BATCH_SIZE", 500)
+
+# Processos que treinam os modelos na importação em lote; 0 usa todos os
+# núcleos da máquina
+IMPORT_WORKERS = _env_int("IMPORT_WORKERS", 0)
@@ -1,13 +1,51 @@
-from fastapi import FastAPI, HTTPException, status
+from concurrent.futures import Executor
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Query, Request, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from starlette.requests import ClientDisconnect
 from pydantic import BaseModel, Field
-from typing import List, Optional
-from .model import model_manager
+from typing import AsyncIterator, Iterator, List, Optional, Sequence
+import io
+import json
+import tempfile
+from . import bulk_import, config, metrics, profiling
+from .batching import MicroBatcher
+from .model import model_manager, TrainingQueueFullError
 from .tenant_manager import tenant_manager
+from .tenant_storage import StaleTenantError
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Carrega os modelos já treinados do armazenamento em disco na inicialização
+    
+    Com WARMUP_ON_STARTUP, o modelo do tenant padrão também é treinado (ou
+    carregado) aqui, antes da primeira requisição, em vez de no primeiro uso.
+    O pool de processos de /tenants/import é criado aqui e compartilhado por
+    todas as importações (os processos só são iniciados no primeiro treino).
+    No desligamento, aguarda os micro-lotes de /classify em andamento e
+    encerra o pool.
+    """
+    app.state.import_pool = bulk_import.create_pool(config.IMPORT_WORKERS)
+    model_manager.warm_start(tenant_manager.list_tenants())
+    
+    if config.WARMUP_ON_STARTUP:
+        tenant = tenant_manager.get_tenant("default")
+        if tenant and tenant.phrase_count:
+            model_manager.get_or_create_model(tenant)
+    yield
+    
+    # Entrega os micro-lotes pendentes antes de encerrar
+    await micro_batcher.close()
+    app.state.import_pool.shutdown(wait=False, cancel_futures=True)
+
 
 app = FastAPI(
     title="Classify Message - Multi-Tenant",
-    description="API para classificação de mensagens com suporte multi-tenant. Cada tenant possui suas próprias phrases, labels e idioma."
+    description="API para classificação de mensagens com suporte multi-tenant. Cada tenant possui suas próprias phrases, labels e idioma.",
+    lifespan=lifespan
 )
 
 # Configuração de CORS
@@ -19,6 +57,18 @@ app.add_middleware(
     allow_headers=["*"],  # Permite todos os headers
 )
 
+# Latência por endpoint e por tenant, exposta em /metrics
+if config.METRICS_ENABLED:
+    app.add_middleware(metrics.MetricsMiddleware)
+
+# Tempo por etapa no header Server-Timing, para uma amostra das requisições
+if config.PROFILING_ENABLED:
+    app.add_middleware(
+        profiling.ProfilingMiddleware,
+        sample_rate=config.PROFILING_SAMPLE_RATE,
+        log_sample_rate=config.PROFILING_LOG_SAMPLE_RATE
+    )
+
 
 # ========== Modelos de Requisição/Resposta ==========
 
@@ -33,56 +83,205 @@ class ClassificationResponse(BaseModel):
     tenant_id: str
 
 
+class BatchClassifyRequest(BaseModel):
+    tenant_id: str = Field(default="default", description="ID do tenant usado para as mensagens de 'messages'")
+    messages: List[str] = Field(default_factory=list, description="Mensagens a serem classificadas com o tenant 'tenant_id'")
+    items: Optional[List[MessageRequest]] = Field(None, description="Lista mista de pares tenant_id/message")
+
+
+class BatchClassificationResponse(BaseModel):
+    results: List[ClassificationResponse]
+
+
 class TenantCreateRequest(BaseModel):
     tenant_id: str = Field(..., description="ID único do tenant")
     language: str = Field(default="portuguese", description="Idioma do tenant (portuguese, english, spanish, etc.)")
+    engine: str = Field(default="tfidf", description="Vetorização do modelo: tfidf (padrão) ou hashing (sem vocabulário)")
     phrases: List[str] = Field(..., description="Lista de phrases de treinamento")
     labels: List[str] = Field(..., description="Lista de labels correspondentes às phrases")
 
 
 class TenantUpdateRequest(BaseModel):
     language: Optional[str] = Field(None, description="Idioma do tenant")
+    engine: Optional[str] = Field(None, description="Vetorização do modelo: tfidf ou hashing")
     phrases: Optional[List[str]] = Field(None, description="Lista de phrases de treinamento")
     labels: Optional[List[str]] = Field(None, description="Lista de labels correspondentes às phrases")
 
 
+class PhraseItem(BaseModel):
+    phrase: str = Field(..., description="Phrase de treinamento")
+    label: str = Field(..., description="Label da phrase")
+
+
+class PhraseChangeRequest(BaseModel):
+    add: List[PhraseItem] = Field(default_factory=list, description="Pares phrase/label a adicionar")
+    remove: List[PhraseItem] = Field(default_factory=list, description="Pares phrase/label a remover (uma ocorrência cada)")
+
+
 class TenantResponse(BaseModel):
     tenant_id: str
     language: str
+    engine: str
     phrases: List[str]
     labels: List[str]
     created_at: str
     updated_at: str
+    training_status: Optional[str] = Field(None, description="Estado do treinamento do modelo (pending, training, ready, failed)")
+    training_error: Optional[str] = Field(None, description="Erro do último treinamento, se houver")
+
+
+# Campos que podem ser pedidos em GET /tenants?fields=...
+TENANT_FIELDS = (
+    "tenant_id", "language", "engine", "phrases", "labels", "phrase_count", "label_counts",
+    "created_at", "updated_at", "training_status", "training_error",
+)
+
+# Campos de TenantResponse, usados quando 'fields' não é informado
+FULL_TENANT_FIELDS = (
+    "tenant_id", "language", "engine", "phrases", "labels",
+    "created_at", "updated_at", "training_status", "training_error",
+)
+
+# Campos do modo resumido (fields=summary), que não lê as phrases
+SUMMARY_TENANT_FIELDS = (
+    "tenant_id", "language", "engine", "phrase_count", "label_counts",
+    "created_at", "updated_at", "training_status",
+)
+
+
+def tenant_fields(tenant, fields: Sequence[str]) -> dict:
+    """
+    Monta o corpo de resposta de um tenant apenas com os campos pedidos
+    
+    As phrases e labels só são lidas quando um desses campos é pedido; se o
+    tenant mudar antes da leitura, a resposta inteira passa a usar o
+    snapshot mais recente, para que cabeçalho e phrases sejam da mesma versão.
+    
+    Raises:
+        StaleTenantError: se o tenant foi removido antes da leitura das phrases
+    """
+    result = {}
+    while "phrases" in fields or "labels" in fields:
+        try:
+            phrases, labels = tenant.training_data()
+            break
+        except StaleTenantError:
+            latest = tenant_manager.get_tenant(tenant.tenant_id)
+            if latest is None:
+                raise
+            tenant = latest
+    if "training_status" in fields or "training_error" in fields:
+        state = model_manager.get_training_state(tenant.tenant_id)
+    
+    for name in fields:
+        if name == "phrases":
+            result[name] = phrases
+        elif name == "labels":
+            result[name] = labels
+        elif name in ("created_at", "updated_at"):
+            result[name] = getattr(tenant, name).isoformat()
+        elif name == "label_counts":
+            result[name] = dict(tenant.label_counts)
+        elif name == "training_status":
+            result[name] = state.status if state else None
+        elif name == "training_error":
+            result[name] = state.error if state else None
+        else:
+            result[name] = getattr(tenant, name)
+    return result
+
+
+def tenant_to_response(tenant) -> dict:
+    """Converte a configuração de um tenant no corpo de resposta da API"""
+    return tenant_fields(tenant, FULL_TENANT_FIELDS)
+
+
+def parse_tenant_fields(fields: Optional[str]) -> Sequence[str]:
+    """Interpreta o parâmetro 'fields': vazio/full, summary ou lista separada por vírgulas"""
+    if fields is None or fields == "full":
+        return FULL_TENANT_FIELDS
+    if fields == "summary":
+        return SUMMARY_TENANT_FIELDS
+    
+    names = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = [name for name in names if name not in TENANT_FIELDS]
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Campos desconhecidos: {', '.join(unknown)}. Campos válidos: {', '.join(TENANT_FIELDS)}"
+        )
+    # O tenant_id sempre vem primeiro, pois é o cursor da paginação
+    return ["tenant_id"] + [name for name in dict.fromkeys(names) if name != "tenant_id"]
+
+
+def stream_tenants(tenants: list, fields: Sequence[str]) -> Iterator[bytes]:
+    """Serializa os tenants como um array JSON, um tenant por vez"""
+    yield b"["
+    first = True
+    for tenant in tenants:
+        try:
+            body = json.dumps(tenant_fields(tenant, fields), ensure_ascii=False).encode("utf-8")
+        except StaleTenantError:
+            # Removido durante a listagem
+            continue
+        yield body if first else b"," + body
+        first = False
+    yield b"]"
 
 
 # ========== Endpoints de Classificação ==========
 
+def set_request_tenant(tenant_id: str):
+    """Associa a requisição em andamento a um tenant nas métricas e no perfil"""
+    metrics.set_request_tenant(tenant_id)
+    profiling.set_request_tenant(tenant_id)
+
+
+def classify_tenant_batch(tenant, messages: List[str]):
+    """Classifica um lote de mensagens de um tenant (usado pelo micro-batching)"""
+    return model_manager.classify_batch(tenant, messages)
+
+
+micro_batcher = MicroBatcher(
+    classify_tenant_batch,
+    window_ms=config.MICROBATCH_WINDOW_MS,
+    max_batch_size=config.MICROBATCH_MAX_SIZE
+)
+
+
 @app.post("/classify", response_model=ClassificationResponse)
-def classify(data: MessageRequest):
+async def classify(data: MessageRequest):
     """
     Classifica uma mensagem usando o modelo do tenant especificado.
+    
+    Com MICROBATCH_ENABLED, requisições concorrentes do mesmo tenant são
+    agrupadas e pontuadas em lote.
     """
-    tenant = tenant_manager.get_tenant(data.tenant_id)
+    with profiling.stage("tenant"):
+        tenant = tenant_manager.get_tenant(data.tenant_id)
     if not tenant:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Tenant '{data.tenant_id}' não encontrado"
         )
     
-    if not tenant.phrases or not tenant.labels:
+    if tenant.phrase_count == 0:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Tenant '{data.tenant_id}' não possui phrases e labels configuradas"
         )
     
+    set_request_tenant(tenant.tenant_id)
     try:
-        classification, probability = model_manager.classify_message(
-            tenant_id=tenant.tenant_id,
-            language=tenant.language,
-            phrases=tenant.phrases,
-            labels=tenant.labels,
-            message=data.message
-        )
+        if config.MICROBATCH_ENABLED:
+            with profiling.stage("microbatch"):
+                classification, probability = await micro_batcher.submit(
+                    (tenant.tenant_id, tenant.version), tenant, data.message
+                )
+        else:
+            classification, probability = await run_in_threadpool(
+                model_manager.classify_message, tenant, data.message
+            )
         
         return {
             "classification": classification,
@@ -96,63 +295,301 @@ def classify(data: MessageRequest):
         )
 
 
+@app.post("/classify/batch", response_model=BatchClassificationResponse)
+def classify_batch(data: BatchClassifyRequest):
+    """
+    Classifica várias mensagens em uma única requisição.
+    
+    As mensagens são agrupadas por tenant e cada grupo é pontuado com uma única
+    vetorização. Os resultados seguem a ordem de 'messages' seguida de 'items'.
+    """
+    pairs = [(data.tenant_id, message) for message in data.messages]
+    pairs.extend((item.tenant_id, item.message) for item in data.items or [])
+    
+    # Agrupa os índices das mensagens por tenant
+    groups = {}
+    for index, (tenant_id, _) in enumerate(pairs):
+        groups.setdefault(tenant_id, []).append(index)
+    
+    tenants = {}
+    for tenant_id in groups:
+        with profiling.stage("tenant"):
+            tenant = tenant_manager.get_tenant(tenant_id)
+        if not tenant:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Tenant '{tenant_id}' não encontrado"
+            )
+        if tenant.phrase_count == 0:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Tenant '{tenant_id}' não possui phrases e labels configuradas"
+            )
+        tenants[tenant_id] = tenant
+    
+    # A latência por tenant só é atribuível quando o lote tem um único tenant
+    if len(tenants) == 1:
+        set_request_tenant(next(iter(tenants)))
+    
+    results = [None] * len(pairs)
+    try:
+        for tenant_id, indexes in groups.items():
+            tenant = tenants[tenant_id]
+            predictions = model_manager.classify_batch(
+                tenant,
+                [pairs[index][1] for index in indexes]
+            )
+            for index, (classification, probability) in zip(indexes, predictions):
+                results[index] = {
+                    "classification": classification,
+                    "probability": round(probability, 2),
+                    "tenant_id": tenant.tenant_id,
+                }
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Erro ao classificar mensagens: {str(e)}"
+        )
+    
+    return {"results": results}
+
+
+def classify_stream_batch(items: List[dict]) -> List[dict]:
+    """
+    Classifica um micro-lote do streaming NDJSON, agrupando as mensagens por tenant
+    
+    Erros (tenant inexistente, sem phrases ou falha de classificação) são
+    devolvidos por linha em vez de interromper o streaming.
+    """
+    results = [None] * len(items)
+    groups = {}
+    for index, item in enumerate(items):
+        if "error" in item:
+            results[index] = item
+        else:
+            groups.setdefault(item["tenant_id"], []).append(index)
+    
+    for tenant_id, indexes in groups.items():
+        tenant = tenant_manager.get_tenant(tenant_id)
+        if not tenant:
+            error = f"Tenant '{tenant_id}' não encontrado"
+        elif tenant.phrase_count == 0:
+            error = f"Tenant '{tenant_id}' não possui phrases e labels configuradas"
+        else:
+            error = None
+            try:
+                predictions = model_manager.classify_batch(
+                    tenant,
+                    [items[index]["message"] for index in indexes]
+                )
+            except Exception as e:
+                error = f"Erro ao classificar mensagens: {str(e)}"
+        
+        for position, index in enumerate(indexes):
+            if error is not None:
+                results[index] = {"line": items[index]["line"], "tenant_id": tenant_id, "error": error}
+            else:
+                classification, probability = predictions[position]
+                results[index] = {
+                    "classification": str(classification),
+                    "probability": round(probability, 2),
+                    "tenant_id": tenant_id,
+                }
+    
+    return results
+
+
+def parse_stream_line(line: bytes, line_number: int) -> dict:
+    """Converte uma linha NDJSON de entrada em item a classificar ou em erro"""
+    try:
+        data = json.loads(line)
+        message = data["message"]
+        tenant_id = data.get("tenant_id", "default")
+        if not isinstance(message, str) or not isinstance(tenant_id, str):
+            raise TypeError("'message' e 'tenant_id' devem ser strings")
+    except (ValueError, KeyError, TypeError, AttributeError) as e:
+        return {"line": line_number, "error": f"Linha inválida: {str(e)}"}
+    return {"line": line_number, "tenant_id": tenant_id, "message": message}
+
+
+async def stream_classifications(request: Request) -> AsyncIterator[bytes]:
+    """
+    Lê o corpo NDJSON em partes, classifica em micro-lotes e produz NDJSON
+    
+    Se o cliente desconectar no meio do envio, o fluxo termina sem erro.
+    """
+    buffer = b""
+    batch: List[dict] = []
+    line_number = 0
+    
+    async def flush():
+        results = await run_in_threadpool(classify_stream_batch, batch)
+        return b"".join(json.dumps(result, ensure_ascii=False).encode("utf-8") + b"\n" for result in results)
+    
+    try:
+        async for chunk in request.stream():
+            buffer += chunk
+            *lines, buffer = buffer.split(b"\n")
+            for line in lines:
+                line_number += 1
+                if line.strip():
+                    batch.append(parse_stream_line(line, line_number))
+                if len(batch) >= config.STREAM_BATCH_SIZE:
+                    yield await flush()
+                    batch = []
+    except ClientDisconnect:
+        # O cliente abortou o envio: não há para quem responder o restante
+        return
+    
+    if buffer.strip():
+        line_number += 1
+        batch.append(parse_stream_line(buffer, line_number))
+    if batch:
+        yield await flush()
+
+
+class DuplexStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse que lê o corpo da requisição enquanto envia a resposta
+    
+    O StreamingResponse padrão consome o canal 'receive' em paralelo para
+    detectar desconexões, o que rouba as partes do corpo que o gerador
+    precisa ler. Aqui a desconexão é detectada pela própria leitura do corpo
+    (o gerador termina) ou pela falha ao enviar; em ambos os casos a
+    resposta termina sem erro.
+    """
+    
+    async def __call__(self, scope, receive, send):
+        try:
+            await self.stream_response(send)
+        except (OSError, ClientDisconnect):
+            return
+        
+        if self.background is not None:
+            await self.background()
+
+
+@app.post("/classify/stream")
+async def classify_stream(request: Request):
+    """
+    Classifica um fluxo NDJSON de mensagens ({"message": ..., "tenant_id": ...} por linha).
+    
+    O corpo é lido em partes e classificado em micro-lotes; os resultados são
+    devolvidos em NDJSON, na mesma ordem, à medida que cada lote termina.
+    """
+    return DuplexStreamingResponse(stream_classifications(request), media_type="application/x-ndjson")
+
+
 # ========== Endpoints de Gerenciamento de Tenants ==========
 
 @app.post("/tenants", response_model=TenantResponse, status_code=status.HTTP_201_CREATED)
 def create_tenant(data: TenantCreateRequest):
     """
-    Cria um novo tenant com suas phrases, labels e idioma.
+    Cria um novo tenant com suas phrases, labels, idioma e engine.
     """
     try:
         tenant = tenant_manager.create_tenant(
             tenant_id=data.tenant_id,
             language=data.language,
             phrases=data.phrases,
-            labels=data.labels
+            labels=data.labels,
+            engine=data.engine
         )
         
-        # Treina o modelo para o novo tenant
-        model_manager.get_or_create_model(
-            tenant_id=tenant.tenant_id,
-            language=tenant.language,
-            phrases=tenant.phrases,
-            labels=tenant.labels
-        )
+        # Agenda o treinamento do modelo para o novo tenant
+        model_manager.schedule_training(tenant)
         
-        return {
-            "tenant_id": tenant.tenant_id,
-            "language": tenant.language,
-            "phrases": tenant.phrases,
-            "labels": tenant.labels,
-            "created_at": tenant.created_at.isoformat(),
-            "updated_at": tenant.updated_at.isoformat()
-        }
+        return tenant_to_response(tenant)
     except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=str(e)
         )
+    except TrainingQueueFullError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"Tenant salvo, mas o treinamento não foi agendado: {str(e)}"
+        )
+
+
+def import_report(
+    body: tempfile.SpooledTemporaryFile,
+    file_format: str,
+    train: bool,
+    pool: Optional[Executor]
+) -> Iterator[bytes]:
+    """Importa os tenants do corpo já recebido e produz o relatório em NDJSON"""
+    with io.TextIOWrapper(body, encoding="utf-8", newline="") as stream:
+        entries = bulk_import.import_tenants(
+            bulk_import.read_definitions(stream, file_format), train=train, pool=pool
+        )
+        for entry in entries:
+            yield json.dumps(entry, ensure_ascii=False).encode("utf-8") + b"\n"
+
+
+@app.post("/tenants/import")
+async def import_tenants(
+    request: Request,
+    format: Optional[str] = Query(None, description="Formato do corpo: ndjson ou csv (padrão: pelo Content-Type)"),
+    train: bool = Query(True, description="Treina os modelos dos tenants criados")
+):
+    """
+    Cria tenants em lote a partir de um corpo NDJSON (um tenant por linha) ou CSV (uma phrase por linha).
+    
+    O corpo é recebido em um arquivo temporário (em memória até 1 MB). Os
+    tenants são criados em lotes de IMPORT_BATCH_SIZE e treinados em
+    paralelo no pool de IMPORT_WORKERS processos da aplicação. O relatório é devolvido em NDJSON,
+    uma linha por tenant à medida que cada um termina, seguida do resumo.
+    """
+    file_format = format or bulk_import.detect_format(request.headers.get("content-type", ""))
+    if file_format not in bulk_import.FORMATS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Formato inválido: '{file_format}' (use ndjson ou csv)"
+        )
+    
+    body = tempfile.SpooledTemporaryFile(max_size=bulk_import.SPOOL_MAX_BYTES)
+    try:
+        async for chunk in request.stream():
+            body.write(chunk)
+    except BaseException:
+        body.close()
+        raise
+    body.seek(0)
+    return StreamingResponse(
+        # Sem o lifespan (ex.: TestClient fora de um bloco with), a importação cria o seu próprio pool
+        import_report(body, file_format, train, getattr(request.app.state, "import_pool", None)),
+        media_type="application/x-ndjson"
+    )
 
 
-@app.get("/tenants", response_model=List[TenantResponse])
-def list_tenants():
+@app.get("/tenants", responses={200: {"model": List[TenantResponse]}})
+def list_tenants(
+    cursor: Optional[str] = Query(None, description="Retorna os tenants com ID maior que este (valor de X-Next-Cursor)"),
+    limit: Optional[int] = Query(None, ge=1, description="Número máximo de tenants por página; ausente retorna todos"),
+    fields: Optional[str] = Query(None, description="full (padrão), summary ou lista de campos separados por vírgula")
+):
     """
-    Lista todos os tenants cadastrados com seus dados completos.
+    Lista os tenants cadastrados, em ordem de tenant_id.
+    
+    A resposta é um array JSON serializado um tenant por vez. Quando há mais
+    tenants além da página, o cabeçalho X-Next-Cursor traz o cursor da
+    próxima página. Com fields=summary, cada tenant traz apenas idioma,
+    engine, contagens de phrases por label e datas, sem ler as phrases.
     """
-    tenant_configs = tenant_manager.list_tenants()
-    tenants = []
+    selected_fields = parse_tenant_fields(fields)
     
-    for tenant in tenant_configs:
-        tenants.append({
-            "tenant_id": tenant.tenant_id,
-            "language": tenant.language,
-            "phrases": tenant.phrases,
-            "labels": tenant.labels,
-            "created_at": tenant.created_at.isoformat(),
-            "updated_at": tenant.updated_at.isoformat()
-        })
+    tenants = tenant_manager.list_tenants(after=cursor, limit=limit + 1 if limit is not None else None)
+    headers = {}
+    if limit is not None and len(tenants) > limit:
+        tenants = tenants[:limit]
+        headers["X-Next-Cursor"] = tenants[-1].tenant_id
     
-    return tenants
+    return StreamingResponse(
+        stream_tenants(tenants, selected_fields),
+        media_type="application/json",
+        headers=headers
+    )
 
 
 @app.get("/tenants/{tenant_id}", response_model=TenantResponse)
@@ -167,14 +604,7 @@ def get_tenant(tenant_id: str):
             detail=f"Tenant '{tenant_id}' não encontrado"
         )
     
-    return {
-        "tenant_id": tenant.tenant_id,
-        "language": tenant.language,
-        "phrases": tenant.phrases,
-        "labels": tenant.labels,
-        "created_at": tenant.created_at.isoformat(),
-        "updated_at": tenant.updated_at.isoformat()
-    }
+    return tenant_to_response(tenant)
 
 
 @app.put("/tenants/{tenant_id}", response_model=TenantResponse)
@@ -187,31 +617,55 @@ def update_tenant(tenant_id: str, data: TenantUpdateRequest):
             tenant_id=tenant_id,
             language=data.language,
             phrases=data.phrases,
-            labels=data.labels
+            labels=data.labels,
+            engine=data.engine
         )
         
-        # Retreina o modelo se necessário
-        if data.phrases is not None or data.labels is not None or data.language is not None:
-            model_manager.get_or_create_model(
-                tenant_id=tenant.tenant_id,
-                language=tenant.language,
-                phrases=tenant.phrases,
-                labels=tenant.labels
-            )
+        # Agenda o retreino do modelo se necessário
+        if any(value is not None for value in (data.phrases, data.labels, data.language, data.engine)):
+            model_manager.schedule_training(tenant)
         
-        return {
-            "tenant_id": tenant.tenant_id,
-            "language": tenant.language,
-            "phrases": tenant.phrases,
-            "labels": tenant.labels,
-            "created_at": tenant.created_at.isoformat(),
-            "updated_at": tenant.updated_at.isoformat()
-        }
+        return tenant_to_response(tenant)
     except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=str(e)
         )
+    except TrainingQueueFullError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"Tenant salvo, mas o treinamento não foi agendado: {str(e)}"
+        )
+
+
+@app.patch("/tenants/{tenant_id}/phrases", response_model=TenantResponse)
+def change_tenant_phrases(tenant_id: str, data: PhraseChangeRequest):
+    """
+    Adiciona e/ou remove phrases de um tenant.
+    
+    O modelo é atualizado de forma incremental, ajustando apenas as contagens
+    das phrases alteradas em vez de retreinar todo o corpus.
+    """
+    try:
+        tenant = tenant_manager.modify_phrases(
+            tenant_id=tenant_id,
+            add=[(item.phrase, item.label) for item in data.add],
+            remove=[(item.phrase, item.label) for item in data.remove]
+        )
+        
+        model_manager.schedule_training(tenant)
+        
+        return tenant_to_response(tenant)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except TrainingQueueFullError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"Tenant salvo, mas o treinamento não foi agendado: {str(e)}"
+        )
 
 
 @app.delete("/tenants/{tenant_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -246,5 +700,72 @@ def health_check():
     """
     return {
         "status": "healthy",
-        "tenants_count": len(tenant_manager.list_tenants())
+        "tenants_count": tenant_manager.count_tenants(),
+        "models": model_manager.stats(),
+        "microbatching": micro_batcher.stats() if config.MICROBATCH_ENABLED else None
     }
+
+
+# ========== Endpoint de Métricas ==========
+
+metrics.registry.gauge(
+    "classify_tenants", "Número de tenants cadastrados",
+    tenant_manager.count_tenants
+)
+metrics.registry.gauge(
+    "classify_resident_models", "Modelos carregados em memória",
+    lambda: model_manager.stats()["resident_models"]
+)
+metrics.registry.gauge(
+    "classify_model_memory_bytes", "Memória estimada ocupada pelos modelos residentes",
+    lambda: model_manager.stats()["estimated_memory_bytes"]
+)
+metrics.registry.gauge(
+    "classify_model_evictions_total", "Modelos descartados da memória pela política LRU",
+    lambda: model_manager.evictions, kind="counter"
+)
+metrics.registry.gauge(
+    "classify_model_reloads_total", "Modelos reconstruídos após terem sido descartados",
+    lambda: model_manager.reloads, kind="counter"
+)
+metrics.registry.gauge(
+    "classify_training_queue_jobs", "Treinos na fila que ainda não começaram",
+    model_manager.queued_jobs
+)
+metrics.registry.gauge(
+    "classify_prediction_cache_hits_total", "Predições servidas pelo cache",
+    lambda: model_manager.stats()["cache_hits"], kind="counter"
+)
+metrics.registry.gauge(
+    "classify_prediction_cache_misses_total", "Predições calculadas por falta no cache",
+    lambda: model_manager.stats()["cache_misses"], kind="counter"
+)
+metrics.registry.gauge(
+    "process_resident_memory_bytes", "Memória residente (RSS) do processo",
+    metrics.resident_memory_bytes
+)
+if config.MICROBATCH_ENABLED:
+    metrics.registry.attach_histogram(
+        "classify_microbatch_size", "Número de mensagens por micro-lote",
+        micro_batcher.batch_sizes
+    )
+    metrics.registry.attach_histogram(
+        "classify_microbatch_queue_wait_milliseconds", "Espera de cada mensagem pelo seu micro-lote",
+        micro_batcher.queue_wait_ms
+    )
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    """
+    Métricas no formato de texto do Prometheus (desativado com METRICS_ENABLED=0).
+    """
+    if not config.METRICS_ENABLED:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Métricas desativadas (METRICS_ENABLED=0)"
+        )
+    return PlainTextResponse(
+        metrics.registry.render(),
+        media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
@@ -0,0 +1,357 @@
+"""
+Métricas da aplicação no formato de texto do Prometheus.
+Histogramas e contadores são atualizados no caminho das requisições com
+custo constante (uma busca em dicionário, uma bisseção e um lock curto);
+os valores derivados do estado atual (modelos residentes, memória,
+tenants) são lidos apenas quando /metrics é consultado.
+"""
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+import bisect
+import os
+import threading
+import time
+
+from . import config
+
+# Rótulo usado para os tenants além de METRICS_MAX_TENANTS
+OTHER_TENANT = "_other"
+
+# Limites, em segundos, dos histogramas de latência de requisições
+REQUEST_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Limites, em segundos, do histograma de duração dos treinos
+TRAINING_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+class Histogram:
+    """Histograma cumulativo simples com limites de bucket fixos"""
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = list(buckets)
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+            self._count += 1
+
+    def snapshot(self) -> Tuple[List[int], float, int]:
+        """Contagens cumulativas por bucket (incluindo +Inf), soma e total de observações"""
+        with self._lock:
+            counts = list(self._counts)
+            total_sum = self._sum
+            total = self._count
+        running = 0
+        for index, count in enumerate(counts):
+            running += count
+            counts[index] = running
+        return counts, total_sum, total
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Contagens cumulativas por limite superior, soma e total de observações"""
+        counts, total_sum, total = self.snapshot()
+        cumulative = {str(bound): count for bound, count in zip(self.buckets + ["+Inf"], counts)}
+        return {"buckets": cumulative, "sum": total_sum, "count": total}
+
+
+def _escape(value: str) -> str:
+    """Escapa um valor de rótulo conforme o formato de texto do Prometheus"""
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class HistogramFamily:
+    """Conjunto de histogramas com os mesmos limites, um por combinação de rótulos"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str], buckets: Sequence[float]):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.buckets = list(buckets)
+        self._series: Dict[Tuple[str, ...], Histogram] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values: str) -> Histogram:
+        """Obtém (ou cria) o histograma dos rótulos informados"""
+        series = self._series.get(values)
+        if series is None:
+            with self._lock:
+                series = self._series.setdefault(values, Histogram(self.buckets))
+        return series
+
+    def observe(self, value: float, *label_values: str):
+        self.labels(*label_values).observe(value)
+
+    def remove_label(self, label_name: str, value: str):
+        """Remove as séries em que o rótulo 'label_name' tem o valor informado"""
+        index = self.label_names.index(label_name)
+        with self._lock:
+            for key in [key for key in self._series if key[index] == value]:
+                del self._series[key]
+
+    def collect(self) -> List[str]:
+        bounds = [f"{bound:g}" for bound in self.buckets] + ["+Inf"]
+        lines = []
+        for values, series in sorted(self._series.copy().items()):
+            counts, total_sum, total = series.snapshot()
+            for bound, count in zip(bounds, counts):
+                labels = _format_labels(self.label_names, values, f'le="{bound}"')
+                lines.append(f"{self.name}_bucket{labels} {count}")
+            labels = _format_labels(self.label_names, values)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total_sum)}")
+            lines.append(f"{self.name}_count{labels} {total}")
+        return lines
+
+
+class CounterFamily:
+    """Contadores monotônicos, um por combinação de rótulos"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str]):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values: str, amount: float = 1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def remove_label(self, label_name: str, value: str):
+        """Remove as séries em que o rótulo 'label_name' tem o valor informado"""
+        index = self.label_names.index(label_name)
+        with self._lock:
+            for key in [key for key in self._values if key[index] == value]:
+                del self._values[key]
+
+    def collect(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [
+            f"{self.name}{_format_labels(self.label_names, labels)} {_format_value(value)}"
+            for labels, value in values
+        ]
+
+
+class CallbackMetric:
+    """Métrica sem rótulos cujo valor é lido de uma função a cada coleta"""
+
+    def __init__(self, name: str, documentation: str, kind: str, fn: Callable[[], Optional[float]]):
+        self.name = name
+        self.documentation = documentation
+        self.kind = kind
+        self._fn = fn
+        self.label_names = ()
+
+    def collect(self) -> List[str]:
+        value = self._fn()
+        return [] if value is None else [f"{self.name} {_format_value(value)}"]
+
+
+class Registry:
+    """
+    Registro das métricas expostas em /metrics
+
+    Controla também a cardinalidade do rótulo 'tenant': apenas os primeiros
+    'max_tenants' tenants vistos ganham séries próprias; os demais são
+    agregados em OTHER_TENANT. Séries de tenants removidos são descartadas.
+    """
+
+    def __init__(self, max_tenants: int = config.METRICS_MAX_TENANTS):
+        self._metrics: list = []
+        self._max_tenants = max_tenants
+        self._tenants = set()
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        label_names: Sequence[str] = (),
+        buckets: Sequence[float] = REQUEST_BUCKETS
+    ) -> HistogramFamily:
+        return self._register(HistogramFamily(name, documentation, label_names, buckets))
+
+    def counter(self, name: str, documentation: str, label_names: Sequence[str] = ()) -> CounterFamily:
+        return self._register(CounterFamily(name, documentation, label_names))
+
+    def gauge(
+        self,
+        name: str,
+        documentation: str,
+        fn: Callable[[], Optional[float]],
+        kind: str = "gauge"
+    ) -> CallbackMetric:
+        """Registra uma métrica lida de 'fn' a cada coleta (kind "counter" para totais)"""
+        return self._register(CallbackMetric(name, documentation, kind, fn))
+
+    def attach_histogram(self, name: str, documentation: str, histogram: Histogram) -> HistogramFamily:
+        """Expõe um Histogram já existente, sem rótulos"""
+        family = HistogramFamily(name, documentation, (), histogram.buckets)
+        family._series[()] = histogram
+        return self._register(family)
+
+    def tenant_label(self, tenant_id: str) -> str:
+        """Valor do rótulo 'tenant' para um tenant, respeitando o limite de cardinalidade"""
+        if tenant_id in self._tenants:
+            return tenant_id
+        with self._lock:
+            if tenant_id in self._tenants or self._max_tenants <= 0 or len(self._tenants) < self._max_tenants:
+                self._tenants.add(tenant_id)
+                return tenant_id
+        return OTHER_TENANT
+
+    def forget_tenant(self, tenant_id: str):
+        """Descarta as séries de um tenant removido"""
+        with self._lock:
+            if tenant_id not in self._tenants:
+                return
+            self._tenants.discard(tenant_id)
+            metrics = list(self._metrics)
+        for metric in metrics:
+            if "tenant" in metric.label_names:
+                metric.remove_label("tenant", tenant_id)
+
+    def render(self) -> str:
+        """Todas as métricas no formato de texto do Prometheus"""
+        with self._lock:
+            metrics = list(self._metrics)
+        lines = []
+        for metric in metrics:
+            samples = metric.collect()
+            if not samples:
+                continue
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(samples)
+        return "\n".join(lines) + "\n"
+
+
+def resident_memory_bytes() -> Optional[int]:
+    """Memória residente (RSS) do processo, ou None se não disponível"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return None
+
+
+# Registro global e métricas atualizadas pelo caminho das requisições e dos treinos
+registry = Registry()
+
+request_duration = registry.histogram(
+    "classify_http_request_duration_seconds",
+    "Latência das requisições HTTP por endpoint",
+    ("method", "path", "status"),
+)
+tenant_request_duration = registry.histogram(
+    "classify_tenant_request_duration_seconds",
+    "Latência das requisições de classificação por tenant",
+    ("tenant", "path"),
+)
+training_duration = registry.histogram(
+    "classify_model_training_duration_seconds",
+    "Duração dos treinos completos de modelo por tenant",
+    ("tenant",),
+    TRAINING_BUCKETS,
+)
+training_failures = registry.counter(
+    "classify_model_training_failures_total",
+    "Treinos de modelo que falharam, por tenant",
+    ("tenant",),
+)
+incremental_updates = registry.counter(
+    "classify_model_incremental_updates_total",
+    "Atualizações incrementais de modelo (sem retreino completo), por tenant",
+    ("tenant",),
+)
+inline_trainings = registry.counter(
+    "classify_model_inline_trainings_total",
+    "Classificações que aguardaram o treino ou a carga do modelo, por tenant e motivo (new, reload, queued)",
+    ("tenant", "reason"),
+)
+
+
+class _RequestMetrics:
+    """Dados da requisição em andamento preenchidos pelos endpoints"""
+
+    __slots__ = ("tenant_id",)
+
+    def __init__(self):
+        self.tenant_id: Optional[str] = None
+
+
+_current_request: ContextVar[Optional[_RequestMetrics]] = ContextVar("metrics_request", default=None)
+
+
+def set_request_tenant(tenant_id: str):
+    """Associa a requisição em andamento a um tenant, para a latência por tenant"""
+    current = _current_request.get()
+    if current is not None:
+        current.tenant_id = tenant_id
+
+
+class MetricsMiddleware:
+    """
+    Middleware ASGI que mede a latência de cada requisição HTTP
+
+    O endpoint é identificado pelo caminho da rota (ex.: /tenants/{tenant_id}),
+    não pela URL, para manter a cardinalidade baixa. É um middleware ASGI
+    puro, sem o custo do BaseHTTPMiddleware; para respostas em streaming,
+    mede até o envio da última parte.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status_code = 500
+        current = _RequestMetrics()
+        token = _current_request.set(current)
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            _current_request.reset(token)
+            elapsed = time.perf_counter() - start
+            route = scope.get("route")
+            path = getattr(route, "path", "unmatched")
+            request_duration.observe(elapsed, scope["method"], path, str(status_code))
+            if current.tenant_id is not None:
+                tenant_request_duration.observe(elapsed, registry.tenant_label(current.tenant_id), path)
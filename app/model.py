@@ -2,150 +2,637 @@
 Modelo de classificação multi-tenant.
 Cada tenant possui seu próprio modelo treinado com suas phrases, labels e idioma.
 """
-import nltk
-from nltk.corpus import stopwords
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.naive_bayes import MultinomialNB
-from typing import Dict, Tuple, Optional, List
+from collections import OrderedDict
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, Tuple, Optional, List, Sequence
 import logging
+import multiprocessing
+import threading
+import time
 
-# Garante que o corpus de stopwords do NLTK esteja disponível
-nltk.download('stopwords', quiet=True)
+from . import config, metrics, profiling
+from .model_store import ModelStore
+from .prediction_cache import cache_stats
+from .tenant_manager import TenantChange, TenantConfig
+from .tenant_model import TenantModel, fit_tenant_arrays
+from .tenant_storage import StaleTenantError
 
 logger = logging.getLogger(__name__)
 
-class TenantModel:
-    """Modelo de classificação para um tenant específico"""
-    
-    def __init__(self, tenant_id: str, language: str, phrases: List[str], labels: List[str]):
-        self.tenant_id = tenant_id
-        self.language = language
-        self.phrases = phrases
-        self.labels = labels
-        self.vectorizer: Optional[TfidfVectorizer] = None
-        self.model: Optional[MultinomialNB] = None
-        self._trained = False
-        
-        if phrases and labels:
-            self._train()
-    
-    def _get_stopwords(self, language: str) -> List[str]:
-        """Obtém as stopwords para o idioma especificado"""
-        try:
-            # Suporta vários idiomas comuns
-            language_map = {
-                "portuguese": "portuguese",
-                "português": "portuguese",
-                "english": "english",
-                "inglês": "english",
-                "espanol": "spanish",
-                "espanhol": "spanish",
-                "french": "french",
-                "francês": "french",
-            }
+
+def _changes_between(
+    changes: Sequence[TenantChange],
+    from_version: int,
+    to_version: int
+) -> Optional[List[TenantChange]]:
+    """
+    Retorna a sequência de alterações que leva from_version a to_version
+    
+    Returns:
+        Lista de alterações em ordem, ou None se o histórico não cobrir o intervalo
+    """
+    chain = []
+    current = from_version
+    for change in changes:
+        if change.base_version == current:
+            chain.append(change)
+            current = change.version
+    if current != to_version or not chain:
+        return None
+    return chain
+
+
+
+class TrainingQueueFullError(RuntimeError):
+    """A fila de treinamentos pendentes atingiu o limite configurado"""
+
+
+class TrainingStatus:
+    """Estados possíveis do treinamento de um tenant"""
+    PENDING = "pending"
+    TRAINING = "training"
+    READY = "ready"
+    FAILED = "failed"
+
+
+class TrainingState:
+    """Estado do treinamento mais recente solicitado para um tenant"""
+    
+    def __init__(self, version: int, status: str = TrainingStatus.PENDING):
+        self.version = version
+        self.status = status
+        self.error: Optional[str] = None
+        self.future: Optional[Future] = None
+
+
+class ModelManager:
+    """
+    Gerenciador de modelos multi-tenant
+    
+    Retreinos rodam em segundo plano: o modelo anterior continua atendendo
+    as classificações até que o novo esteja pronto, quando então é trocado
+    atomicamente no dicionário de modelos. Quando um ModelStore está
+    configurado, modelos treinados são salvos em disco e recarregados dele
+    em vez de retreinados.
+    
+    O número de modelos residentes e a memória estimada podem ser limitados:
+    os modelos usados há mais tempo são descartados (LRU) e reconstruídos
+    sob demanda na próxima classificação.
+    
+    Com o executor "process", o ajuste do TF-IDF e do Naive Bayes roda em um
+    ProcessPoolExecutor e apenas os arrays resultantes voltam ao processo
+    servidor, sem disputar o GIL com as classificações. A fila de
+    treinamentos pendentes é limitada e guarda no máximo um job por tenant.
+    
+    No modo compartilhado (vários workers do uvicorn), cada modelo é treinado
+    por um único worker, sob um lock de arquivo, e todos os workers usam os
+    arrays do artefato em disco via memory-map, somente leitura.
+    """
+    
+    def __init__(
+        self,
+        training_workers: int = config.TRAINING_WORKERS,
+        training_executor: str = config.TRAINING_EXECUTOR,
+        training_queue_size: int = config.TRAINING_QUEUE_SIZE,
+        store: Optional[ModelStore] = None,
+        max_resident_models: int = config.MAX_RESIDENT_MODELS,
+        memory_budget_bytes: int = config.MODEL_MEMORY_BUDGET_MB * 1024 * 1024,
+        shared_models: bool = config.SHARED_MODELS
+    ):
+        self._models: "OrderedDict[str, TenantModel]" = OrderedDict()
+        self._max_resident_models = max_resident_models
+        self._memory_budget_bytes = memory_budget_bytes
+        self._memory_bytes = 0
+        self._evicted = set()
+        self.evictions = 0
+        self.reloads = 0
+        self._store = store if store is not None else ModelStore(config.MODEL_STORE_DIR)
+        self._shared = shared_models and self._store.enabled
+        if shared_models and not self._store.enabled:
+            logger.warning("SHARED_MODELS requer MODEL_STORE_DIR; modelos não serão compartilhados")
+        self._states: Dict[str, TrainingState] = {}
+        self._lock = threading.Lock()
+        self._training_workers = max(1, training_workers)
+        self._executor = ThreadPoolExecutor(
+            max_workers=self._training_workers,
+            thread_name_prefix="model-training"
+        )
+        if training_executor not in ("thread", "process"):
+            raise ValueError(f"Executor de treinamento inválido: '{training_executor}'")
+        self._use_processes = training_executor == "process"
+        self._process_pool: Optional[ProcessPoolExecutor] = None
+        self._training_queue_size = training_queue_size
+        # Jobs de treinamento ainda não iniciados: tenant -> [parâmetros, future]
+        self._queued: Dict[str, list] = {}
+    
+    def schedule_training(self, tenant: TenantConfig) -> Optional[TrainingState]:
+        """
+        Agenda o treinamento do modelo de um tenant em segundo plano
+        
+        Não faz nada se o modelo atual já estiver na versão do tenant (ou em
+        uma mais recente) ou se essa versão, ou uma mais recente, já estiver
+        na fila ou em treinamento; assim, chamadas com uma configuração
+        antiga do tenant nunca fazem uma versão ser treinada de novo. Quando as
+        alterações registradas no tenant levam a versão do modelo atual até
+        a versão pedida, o modelo é atualizado incrementalmente na hora, sem
+        retreino completo. As phrases só são lidas quando o treino começa.
+        
+        Se já houver um job na fila para o tenant, ele passa a treinar a
+        versão mais recente em vez de um novo job ser criado.
+        
+        Returns:
+            Estado do treinamento, ou None se o tenant não tiver dados de treino
+            
+        Raises:
+            TrainingQueueFullError: se a fila de treinamentos estiver cheia
+        """
+        if tenant.phrase_count == 0:
+            return None
+        
+        tenant_id = tenant.tenant_id
+        version = tenant.version
+        with self._lock:
+            state = self._states.get(tenant_id)
+            if state is not None and state.version >= version:
+                return state
+            
+            model = self._models.get(tenant_id)
+            state = TrainingState(version)
+            if model is not None and model.version >= version:
+                state.status = TrainingStatus.READY
+                self._states[tenant_id] = state
+                return state
+            
+            if model is not None and model.language == tenant.language and model.engine == tenant.engine:
+                if self._apply_incremental(model, tenant):
+                    state.status = TrainingStatus.READY
+                    self._states[tenant_id] = state
+                    return state
             
-            nltk_lang = language_map.get(language.lower(), language.lower())
-            return stopwords.words(nltk_lang)
+            queued = self._queued.get(tenant_id)
+            if queued is not None:
+                # Reaproveita o job que ainda não começou
+                queued[0] = tenant
+                state.future = queued[1]
+            else:
+                if 0 < self._training_queue_size <= len(self._queued):
+                    raise TrainingQueueFullError(
+                        f"Fila de treinamento cheia ({self._training_queue_size} jobs pendentes)"
+                    )
+                queued = [tenant, None]
+                self._queued[tenant_id] = queued
+                queued[1] = state.future = self._executor.submit(self._run_queued, tenant_id)
+            
+            self._states[tenant_id] = state
+            return state
+    
+    def _run_queued(self, tenant_id: str) -> Optional[TenantModel]:
+        """Retira da fila a configuração mais recente do tenant e executa o treino"""
+        with self._lock:
+            queued = self._queued.pop(tenant_id, None)
+        if queued is None:
+            return None
+        return self._run_training(queued[0])
+    
+    def queued_jobs(self) -> int:
+        """Número de treinamentos na fila que ainda não começaram"""
+        return len(self._queued)
+    
+    def _apply_incremental(self, model: TenantModel, tenant: TenantConfig) -> bool:
+        """
+        Tenta atualizar o modelo de forma incremental; deve ser chamado com o lock adquirido
+        
+        Returns:
+            True se o modelo incremental foi publicado
+        """
+        chain = _changes_between(tenant.changes, model.version, tenant.version)
+        if chain is None:
+            return False
+        
+        added = [pair for change in chain for pair in change.added]
+        removed = [pair for change in chain for pair in change.removed]
+        
+        # Muitas alterações acumuladas: vocabulário e IDF já estão defasados e,
+        # em qualquer engine, as contagens reconstruídas das log-probabilidades
+        # em float32 acumulam um erro de arredondamento a cada atualização
+        drift = model.incremental_rows + len(added) + len(removed)
+        if drift > config.INCREMENTAL_REFIT_RATIO * max(tenant.phrase_count, 1):
+            return False
+        
+        try:
+            updated = model.apply_changes(added, removed, tenant.version)
         except Exception as e:
-            logger.warning(f"Idioma '{language}' não suportado, usando lista vazia de stopwords. Erro: {e}")
-            return []
+            logger.warning(f"Atualização incremental do tenant '{model.tenant_id}' falhou, retreinando: {e}")
+            return False
+        
+        self._insert_model(updated)
+        metrics.incremental_updates.inc(metrics.registry.tenant_label(tenant.tenant_id))
+        if self._store.enabled:
+            self._executor.submit(self._save_to_store, updated, tenant.fingerprint)
+        return True
     
-    def _train(self):
-        """Treina o modelo com as phrases e labels do tenant"""
-        if not self.phrases or not self.labels:
-            raise ValueError("Phrases e labels são necessários para treinar o modelo")
+    def _run_training(self, tenant: TenantConfig) -> Optional[TenantModel]:
+        """
+        Treina um novo modelo e o publica se ainda for relevante
         
-        if len(self.phrases) != len(self.labels):
-            raise ValueError(
-                f"O número de phrases ({len(self.phrases)}) deve ser igual ao número de labels ({len(self.labels)})"
-            )
+        Returns:
+            O modelo publicado, ou None se o tenant mudou antes de as phrases
+            serem lidas (o treino da versão mais nova é agendado, se ainda não estiver)
+        """
+        tenant_id, version = tenant.tenant_id, tenant.version
+        self._set_status(tenant_id, version, TrainingStatus.TRAINING)
+        try:
+            model = self._load_or_train(tenant)
+        except StaleTenantError as e:
+            logger.info(f"Treino do tenant '{tenant_id}' (versão {version}) descartado: {e}")
+            # Uma versão gravada por outro processo não foi agendada por este
+            latest = tenant.latest()
+            if latest is not None and latest.version > version:
+                try:
+                    self.schedule_training(latest)
+                except TrainingQueueFullError as queue_error:
+                    logger.warning(f"Retreino do tenant '{tenant_id}' adiado: {queue_error}")
+            return None
+        except Exception as e:
+            logger.error(f"Falha ao treinar modelo do tenant '{tenant_id}' (versão {version}): {e}")
+            self._set_status(tenant_id, version, TrainingStatus.FAILED, str(e))
+            raise
         
-        # Obtém stopwords para o idioma do tenant
-        stop_words = self._get_stopwords(self.language)
+        self._publish(model)
+        return model
+    
+    def _load_or_train(self, tenant: TenantConfig) -> TenantModel:
+        """Carrega o modelo do armazenamento em disco ou, se não houver, treina e salva"""
+        if not self._store.enabled:
+            return self._train(tenant)
         
-        # Inicializa o TfidfVectorizer com as stopwords do idioma
-        self.vectorizer = TfidfVectorizer(
-            stop_words=stop_words,
-            strip_accents='unicode',
-            lowercase=True
-        )
+        model = self._load_from_store(tenant)
+        if model is not None:
+            return model
         
-        # Transforma as phrases em vetores
-        X = self.vectorizer.fit_transform(self.phrases)
+        if not self._shared:
+            model = self._train(tenant)
+            self._save_to_store(model, tenant.fingerprint)
+            return model
         
-        # Cria e treina o modelo
-        self.model = MultinomialNB()
-        self.model.fit(X, self.labels)
-        self._trained = True
+        # Modo compartilhado: apenas um worker treina; os demais aguardam o
+        # lock e carregam o artefato publicado por ele
+        with self._store.training_lock(tenant.tenant_id):
+            model = self._load_from_store(tenant)
+            if model is not None:
+                return model
+            
+            trained = self._train(tenant)
+            self._save_to_store(trained, tenant.fingerprint)
         
-        logger.info(f"Modelo treinado para tenant '{self.tenant_id}' com {len(self.phrases)} exemplos")
+        # Reabre o artefato via memory-map para compartilhar as páginas com os outros workers
+        model = self._load_from_store(tenant)
+        return model if model is not None else trained
     
-    def classify(self, message: str) -> Tuple[str, float]:
+    def _train(self, tenant: TenantConfig) -> TenantModel:
         """
-        Classifica uma mensagem e retorna a categoria e probabilidade
+        Treina um modelo na thread atual ou no pool de processos, conforme configurado
+        
+        É aqui que as phrases do tenant são lidas do armazenamento, quando
+        não estão em memória. A duração (incluindo a leitura das phrases) e
+        as falhas são registradas nas métricas do tenant.
+        """
+        label = metrics.registry.tenant_label(tenant.tenant_id)
+        start = time.perf_counter()
+        try:
+            phrases, labels = tenant.training_data()
+            if not self._use_processes:
+                model = TenantModel(
+                    tenant.tenant_id, tenant.language, phrases, labels, tenant.version, tenant.engine
+                )
+            else:
+                arrays = self._get_process_pool().submit(
+                    fit_tenant_arrays, tenant.tenant_id, tenant.language, phrases, labels, tenant.engine
+                ).result()
+                model = TenantModel.from_arrays(
+                    tenant.tenant_id, tenant.language, tenant.version, arrays, engine=tenant.engine
+                )
+        except Exception:
+            metrics.training_failures.inc(label)
+            raise
+        metrics.training_duration.observe(time.perf_counter() - start, label)
+        return model
+    
+    def _get_process_pool(self) -> ProcessPoolExecutor:
+        """Cria o pool de processos de treinamento no primeiro uso"""
+        with self._lock:
+            if self._process_pool is None:
+                self._process_pool = ProcessPoolExecutor(
+                    max_workers=self._training_workers,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._process_pool
+    
+    def _load_from_store(self, tenant: TenantConfig) -> Optional[TenantModel]:
+        """Reconstrói um modelo a partir do artefato salvo, se existir"""
+        artifact = self._store.load(tenant.tenant_id, tenant.fingerprint)
+        if artifact is None or artifact["language"] != tenant.language or artifact["engine"] != tenant.engine:
+            return None
+        
+        logger.info(f"Modelo do tenant '{tenant.tenant_id}' carregado do armazenamento em disco")
+        return TenantModel.from_arrays(
+            tenant.tenant_id, tenant.language, tenant.version,
+            artifact["arrays"],
+            incremental_rows=artifact["incremental_rows"],
+            engine=tenant.engine
+        )
+    
+    def _save_to_store(self, model: TenantModel, fingerprint: str):
+        """Salva um modelo treinado no armazenamento em disco"""
+        if not self._store.enabled or model.scorer is None:
+            return
+        try:
+            self._store.save(
+                model.tenant_id, fingerprint, model.language,
+                model.to_arrays(), incremental_rows=model.incremental_rows, engine=model.engine
+            )
+        except Exception as e:
+            logger.error(f"Falha ao salvar modelo do tenant '{model.tenant_id}': {e}")
+    
+    def submit_fit(self, tenant: TenantConfig, pool: Executor) -> Future:
+        """
+        Inicia o treino de um tenant em um pool de processos externo
+        
+        Usado pela importação em lote, que treina muitos tenants em paralelo
+        com um pool próprio. O modelo só é publicado por complete_fit; até
+        lá, classificações do tenant aguardam esse treino em vez de treinar
+        por conta própria. Um artefato já salvo com o mesmo fingerprint é
+        reaproveitado sem treinar.
         
-        Args:
-            message: Mensagem a ser classificada
-            
         Returns:
-            Tupla (classificação, probabilidade)
+            Future com os arrays do modelo, ou com o TenantModel lido do disco
         """
-        if not self._trained:
-            raise ValueError(f"Modelo do tenant '{self.tenant_id}' não foi treinado")
+        with self._lock:
+            state = TrainingState(tenant.version, TrainingStatus.TRAINING)
+            state.future = Future()
+            self._states[tenant.tenant_id] = state
         
-        if not self.vectorizer or not self.model:
-            raise ValueError(f"Modelo do tenant '{self.tenant_id}' não está inicializado")
+        model = self._load_from_store(tenant) if self._store.enabled else None
+        if model is not None:
+            fit = Future()
+            fit.set_result(model)
+            return fit
+        try:
+            phrases, labels = tenant.training_data()
+            return pool.submit(
+                fit_tenant_arrays, tenant.tenant_id, tenant.language, phrases, labels, tenant.engine
+            )
+        except Exception as e:
+            fit = Future()
+            fit.set_exception(e)
+            return fit
+    
+    def complete_fit(self, tenant: TenantConfig, fit: Future) -> TenantModel:
+        """
+        Publica o modelo de um treino iniciado por submit_fit
+        
+        Raises:
+            Exception: a exceção do treino, se ele falhou
+        """
+        tenant_id, version = tenant.tenant_id, tenant.version
+        with self._lock:
+            state = self._states.get(tenant_id)
+            published = state.future if state is not None and state.version == version else None
+        
+        try:
+            result = fit.result()
+            if isinstance(result, TenantModel):
+                model = result
+            else:
+                model = TenantModel.from_arrays(tenant_id, tenant.language, version, result, engine=tenant.engine)
+                if self._store.enabled:
+                    self._save_to_store(model, tenant.fingerprint)
+                    # Reabre via memory-map, como em _load_or_train
+                    model = self._load_from_store(tenant) or model
+        except Exception as e:
+            metrics.training_failures.inc(metrics.registry.tenant_label(tenant_id))
+            self._set_status(tenant_id, version, TrainingStatus.FAILED, str(e))
+            if published is not None and not published.done():
+                published.set_exception(e)
+            raise
         
-        # Transforma a mensagem
-        msg_vector = self.vectorizer.transform([message])
+        self._publish(model)
+        if published is not None and not published.done():
+            published.set_result(model)
+        return model
+    
+    def warm_start(self, tenants: Sequence[TenantConfig]) -> int:
+        """
+        Carrega do armazenamento em disco os modelos dos tenants informados
         
-        # Obtém as probabilidades
-        probs = self.model.predict_proba(msg_vector)[0]
+        Nenhum modelo é treinado aqui: tenants sem artefato salvo são
+        treinados sob demanda, como de costume. Apenas o cabeçalho dos
+        tenants é usado; as phrases não são lidas. O carregamento para
+        quando o próximo modelo excederia MAX_RESIDENT_MODELS ou
+        MODEL_MEMORY_BUDGET_MB, sem descartar nenhum modelo: os demais são
+        carregados do disco na primeira requisição.
         
-        # Obtém as classes
-        classes = self.model.classes_
-        result = dict(zip(classes, probs))
+        Returns:
+            Número de modelos carregados
+        """
+        if not self._store.enabled:
+            return 0
         
-        # Retorna a classificação com maior probabilidade
-        classification = max(result, key=result.get)
-        probability = result[classification]
+        loaded = 0
+        for tenant in tenants:
+            if tenant.phrase_count == 0 or tenant.tenant_id in self._models:
+                continue
+            with self._lock:
+                if 0 < self._max_resident_models <= len(self._models):
+                    break
+            model = self._load_from_store(tenant)
+            if model is None:
+                continue
+            with self._lock:
+                if self._models and 0 < self._memory_budget_bytes < self._memory_bytes + model.memory_bytes():
+                    break
+                self._states[tenant.tenant_id] = TrainingState(tenant.version, TrainingStatus.READY)
+            self._publish(model)
+            loaded += 1
         
-        return classification, probability
+        logger.info(f"{loaded} modelos carregados do armazenamento em disco")
+        return loaded
     
-    def retrain(self, phrases: List[str], labels: List[str]):
-        """Retreina o modelo com novas phrases e labels"""
-        self.phrases = phrases
-        self.labels = labels
-        self._train()
-
-class ModelManager:
-    """Gerenciador de modelos multi-tenant"""
+    def _publish(self, model: TenantModel):
+        """Troca atomicamente o modelo servido pelo tenant, se o novo for mais recente"""
+        with self._lock:
+            # O tenant foi removido enquanto o modelo era treinado
+            if model.tenant_id not in self._states:
+                return
+            
+            current = self._models.get(model.tenant_id)
+            if current is None or current.version < model.version:
+                self._insert_model(model)
+            
+            state = self._states[model.tenant_id]
+            if state.version == model.version:
+                state.status = TrainingStatus.READY
+                state.error = None
     
-    def __init__(self):
-        self._models: Dict[str, TenantModel] = {}
+    def _insert_model(self, model: TenantModel):
+        """Publica um modelo como o mais recente e aplica os limites de memória; requer o lock"""
+        previous = self._models.pop(model.tenant_id, None)
+        if previous is not None:
+            self._memory_bytes -= previous.memory_bytes()
+        self._models[model.tenant_id] = model
+        self._memory_bytes += model.memory_bytes()
+        self._evict_if_needed()
     
-    def get_or_create_model(
-        self,
-        tenant_id: str,
-        language: str,
-        phrases: List[str],
-        labels: List[str]
-    ) -> TenantModel:
-        """Obtém um modelo existente ou cria um novo"""
-        if tenant_id in self._models:
-            model = self._models[tenant_id]
-            # Verifica se precisa retreinar
-            if (model.language != language or 
-                model.phrases != phrases or 
-                model.labels != labels):
-                model.language = language
-                model.retrain(phrases, labels)
-            return model
+    def _evict_if_needed(self):
+        """Descarta os modelos menos usados enquanto os limites estiverem excedidos; requer o lock"""
+        while len(self._models) > 1:
+            over_count = 0 < self._max_resident_models < len(self._models)
+            over_memory = 0 < self._memory_budget_bytes < self._memory_bytes
+            if not over_count and not over_memory:
+                break
+            
+            tenant_id, evicted = self._models.popitem(last=False)
+            self._memory_bytes -= evicted.memory_bytes()
+            self._evicted.add(tenant_id)
+            self.evictions += 1
+            
+            # Impede que o resultado de um treino antigo ressuscite o modelo descartado
+            state = self._states.get(tenant_id)
+            if state is not None:
+                state.future = None
+            
+            logger.info(f"Modelo do tenant '{tenant_id}' descartado da memória (LRU)")
+    
+    def stats(self) -> Dict[str, int]:
+        """Retorna contadores de uso dos modelos em memória"""
+        return {
+            "resident_models": len(self._models),
+            "estimated_memory_bytes": self._memory_bytes,
+            "evictions": self.evictions,
+            "reloads": self.reloads,
+            **cache_stats.as_dict(),
+        }
+    
+    def _set_status(self, tenant_id: str, version: int, status: str, error: Optional[str] = None):
+        """Atualiza o estado de treinamento se ele ainda se referir à versão informada"""
+        with self._lock:
+            state = self._states.get(tenant_id)
+            if state is not None and state.version == version:
+                state.status = status
+                state.error = error
+    
+    def get_training_state(self, tenant_id: str) -> Optional[TrainingState]:
+        """Obtém o estado do treinamento mais recente de um tenant"""
+        return self._states.get(tenant_id)
+    
+    def get_or_create_model(self, tenant: TenantConfig) -> TenantModel:
+        """
+        Obtém um modelo existente ou cria um novo
         
-        # Cria novo modelo
-        model = TenantModel(tenant_id, language, phrases, labels)
-        self._models[tenant_id] = model
-        return model
+        O modelo é retreinado apenas quando a versão da configuração do tenant
+        difere da versão usada no último treino, sem comparar as phrases.
+        Um modelo desatualizado continua sendo usado enquanto o retreino roda
+        em segundo plano; apenas tenants sem nenhum modelo aguardam o treino.
+        
+        Entre as chamadas concorrentes de um tenant sem modelo, apenas uma
+        treina (ou carrega do disco) cada versão; as demais aguardam o
+        resultado dela ou do treino já agendado em segundo plano.
+        
+        Se o tenant foi alterado por outro processo antes da leitura das
+        phrases, o snapshot gravado é publicado e o treino é repetido uma vez
+        com ele.
+        """
+        tenant_id, version = tenant.tenant_id, tenant.version
+        with profiling.stage("staleness"):
+            model = self._models.get(tenant_id)
+            if model is not None:
+                self._touch(tenant_id)
+                # Verifica se precisa retreinar
+                if model.version < version:
+                    try:
+                        self.schedule_training(tenant)
+                    except TrainingQueueFullError as e:
+                        # Continua servindo o modelo atual; o retreino será tentado de novo
+                        logger.warning(f"Retreino do tenant '{tenant_id}' adiado: {e}")
+                    # Uma atualização incremental pode ter sido publicada na hora
+                    return self._models.get(tenant_id, model)
+                return model
+        
+        label = metrics.registry.tenant_label(tenant_id)
+        refreshed = False
+        while True:
+            with self._lock:
+                # Publicado por outra thread desde a verificação acima
+                model = self._models.get(tenant_id)
+                if model is not None and model.version >= version:
+                    self._touch(tenant_id)
+                    return model
+                
+                state = self._states.get(tenant_id)
+                future = state.future if state is not None and state.version >= version else None
+                if future is None or (future.done() and (future.exception() is not None or future.result() is None)):
+                    # Esta thread treina a versão; um treino que falhou ou foi descartado é tentado de novo
+                    future = Future()
+                    state = TrainingState(version, TrainingStatus.TRAINING)
+                    state.future = future
+                    self._states[tenant_id] = state
+                    leader = True
+                    reason = "new"
+                    if tenant_id in self._evicted:
+                        self._evicted.discard(tenant_id)
+                        self.reloads += 1
+                        reason = "reload"
+                else:
+                    leader = False
+            
+            if not leader:
+                # Aguarda o treino em andamento ou agendado para esta versão
+                metrics.inline_trainings.inc(label, "queued")
+                with profiling.stage("train"):
+                    model = future.result()
+                # None: o job foi descartado (tenant removido ou substituído); tenta de novo
+                if model is not None:
+                    return model
+                continue
+            
+            # Cria novo modelo (ou reconstrói um modelo descartado da memória)
+            metrics.inline_trainings.inc(label, reason)
+            try:
+                with profiling.stage("train"):
+                    model = self._load_or_train(tenant)
+            except StaleTenantError as e:
+                # O tenant mudou depois deste snapshot: aguarda o treino da versão nova, se já agendado
+                with self._lock:
+                    state = self._states.get(tenant_id)
+                    newer = state is not None and state.version > version and state.future is not None
+                if newer:
+                    future.set_result(None)
+                    continue
+                # Alterado por outro processo: nenhum treino local conhece a versão gravada
+                latest = None if refreshed else tenant.latest()
+                if latest is not None and latest.version > version:
+                    refreshed = True
+                    future.set_result(None)
+                    tenant, version = latest, latest.version
+                    continue
+                self._set_status(tenant_id, version, TrainingStatus.FAILED, str(e))
+                future.set_exception(e)
+                raise
+            except Exception as e:
+                self._set_status(tenant_id, version, TrainingStatus.FAILED, str(e))
+                future.set_exception(e)
+                raise
+            self._publish(model)
+            future.set_result(model)
+            return model
+    
+    def _touch(self, tenant_id: str):
+        """Marca o modelo como usado recentemente para a política LRU"""
+        try:
+            self._models.move_to_end(tenant_id)
+        except KeyError:
+            # Descartado por outra thread entre a leitura e a marcação
+            pass
     
     def get_model(self, tenant_id: str) -> Optional[TenantModel]:
         """Obtém um modelo existente"""
@@ -153,32 +640,43 @@ class ModelManager:
     
     def remove_model(self, tenant_id: str):
         """Remove um modelo"""
-        if tenant_id in self._models:
-            del self._models[tenant_id]
+        with self._lock:
+            self._queued.pop(tenant_id, None)
+            model = self._models.pop(tenant_id, None)
+            if model is not None:
+                self._memory_bytes -= model.memory_bytes()
+            self._states.pop(tenant_id, None)
+            self._evicted.discard(tenant_id)
+        self._store.remove(tenant_id)
+        metrics.registry.forget_tenant(tenant_id)
     
-    def classify_message(
-        self,
-        tenant_id: str,
-        language: str,
-        phrases: List[str],
-        labels: List[str],
-        message: str
-    ) -> Tuple[str, float]:
+    def classify_message(self, tenant: TenantConfig, message: str) -> Tuple[str, float]:
         """
         Classifica uma mensagem para um tenant específico
         
         Args:
-            tenant_id: ID do tenant
-            language: Idioma do tenant
-            phrases: Lista de phrases de treinamento
-            labels: Lista de labels de treinamento
+            tenant: Configuração do tenant
             message: Mensagem a ser classificada
             
         Returns:
             Tupla (classificação, probabilidade)
         """
-        model = self.get_or_create_model(tenant_id, language, phrases, labels)
+        model = self.get_or_create_model(tenant)
         return model.classify(message)
+    
+    def classify_batch(self, tenant: TenantConfig, messages: List[str]) -> List[Tuple[str, float]]:
+        """
+        Classifica um lote de mensagens para um tenant específico
+        
+        Args:
+            tenant: Configuração do tenant
+            messages: Mensagens a serem classificadas
+            
+        Returns:
+            Lista de tuplas (classificação, probabilidade), na mesma ordem das mensagens
+        """
+        model = self.get_or_create_model(tenant)
+        return model.classify_batch(messages)
 
 # Instância global do gerenciador de modelos
 model_manager = ModelManager()
@@ -195,10 +693,4 @@ def classify_message(message: str) -> Tuple[str, float]:
     if not tenant:
         raise ValueError("Tenant 'default' não encontrado")
     
-    return model_manager.classify_message(
-        tenant_id="default",
-        language=tenant.language,
-        phrases=tenant.phrases,
-        labels=tenant.labels,
-        message=message
-    )
+    return model_manager.classify_message(tenant, message)
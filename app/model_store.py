@@ -0,0 +1,333 @@
+"""
+Armazenamento persistente de modelos treinados.
+Cada modelo é salvo em disco como arrays NumPy (.npy), que podem ser
+carregados via memory-map, evitando retreinar os tenants a cada reinício.
+"""
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, Optional, Sequence, Tuple
+from urllib.parse import quote
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import uuid
+
+import numpy as np
+
+from .scorer import DEFAULT_ENGINE
+
+try:
+    import fcntl
+except ImportError:  # Plataformas sem fcntl (Windows)
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Nome do arquivo de metadados de cada artefato
+META_FILE = "meta.json"
+
+# Arquivo de lock que serializa o treino de um tenant entre processos
+LOCK_FILE = ".train.lock"
+
+# Diretório de cada tenant: prefixo + hash do tenant_id, em um formato fixo
+# que nunca é "", "." ou "..", qualquer que seja o ID
+TENANT_DIR_PREFIX = "t-"
+TENANT_DIR_PATTERN = re.compile(r"t-[0-9a-f]{32}")
+
+
+# Impressões digitais são somas de hashes de 128 bits, em hexadecimal
+FINGERPRINT_BITS = 128
+FINGERPRINT_MODULUS = 2 ** FINGERPRINT_BITS
+FINGERPRINT_DIGITS = FINGERPRINT_BITS // 4
+
+
+def _digest(*parts: str) -> int:
+    """Hash de 128 bits de uma sequência de strings (cada uma prefixada pelo seu tamanho)"""
+    digest = hashlib.blake2b(digest_size=FINGERPRINT_BITS // 8)
+    for part in parts:
+        data = part.encode("utf-8")
+        digest.update(len(data).to_bytes(8, "little"))
+        digest.update(data)
+    return int.from_bytes(digest.digest(), "little")
+
+
+def _pairs_digest(pairs: Iterable[Tuple[str, str]]) -> int:
+    """Soma dos hashes dos pares (phrase, label)"""
+    return sum(_digest(phrase, label) for phrase, label in pairs)
+
+
+def _format_fingerprint(total: int) -> str:
+    return format(total % FINGERPRINT_MODULUS, f"0{FINGERPRINT_DIGITS}x")
+
+
+def _parse_fingerprint(fingerprint: str) -> Optional[int]:
+    """Valor de uma impressão digital aditiva, ou None se estiver em outro formato"""
+    if len(fingerprint) != FINGERPRINT_DIGITS:
+        return None
+    try:
+        return int(fingerprint, 16)
+    except ValueError:
+        return None
+
+
+def training_fingerprint(
+    language: str,
+    phrases: Sequence[str],
+    labels: Sequence[str],
+    engine: str = DEFAULT_ENGINE
+) -> str:
+    """
+    Calcula a impressão digital dos dados de treinamento de um tenant
+
+    Dois tenants com o mesmo idioma, o mesmo engine e o mesmo multiconjunto
+    de pares (phrase, label), em qualquer ordem, produzem a mesma impressão
+    digital; o modelo treinado também não depende da ordem. A impressão
+    digital é a soma (módulo 2^128) do hash do idioma e do engine com o hash
+    de cada par, então pode ser atualizada com update_fingerprint e
+    rebase_fingerprint sem percorrer o corpus.
+    """
+    return _format_fingerprint(_digest(language.lower(), engine) + _pairs_digest(zip(phrases, labels)))
+
+
+def update_fingerprint(
+    fingerprint: str,
+    added: Iterable[Tuple[str, str]] = (),
+    removed: Iterable[Tuple[str, str]] = ()
+) -> Optional[str]:
+    """
+    Impressão digital após adicionar e remover pares (phrase, label)
+
+    Returns:
+        A nova impressão digital, ou None se 'fingerprint' não estiver no
+        formato aditivo (calculada por versões anteriores); nesse caso, use
+        training_fingerprint com o corpus completo
+    """
+    total = _parse_fingerprint(fingerprint)
+    if total is None:
+        return None
+    return _format_fingerprint(total + _pairs_digest(added) - _pairs_digest(removed))
+
+
+def rebase_fingerprint(
+    fingerprint: str,
+    old_language: str,
+    old_engine: str,
+    language: str,
+    engine: str
+) -> Optional[str]:
+    """
+    Impressão digital dos mesmos pares com outro idioma e/ou engine
+
+    Returns:
+        A nova impressão digital, ou None se 'fingerprint' não estiver no formato aditivo
+    """
+    total = _parse_fingerprint(fingerprint)
+    if total is None:
+        return None
+    return _format_fingerprint(total - _digest(old_language.lower(), old_engine) + _digest(language.lower(), engine))
+
+
+class ModelStore:
+    """
+    Repositório de artefatos de modelos em um diretório local
+
+    Layout: <root>/t-<hash do tenant_id>/<fingerprint>/{meta.json, <array>.npy}
+
+    Artefatos do layout anterior, com o tenant_id codificado como nome do
+    diretório, continuam sendo lidos e são removidos junto com os do tenant.
+    Todo caminho é conferido para ficar dentro de 'root'.
+    """
+
+    def __init__(self, root: Optional[str]):
+        self.root = root or None
+
+    @property
+    def enabled(self) -> bool:
+        """Indica se o armazenamento em disco está configurado"""
+        return self.root is not None
+
+    def _child(self, parent: str, name: str) -> str:
+        """
+        Caminho de 'name' como subdiretório direto de 'parent', dentro de 'root'
+
+        Raises:
+            ValueError: se 'name' não for um único componente de caminho ou
+                se o caminho resultante sair de 'root'
+        """
+        separators = [sep for sep in (os.sep, os.altsep) if sep]
+        if name in ("", ".", "..") or any(sep in name for sep in separators) or "\0" in name:
+            raise ValueError(f"Nome de diretório inválido no armazenamento de modelos: {name!r}")
+        path = os.path.join(parent, name)
+        root = os.path.realpath(self.root)
+        resolved = os.path.realpath(path)
+        if resolved == root or os.path.commonpath([root, resolved]) != root:
+            raise ValueError(f"Caminho fora do armazenamento de modelos: {path!r}")
+        return path
+
+    def _tenant_dir(self, tenant_id: str) -> str:
+        digest = hashlib.blake2b(tenant_id.encode("utf-8"), digest_size=16).hexdigest()
+        return self._child(self.root, TENANT_DIR_PREFIX + digest)
+
+    def _legacy_tenant_dir(self, tenant_id: str) -> Optional[str]:
+        """Diretório do tenant no layout anterior, ou None se o nome não for seguro"""
+        name = quote(tenant_id, safe="")
+        # Um ID no formato novo apontaria para o diretório de outro tenant
+        if TENANT_DIR_PATTERN.fullmatch(name):
+            return None
+        try:
+            return self._child(self.root, name)
+        except ValueError:
+            return None
+
+    def _artifact_dir(self, tenant_id: str, fingerprint: str) -> str:
+        return self._child(self._tenant_dir(tenant_id), fingerprint)
+
+    def save(
+        self,
+        tenant_id: str,
+        fingerprint: str,
+        language: str,
+        arrays: Dict[str, np.ndarray],
+        incremental_rows: int = 0,
+        engine: str = DEFAULT_ENGINE
+    ):
+        """
+        Salva os arrays de um modelo treinado
+
+        A escrita é feita em um diretório temporário renomeado ao final, de
+        forma que leitores nunca vejam um artefato incompleto. Artefatos de
+        impressões digitais anteriores do mesmo tenant são removidos.
+        """
+        if not self.enabled:
+            return
+
+        tenant_dir = self._tenant_dir(tenant_id)
+        try:
+            target = self._artifact_dir(tenant_id, fingerprint)
+        except ValueError as e:
+            logger.error(f"Falha ao salvar modelo do tenant '{tenant_id}': {e}")
+            return
+        if os.path.isdir(target):
+            return
+
+        os.makedirs(tenant_dir, exist_ok=True)
+        tmp_dir = os.path.join(tenant_dir, f".tmp-{uuid.uuid4().hex}")
+        os.makedirs(tmp_dir)
+        try:
+            for name, array in arrays.items():
+                np.save(os.path.join(tmp_dir, f"{name}.npy"), np.ascontiguousarray(array))
+
+            meta = {
+                "tenant_id": tenant_id,
+                "fingerprint": fingerprint,
+                "language": language,
+                "engine": engine,
+                "arrays": sorted(arrays),
+                "incremental_rows": incremental_rows,
+            }
+            with open(os.path.join(tmp_dir, META_FILE), "w", encoding="utf-8") as f:
+                json.dump(meta, f)
+
+            os.replace(tmp_dir, target)
+        except OSError as e:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            # Outro processo pode ter publicado o mesmo artefato ao mesmo tempo
+            if not os.path.isdir(target):
+                logger.error(f"Falha ao salvar modelo do tenant '{tenant_id}': {e}")
+            return
+
+        self._remove_other_artifacts(tenant_id, keep=fingerprint)
+        legacy_dir = self._legacy_tenant_dir(tenant_id)
+        if legacy_dir is not None:
+            shutil.rmtree(legacy_dir, ignore_errors=True)
+        logger.info(f"Modelo do tenant '{tenant_id}' salvo em '{target}'")
+
+    def load(self, tenant_id: str, fingerprint: str) -> Optional[dict]:
+        """
+        Carrega um artefato via memory-map
+
+        Returns:
+            Dicionário com 'language', 'engine', 'incremental_rows' e 'arrays', ou None
+            se não houver artefato para essa impressão digital
+        """
+        if not self.enabled:
+            return None
+
+        try:
+            target = self._artifact_dir(tenant_id, fingerprint)
+        except ValueError:
+            return None
+        meta_path = os.path.join(target, META_FILE)
+        if not os.path.isfile(meta_path):
+            legacy_dir = self._legacy_tenant_dir(tenant_id)
+            if legacy_dir is None:
+                return None
+            try:
+                target = self._child(legacy_dir, fingerprint)
+            except ValueError:
+                return None
+            meta_path = os.path.join(target, META_FILE)
+            if not os.path.isfile(meta_path):
+                return None
+
+        try:
+            with open(meta_path, encoding="utf-8") as f:
+                meta = json.load(f)
+            arrays = {
+                name: np.load(os.path.join(target, f"{name}.npy"), mmap_mode="r")
+                for name in meta["arrays"]
+            }
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Artefato do tenant '{tenant_id}' ilegível, ignorando: {e}")
+            return None
+
+        return {
+            "language": meta["language"],
+            "engine": meta.get("engine", DEFAULT_ENGINE),
+            "incremental_rows": meta.get("incremental_rows", 0),
+            "arrays": arrays,
+        }
+
+    @contextmanager
+    def training_lock(self, tenant_id: str) -> Iterator[None]:
+        """
+        Lock exclusivo entre processos para treinar e publicar o modelo de um tenant
+
+        Usado no modo multi-worker: o primeiro worker treina e publica o
+        artefato; os demais aguardam o lock e encontram o artefato pronto.
+        Sem suporte a fcntl, o lock não tem efeito.
+        """
+        if not self.enabled or fcntl is None:
+            yield
+            return
+
+        tenant_dir = self._tenant_dir(tenant_id)
+        os.makedirs(tenant_dir, exist_ok=True)
+        with open(os.path.join(tenant_dir, LOCK_FILE), "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def remove(self, tenant_id: str):
+        """Remove todos os artefatos de um tenant"""
+        if not self.enabled:
+            return
+        shutil.rmtree(self._tenant_dir(tenant_id), ignore_errors=True)
+        legacy_dir = self._legacy_tenant_dir(tenant_id)
+        if legacy_dir is not None:
+            shutil.rmtree(legacy_dir, ignore_errors=True)
+
+    def _remove_other_artifacts(self, tenant_id: str, keep: str):
+        """Remove artefatos antigos de um tenant, mantendo apenas 'keep'"""
+        tenant_dir = self._tenant_dir(tenant_id)
+        try:
+            entries = os.listdir(tenant_dir)
+        except OSError:
+            return
+        for entry in entries:
+            if entry != keep and not entry.startswith("."):
+                shutil.rmtree(os.path.join(tenant_dir, entry), ignore_errors=True)
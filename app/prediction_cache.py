@@ -0,0 +1,89 @@
+"""
+Cache de predições por tenant.
+Mensagens repetidas retornam a classificação já calculada, sem passar
+novamente pelo TF-IDF e pelo Naive Bayes.
+"""
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+import threading
+import time
+
+from .preprocessing import fold_text
+
+
+def normalize_message(message: str) -> str:
+    """
+    Normaliza a mensagem da mesma forma que o vetorizador
+
+    Minúsculas e remoção de acentos (strip_accents='unicode'): mensagens com
+    a mesma forma normalizada geram exatamente o mesmo vetor TF-IDF.
+    """
+    return fold_text(message)
+
+
+class CacheStats:
+    """Contadores de acertos e falhas compartilhados por todos os caches"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def record(self, hit: bool):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def as_dict(self) -> Dict[str, int]:
+        return {"cache_hits": self.hits, "cache_misses": self.misses}
+
+
+# Contadores globais de todos os caches de predição
+cache_stats = CacheStats()
+
+
+class PredictionCache:
+    """
+    Cache LRU com expiração (TTL) de predições de um modelo
+
+    Cada TenantModel tem seu próprio cache; como todo retreino ou
+    atualização produz um novo TenantModel, o cache é descartado junto
+    com o modelo antigo.
+    """
+
+    def __init__(self, max_size: int, ttl_seconds: float):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[float, Tuple[str, float]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Tuple[str, float]]:
+        """Obtém a predição em cache, ou None se ausente ou expirada"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, prediction = entry
+                if expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    cache_stats.record(hit=True)
+                    return prediction
+                del self._entries[key]
+        cache_stats.record(hit=False)
+        return None
+
+    def put(self, key: str, prediction: Tuple[str, float]):
+        """Armazena uma predição, descartando a menos usada se o cache estiver cheio"""
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, prediction)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
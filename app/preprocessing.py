@@ -0,0 +1,137 @@
+"""
+Pré-processamento de texto compartilhado por idioma.
+Cada idioma tem um único LanguagePreprocessor por processo, com as stopwords
+em um frozenset e o tokenizador já compilado; todos os tenants do idioma
+usam a mesma instância em vez de carregar e guardar suas próprias cópias.
+Minúsculas e remoção de acentos são feitas em uma única passada de
+str.translate, com o mesmo resultado do scikit-learn.
+"""
+from typing import Dict, FrozenSet, List
+import logging
+import re
+import sys
+import threading
+import unicodedata
+
+from .stopwords import load_stopwords, resolve_language
+
+logger = logging.getLogger(__name__)
+
+# Mesmo padrão de tokens do TfidfVectorizer (palavras com 2+ caracteres)
+TOKEN_PATTERN = r"(?u)\b\w\w+\b"
+
+# Caracteres cuja forma minúscula depende do contexto (sigma final do grego);
+# textos com eles usam o caminho exato em vez da tabela por caractere
+_CONTEXT_SENSITIVE = "\u03a3"
+
+# Acima deste code point os resultados não são guardados na tabela, para
+# limitar o tamanho dela
+_FOLD_CACHE_LIMIT = 0x10000
+
+_registry: Dict[str, "LanguagePreprocessor"] = {}
+_registry_lock = threading.Lock()
+
+
+def strip_accents(text: str) -> str:
+    """Remove acentos como strip_accents='unicode' do scikit-learn (NFKD sem marcas combinantes)"""
+    if text.isascii():
+        return text
+    normalized = unicodedata.normalize("NFKD", text)
+    return "".join([char for char in normalized if not unicodedata.combining(char)])
+
+
+class _FoldTable(dict):
+    """
+    Tabela de str.translate com a forma minúscula e sem acentos de cada caractere
+
+    É preenchida sob demanda. Fora do sigma final, tanto lower() quanto a
+    decomposição NFKD agem caractere a caractere, e a reordenação canônica
+    só move marcas combinantes, que são descartadas. Por isso traduzir
+    caractere a caractere dá o mesmo resultado que processar o texto inteiro.
+    """
+
+    def __missing__(self, codepoint: int) -> str:
+        folded = strip_accents(chr(codepoint).lower())
+        if codepoint < _FOLD_CACHE_LIMIT:
+            self[codepoint] = folded
+        return folded
+
+
+_FOLD_TABLE = _FoldTable()
+
+
+def fold_text(text: str) -> str:
+    """
+    Converte para minúsculas e remove acentos, como lowercase + strip_accents='unicode'
+
+    Textos ASCII usam apenas lower(); os demais passam uma única vez por
+    str.translate, exceto os que contêm caracteres sensíveis ao contexto.
+    """
+    if text.isascii():
+        return text.lower()
+    if _CONTEXT_SENSITIVE in text:
+        return strip_accents(text.lower())
+    return text.translate(_FOLD_TABLE)
+
+
+class LanguagePreprocessor:
+    """
+    Analisador de texto de um idioma, equivalente ao analisador padrão do TfidfVectorizer
+
+    Aplica minúsculas, remoção de acentos, tokenização e remoção de
+    stopwords, na mesma ordem do scikit-learn, e pode ser passado
+    diretamente como 'analyzer' do vetorizador. Ao ser serializado (pickle),
+    é reconstruído pelo registro do processo de destino.
+    """
+
+    def __init__(self, language: str, stop_words: FrozenSet[str]):
+        self.language = language
+        self.stop_words = stop_words
+        self._findall = re.compile(TOKEN_PATTERN).findall
+
+    def preprocess(self, text: str) -> str:
+        """Converte para minúsculas e remove acentos"""
+        return fold_text(text)
+
+    def tokenize(self, text: str) -> List[str]:
+        """Divide o texto já normalizado em tokens"""
+        return self._findall(text)
+
+    def __call__(self, text: str) -> List[str]:
+        """Retorna os tokens do texto, sem stopwords"""
+        stop_words = self.stop_words
+        return [token for token in self._findall(fold_text(text)) if token not in stop_words]
+
+    def __reduce__(self):
+        return get_preprocessor, (self.language,)
+
+    def __repr__(self) -> str:
+        return f"LanguagePreprocessor({self.language!r}, {len(self.stop_words)} stopwords)"
+
+
+def _load_stop_words(language: str) -> FrozenSet[str]:
+    """Carrega as stopwords do idioma como um frozenset de strings internadas"""
+    try:
+        words = load_stopwords(language)
+    except Exception as e:
+        logger.warning(f"Idioma '{language}' não suportado, usando lista vazia de stopwords. Erro: {e}")
+        return frozenset()
+    return frozenset(sys.intern(word) for word in words)
+
+
+def get_preprocessor(language: str) -> LanguagePreprocessor:
+    """
+    Obtém o pré-processador compartilhado de um idioma, criando-o no primeiro uso
+
+    Idiomas com o mesmo corpus de stopwords (ex.: "português" e
+    "portuguese") compartilham a mesma instância.
+    """
+    name = resolve_language(language)
+    preprocessor = _registry.get(name)
+    if preprocessor is None:
+        with _registry_lock:
+            preprocessor = _registry.get(name)
+            if preprocessor is None:
+                preprocessor = LanguagePreprocessor(name, _load_stop_words(name))
+                _registry[name] = preprocessor
+    return preprocessor
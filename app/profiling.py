@@ -0,0 +1,155 @@
+"""
+Perfil de tempo por etapa das requisições.
+Com PROFILING_ENABLED, uma fração das requisições (PROFILING_SAMPLE_RATE)
+mede o tempo de cada etapa da classificação (busca do tenant, verificação
+de versão do modelo, treino em linha, vetorização e pontuação) e devolve os
+tempos no header Server-Timing. Uma fração das requisições perfiladas
+(PROFILING_LOG_SAMPLE_RATE) também é registrada em log, em JSON.
+Fora das requisições perfiladas, stage() não mede nada.
+"""
+from contextlib import nullcontext
+from contextvars import ContextVar
+from typing import Dict, Optional
+import json
+import logging
+import random
+import time
+
+logger = logging.getLogger(__name__)
+
+_NOOP = nullcontext()
+
+
+class RequestProfile:
+    """Tempos acumulados por etapa de uma requisição, em segundos"""
+
+    __slots__ = ("stages", "tenant_id")
+
+    def __init__(self):
+        self.stages: Dict[str, float] = {}
+        self.tenant_id: Optional[str] = None
+
+    def add(self, name: str, seconds: float):
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def stage(self, name: str) -> "_Stage":
+        """Context manager que mede uma etapa deste perfil"""
+        return _Stage(self, name)
+
+    def server_timing(self, total: float) -> str:
+        """Valor do header Server-Timing, com as durações em milissegundos"""
+        entries = [f"{name};dur={seconds * 1000:.3f}" for name, seconds in self.stages.items()]
+        entries.append(f"total;dur={total * 1000:.3f}")
+        return ", ".join(entries)
+
+
+_current_profile: ContextVar[Optional[RequestProfile]] = ContextVar("request_profile", default=None)
+
+
+class _Stage:
+    """Mede o tempo de um bloco e o soma à etapa do perfil"""
+
+    __slots__ = ("_profile", "_name", "_start")
+
+    def __init__(self, profile: RequestProfile, name: str):
+        self._profile = profile
+        self._name = name
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._profile.add(self._name, time.perf_counter() - self._start)
+        return False
+
+
+def current() -> Optional[RequestProfile]:
+    """Perfil da requisição em andamento, ou None se ela não estiver sendo perfilada"""
+    return _current_profile.get()
+
+
+def stage(name: str):
+    """
+    Context manager que mede uma etapa da requisição em andamento
+
+    Sem uma requisição perfilada, devolve um context manager vazio. Em
+    trechos muito curtos e frequentes, teste current() uma vez e mantenha
+    um caminho separado sem medição.
+
+    Args:
+        name: Nome da etapa no header Server-Timing (ex.: "vectorize")
+    """
+    profile = _current_profile.get()
+    if profile is None:
+        return _NOOP
+    return _Stage(profile, name)
+
+
+def set_request_tenant(tenant_id: str):
+    """Registra o tenant da requisição perfilada em andamento, para o log"""
+    profile = _current_profile.get()
+    if profile is not None:
+        profile.tenant_id = tenant_id
+
+
+def detach():
+    """
+    Desassocia o contexto atual da requisição perfilada
+
+    Usado por tarefas que atendem várias requisições (ex.: um micro-lote),
+    cujo tempo não deve ser atribuído à requisição que as criou.
+    """
+    _current_profile.set(None)
+
+
+class ProfilingMiddleware:
+    """
+    Middleware ASGI que perfila uma amostra das requisições HTTP
+
+    O header Server-Timing é adicionado ao início da resposta; etapas que
+    terminam depois disso (ex.: em respostas de streaming) aparecem apenas
+    no log.
+    """
+
+    def __init__(self, app, sample_rate: float = 1.0, log_sample_rate: float = 0.0):
+        self.app = app
+        self.sample_rate = sample_rate
+        self.log_sample_rate = log_sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or random.random() >= self.sample_rate:
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status_code = 500
+        profile = RequestProfile()
+        token = _current_profile.set(profile)
+
+        async def send_with_timing(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                header = profile.server_timing(time.perf_counter() - start)
+                message = {
+                    **message,
+                    "headers": list(message.get("headers", [])) + [(b"server-timing", header.encode("latin-1"))],
+                }
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current_profile.reset(token)
+            if self.log_sample_rate > 0 and random.random() < self.log_sample_rate:
+                route = scope.get("route")
+                logger.info(json.dumps({
+                    "event": "request_profile",
+                    "method": scope["method"],
+                    "path": getattr(route, "path", scope["path"]),
+                    "status": status_code,
+                    "tenant_id": profile.tenant_id,
+                    "total_ms": round((time.perf_counter() - start) * 1000, 3),
+                    "stages_ms": {name: round(seconds * 1000, 3) for name, seconds in profile.stages.items()},
+                }, ensure_ascii=False))
@@ -0,0 +1,312 @@
+"""
+Pontuação compilada de modelos TF-IDF + Multinomial Naive Bayes.
+Após o treino, o modelo de cada tenant é convertido em arrays NumPy simples
+e a classificação de uma mensagem vira um produto esparso e um log-sum-exp,
+sem as camadas de validação de transform/predict_proba do scikit-learn.
+
+A representação é compacta: o vocabulário fica em um único buffer UTF-8
+(sem um objeto str e uma entrada de dicionário por termo), e o IDF e as
+log-probabilidades são guardados em float32.
+
+Com o engine "hashing", as colunas vêm de feature hashing (HashedFeatures):
+não há vocabulário nem IDF, e o número de colunas é fixo.
+"""
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Union
+import zlib
+
+import numpy as np
+
+# Engines de vetorização aceitos por tenant; "tfidf" é o padrão
+ENGINES = ("tfidf", "hashing")
+DEFAULT_ENGINE = "tfidf"
+
+
+class Vocabulary:
+    """
+    Vocabulário compacto: termo -> coluna
+
+    Os termos ficam concatenados em um buffer UTF-8, na ordem das colunas,
+    com o deslocamento de cada um. A busca usa um índice ordenado com o
+    hash() de 64 bits de cada termo e a coluna correspondente, construído
+    ao carregar o vocabulário (o hash de str muda entre processos, então o
+    índice não é persistido). Dois termos com o mesmo hash de 64 bits, algo
+    improvável na prática, seriam confundidos.
+    """
+
+    __slots__ = ("term_bytes", "term_offsets", "_hashes", "_columns")
+
+    def __init__(self, term_bytes: np.ndarray, term_offsets: np.ndarray):
+        self.term_bytes = term_bytes
+        self.term_offsets = term_offsets
+        hashes = np.fromiter(map(hash, self.terms()), dtype=np.int64, count=len(self))
+        order = np.argsort(hashes, kind="stable")
+        self._hashes = hashes[order]
+        self._columns = order.astype(np.int32)
+
+    @classmethod
+    def from_terms(cls, terms: Sequence[str]) -> "Vocabulary":
+        """Cria o vocabulário a partir dos termos na ordem das colunas"""
+        encoded = [term.encode("utf-8") for term in terms]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int32)
+        np.cumsum([len(term) for term in encoded], out=offsets[1:])
+        return cls(np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets)
+
+    @classmethod
+    def from_mapping(cls, vocabulary: Dict[str, int]) -> "Vocabulary":
+        """Cria o vocabulário a partir de um dicionário termo -> coluna (ex.: vocabulary_)"""
+        terms = [""] * len(vocabulary)
+        for term, column in vocabulary.items():
+            terms[column] = term
+        return cls.from_terms(terms)
+
+    def __len__(self) -> int:
+        return len(self.term_offsets) - 1
+
+    def terms(self) -> List[str]:
+        """Termos na ordem das colunas"""
+        data = self.term_bytes.tobytes()
+        offsets = self.term_offsets.tolist()
+        return [data[start:end].decode("utf-8") for start, end in zip(offsets, offsets[1:])]
+
+    def lookup(self, tokens: List[str]) -> np.ndarray:
+        """Colunas dos tokens presentes no vocabulário (tokens desconhecidos são ignorados)"""
+        if not tokens or not len(self._hashes):
+            return np.empty(0, dtype=np.int32)
+        hashes = np.fromiter(map(hash, tokens), dtype=np.int64, count=len(tokens))
+        positions = np.searchsorted(self._hashes, hashes)
+        positions[positions == len(self._hashes)] = 0
+        return self._columns[positions[self._hashes[positions] == hashes]]
+
+    def index_nbytes(self) -> int:
+        """Bytes do índice de busca, que sempre pertence ao processo"""
+        return self._hashes.nbytes + self._columns.nbytes
+
+    def arrays(self) -> Dict[str, np.ndarray]:
+        """Arrays que definem o vocabulário, no formato salvo pelo ModelStore"""
+        return {"term_bytes": self.term_bytes, "term_offsets": self.term_offsets}
+
+
+class HashedFeatures:
+    """
+    Colunas por feature hashing, sem vocabulário: CRC32 do termo em UTF-8 módulo n_features
+
+    O CRC32 é o mesmo em todos os processos, então modelos treinados no
+    pool de processos ou salvos em disco usam as mesmas colunas. Termos
+    diferentes podem cair na mesma coluna; quanto maior n_features, menos
+    colisões e mais memória (classes x n_features log-probabilidades).
+    """
+
+    __slots__ = ("n_features",)
+
+    def __init__(self, n_features: int):
+        if n_features <= 0:
+            raise ValueError(f"Número de features inválido: {n_features}")
+        self.n_features = n_features
+
+    def __len__(self) -> int:
+        return self.n_features
+
+    def lookup(self, tokens: List[str]) -> np.ndarray:
+        """Coluna de cada token (todo token tem uma coluna)"""
+        hashes = np.fromiter(
+            (zlib.crc32(token.encode("utf-8")) for token in tokens), dtype=np.int64, count=len(tokens)
+        )
+        return hashes % self.n_features
+
+    def index_nbytes(self) -> int:
+        return 0
+
+    def arrays(self) -> Dict[str, np.ndarray]:
+        # O número de colunas é o de feature_log_prob
+        return {}
+
+
+def term_weights(columns: np.ndarray, idf: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Pesos normalizados (l2) de uma mensagem a partir das colunas dos seus tokens
+
+    Colunas repetidas são somadas (frequência do termo) e, com 'idf',
+    multiplicadas pelo IDF da coluna.
+
+    Returns:
+        Tupla (colunas distintas, pesos)
+    """
+    if columns.size == 0:
+        return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.float64)
+
+    counts: Dict[int, int] = {}
+    for column in columns.tolist():
+        counts[column] = counts.get(column, 0) + 1
+    columns = np.fromiter(counts.keys(), dtype=np.intp, count=len(counts))
+    values = np.fromiter(counts.values(), dtype=np.float64, count=len(counts))
+    if idf is not None:
+        values *= idf[columns]
+    values /= np.sqrt(np.dot(values, values))
+    return columns, values
+
+
+def vectorize(
+    analyzer: Callable[[str], List[str]],
+    vocabulary: Union[Vocabulary, HashedFeatures],
+    messages: Sequence[str],
+    idf: Optional[np.ndarray] = None
+):
+    """
+    Matriz esparsa (CSR) com os pesos de term_weights, uma linha por mensagem
+
+    Com um Vocabulary e o IDF, equivale a TfidfVectorizer.transform; com
+    HashedFeatures e sem IDF, a HashingVectorizer(alternate_sign=False).
+    """
+    from scipy import sparse
+
+    indptr = np.zeros(len(messages) + 1, dtype=np.int64)
+    indices: List[np.ndarray] = []
+    data: List[np.ndarray] = []
+    for row, message in enumerate(messages):
+        columns, values = term_weights(vocabulary.lookup(analyzer(message)), idf)
+        indices.append(columns)
+        data.append(values)
+        indptr[row + 1] = indptr[row] + columns.size
+
+    return sparse.csr_matrix(
+        (
+            np.concatenate(data) if data else np.empty(0),
+            np.concatenate(indices) if indices else np.empty(0, dtype=np.intp),
+            indptr,
+        ),
+        shape=(len(messages), len(vocabulary))
+    )
+
+
+class CompiledScorer:
+    """
+    Pontuador enxuto equivalente a TfidfVectorizer.transform + MultinomialNB.predict_proba
+
+    Reproduz a configuração usada no treino (tf bruto, idf suavizado e
+    normalização l2) usando o próprio analisador do vetorizador. O IDF e as
+    log-probabilidades ficam em float32, então as probabilidades coincidem
+    com as do scikit-learn até a precisão de float32 (cerca de 1e-6).
+    Com HashedFeatures no lugar do vocabulário e idf None, pontua modelos
+    do engine "hashing".
+    """
+
+    __slots__ = ("_analyzer", "vocabulary", "_idf", "_feature_log_prob", "_class_log_prior", "classes")
+
+    def __init__(
+        self,
+        analyzer: Callable[[str], List[str]],
+        vocabulary: Union[Vocabulary, HashedFeatures],
+        idf: Optional[np.ndarray],
+        feature_log_prob: np.ndarray,
+        class_log_prior: np.ndarray,
+        classes: np.ndarray
+    ):
+        self._analyzer = analyzer
+        self.vocabulary = vocabulary
+        self._idf = np.ascontiguousarray(idf, dtype=np.float32) if idf is not None else None
+        self._feature_log_prob = np.ascontiguousarray(feature_log_prob, dtype=np.float32)
+        self._class_log_prior = np.ascontiguousarray(class_log_prior, dtype=np.float64)
+        self.classes = np.asarray(classes)
+
+    @classmethod
+    def from_model(cls, vectorizer, model) -> "CompiledScorer":
+        """Compila um TfidfVectorizer e um MultinomialNB já treinados"""
+        # Um analisador próprio (ex.: o pré-processador do idioma) é usado
+        # diretamente, sem o invólucro de decodificação do scikit-learn
+        analyzer = vectorizer.analyzer if callable(vectorizer.analyzer) else vectorizer.build_analyzer()
+        return cls(
+            analyzer=analyzer,
+            vocabulary=Vocabulary.from_mapping(vectorizer.vocabulary_),
+            idf=vectorizer.idf_,
+            feature_log_prob=model.feature_log_prob_,
+            class_log_prior=model.class_log_prior_,
+            classes=model.classes_,
+        )
+
+    def with_model(
+        self,
+        feature_log_prob: np.ndarray,
+        class_log_prior: np.ndarray,
+        classes: np.ndarray
+    ) -> "CompiledScorer":
+        """Novo pontuador com outras estatísticas do Naive Bayes, compartilhando vocabulário e IDF"""
+        return CompiledScorer(self._analyzer, self.vocabulary, self._idf, feature_log_prob, class_log_prior, classes)
+
+    def arrays(self) -> Dict[str, np.ndarray]:
+        """Arrays que definem o pontuador, no formato salvo pelo ModelStore"""
+        arrays = self.vocabulary.arrays()
+        if self._idf is not None:
+            arrays["idf"] = self._idf
+        arrays["feature_log_prob"] = self._feature_log_prob
+        arrays["class_log_prior"] = self._class_log_prior
+        arrays["classes"] = self.classes.astype(str)
+        return arrays
+
+    @property
+    def n_features(self) -> int:
+        return len(self.vocabulary)
+
+    def features(self, message: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Retorna as colunas e os pesos TF-IDF normalizados da mensagem"""
+        return term_weights(self.vocabulary.lookup(self._analyzer(message)), self._idf)
+
+    def transform(self, messages: Sequence[str]):
+        """
+        Matriz TF-IDF esparsa (CSR) das mensagens, uma linha por mensagem
+
+        Equivalente a TfidfVectorizer.transform com o vocabulário e o IDF do
+        pontuador.
+        """
+        return vectorize(self._analyzer, self.vocabulary, messages, self._idf)
+
+    def joint_log_likelihood(self, message: str) -> np.ndarray:
+        """Log-verossimilhança conjunta de cada classe para a mensagem"""
+        return self._joint_log_likelihood(*self.features(message))
+
+    def _joint_log_likelihood(self, columns: np.ndarray, values: np.ndarray) -> np.ndarray:
+        if columns.size == 0:
+            return self._class_log_prior.copy()
+        return self._class_log_prior + self._feature_log_prob[:, columns] @ values
+
+    def predict_proba(self, message: str) -> np.ndarray:
+        """Probabilidade de cada classe, na ordem de 'classes'"""
+        return _softmax(self.joint_log_likelihood(message))
+
+    def predict_proba_matrix(self, X) -> np.ndarray:
+        """Probabilidades para uma matriz TF-IDF (uma linha por mensagem)"""
+        jll = np.asarray(X @ self._feature_log_prob.T) + self._class_log_prior
+        return _softmax(jll)
+
+    def top_k(self, message: str, k: int = 1) -> List[Tuple[str, float]]:
+        """
+        Retorna as k classes mais prováveis, da maior para a menor probabilidade
+
+        Usa argpartition para selecionar as k maiores sem ordenar todas as classes.
+        """
+        return self.top_k_features(self.features(message), k)
+
+    def top_k_features(self, features: Tuple[np.ndarray, np.ndarray], k: int = 1) -> List[Tuple[str, float]]:
+        """Como top_k, a partir das features já calculadas por features()"""
+        probs = _softmax(self._joint_log_likelihood(*features))
+        k = max(1, min(k, probs.size))
+        if k == 1:
+            # argmax mantém o desempate pela primeira classe, como o max() original
+            best = np.array([probs.argmax()])
+        elif k < probs.size:
+            best = np.argpartition(-probs, k - 1)[:k]
+        else:
+            best = np.arange(probs.size)
+        best = best[np.argsort(-probs[best], kind="stable")]
+        return [(self.classes[index], float(probs[index])) for index in best]
+
+    def memory_bytes(self) -> int:
+        """Memória ocupada pelos arrays do pontuador e pelo índice do vocabulário"""
+        return sum(array.nbytes for array in self.arrays().values()) + self.vocabulary.index_nbytes()
+
+
+def _softmax(jll: np.ndarray) -> np.ndarray:
+    """Converte log-verossimilhanças em probabilidades via log-sum-exp estável"""
+    shifted = jll - jll.max(axis=-1, keepdims=True)
+    probs = np.exp(shifted)
+    probs /= probs.sum(axis=-1, keepdims=True)
+    return probs
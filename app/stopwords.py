@@ -0,0 +1,80 @@
+"""
+Carregamento das stopwords por idioma.
+As stopwords são lidas do cache local do NLTK (diretórios de NLTK_DATA)
+sem importar o NLTK; o download pela rede só é tentado se o modo offline
+estiver desativado e o corpus não estiver disponível localmente.
+"""
+from typing import List, Optional
+import logging
+import os
+import threading
+
+from . import config
+
+logger = logging.getLogger(__name__)
+
+# Suporta vários idiomas comuns
+LANGUAGE_MAP = {
+    "portuguese": "portuguese",
+    "português": "portuguese",
+    "english": "english",
+    "inglês": "english",
+    "espanol": "spanish",
+    "espanhol": "spanish",
+    "french": "french",
+    "francês": "french",
+}
+
+_download_lock = threading.Lock()
+_download_attempted = False
+
+
+def resolve_language(language: str) -> str:
+    """Converte o idioma do tenant no nome do corpus de stopwords do NLTK"""
+    return LANGUAGE_MAP.get(language.lower(), language.lower())
+
+
+def _read_local(nltk_lang: str) -> Optional[List[str]]:
+    """Lê o arquivo de stopwords descompactado de um dos diretórios de dados locais"""
+    for data_dir in config.NLTK_DATA_DIRS:
+        path = os.path.join(data_dir, "corpora", "stopwords", nltk_lang)
+        if os.path.isfile(path):
+            with open(path, encoding="utf-8") as f:
+                # Mesmo critério do WordListCorpusReader: descarta linhas em branco
+                return [line for line in f.read().splitlines() if line.rstrip()]
+    return None
+
+
+def _load_with_nltk(nltk_lang: str) -> List[str]:
+    """Carrega as stopwords pelo NLTK, baixando o corpus uma única vez se permitido"""
+    global _download_attempted
+    
+    import nltk
+    from nltk.corpus import stopwords
+    
+    try:
+        return stopwords.words(nltk_lang)
+    except LookupError:
+        if config.NLTK_OFFLINE:
+            raise
+    
+    with _download_lock:
+        if not _download_attempted:
+            _download_attempted = True
+            nltk.download("stopwords", quiet=True)
+    return stopwords.words(nltk_lang)
+
+
+def load_stopwords(language: str) -> List[str]:
+    """
+    Obtém as stopwords para o idioma especificado
+    
+    Raises:
+        LookupError: se o corpus não estiver disponível (modo offline)
+        OSError: se o idioma não existir no corpus
+    """
+    nltk_lang = resolve_language(language)
+    words = _read_local(nltk_lang)
+    if words is not None:
+        return words
+    return _load_with_nltk(nltk_lang)
@@ -1,36 +1,264 @@
 """
 Gerenciador de tenants para o sistema multi-tenant.
 Cada tenant possui suas próprias phrases, labels e idioma.
+
+Cada TenantConfig é um snapshot imutável de uma versão do tenant: toda
+alteração cria e valida um novo snapshot e só então o publica, trocando a
+referência no dicionário de tenants. Leitores não usam locks e nunca veem
+uma alteração pela metade.
 """
-from typing import Dict, List, Optional
-from dataclasses import dataclass, field
+from collections import Counter
+from types import MappingProxyType
+from typing import Callable, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+from dataclasses import dataclass, field, replace
 from datetime import datetime
+import bisect
+import itertools
+import threading
+
+from . import config
+from .model_store import rebase_fingerprint, training_fingerprint, update_fingerprint
+from .scorer import DEFAULT_ENGINE, ENGINES
+from .tenant_storage import StaleTenantError, TenantStorage, create_storage
+
+# Quantidade máxima de alterações incrementais guardadas por tenant
+MAX_CHANGE_LOG = 16
+
+# Contador global de versões: cada criação ou atualização de tenant recebe um
+# número maior que todos os anteriores, inclusive entre tenants diferentes
+_version_counter = itertools.count(1)
+
+
+def next_version() -> int:
+    """Retorna a próxima versão de configuração de tenant"""
+    return next(_version_counter)
+
+
+def advance_versions(last_version: int):
+    """Garante que as próximas versões sejam maiores que last_version (ex.: versões persistidas)"""
+    global _version_counter
+    _version_counter = itertools.count(max(next(_version_counter), last_version + 1))
+
+
+@dataclass(frozen=True)
+class TenantChange:
+    """Alteração incremental de phrases entre duas versões de um tenant"""
+    base_version: int
+    version: int
+    added: Tuple[Tuple[str, str], ...] = ()
+    removed: Tuple[Tuple[str, str], ...] = ()
+
+    def __post_init__(self):
+        object.__setattr__(self, "added", tuple(self.added))
+        object.__setattr__(self, "removed", tuple(self.removed))
 
 
-@dataclass
+@dataclass(frozen=True)
 class TenantConfig:
-    """Configuração de um tenant"""
+    """
+    Snapshot imutável da configuração de um tenant em uma versão
+    
+    phrases e labels são tuplas validadas juntas na criação, então quem
+    tem um snapshot sempre vê um par consistente. Com um armazenamento
+    durável, phrases e labels ficam como None e apenas o cabeçalho
+    (contagens de phrases por label e impressão digital) fica em memória;
+    os dados de treinamento são lidos sob demanda por training_data(), que
+    confere se o armazenamento ainda está na versão do snapshot. Se outro
+    processo alterou o tenant, latest() obtém o snapshot gravado.
+    
+    O cabeçalho (phrase_count, label_counts e fingerprint) é calculado das
+    phrases quando fingerprint não é informado; quem já o tem, como
+    modify_phrases, informa os três e evita percorrer o corpus.
+    
+    engine escolhe a vetorização do modelo: "tfidf" (padrão, com
+    vocabulário) ou "hashing" (feature hashing, sem vocabulário).
+    """
     tenant_id: str
     language: str = "portuguese"
-    phrases: List[str] = field(default_factory=list)
-    labels: List[str] = field(default_factory=list)
+    phrases: Optional[Sequence[str]] = ()
+    labels: Optional[Sequence[str]] = ()
+    engine: str = DEFAULT_ENGINE
     created_at: datetime = field(default_factory=datetime.now)
     updated_at: datetime = field(default_factory=datetime.now)
+    version: int = field(default_factory=next_version)
+    changes: Tuple[TenantChange, ...] = ()
+    phrase_count: int = 0
+    label_counts: Mapping[str, int] = field(default_factory=dict)
+    fingerprint: str = ""
+    loader: Optional[Callable[[str, int], Tuple[List[str], List[str]]]] = field(
+        default=None, repr=False, compare=False
+    )
+    refresher: Optional[Callable[[str], Optional["TenantConfig"]]] = field(
+        default=None, repr=False, compare=False
+    )
 
     def __post_init__(self):
-        """Valida que phrases e labels tenham o mesmo tamanho"""
-        if len(self.phrases) != len(self.labels):
+        """Valida o engine e que phrases e labels tenham o mesmo tamanho, e calcula o cabeçalho"""
+        if self.engine not in ENGINES:
+            raise ValueError(f"Engine inválido: '{self.engine}' (use {' ou '.join(ENGINES)})")
+        # Os campos são atribuídos aqui, antes de o snapshot ser publicado
+        set_field = object.__setattr__
+        set_field(self, "changes", tuple(self.changes))
+        if self.phrases is None and self.labels is None:
+            set_field(self, "label_counts", MappingProxyType(dict(self.label_counts)))
+            return
+        phrases = tuple(self.phrases or ())
+        labels = tuple(self.labels or ())
+        if len(phrases) != len(labels):
             raise ValueError(
-                f"O número de phrases ({len(self.phrases)}) deve ser igual ao número de labels ({len(self.labels)})"
+                f"O número de phrases ({len(phrases)}) deve ser igual ao número de labels ({len(labels)})"
             )
+        set_field(self, "phrases", phrases)
+        set_field(self, "labels", labels)
+        set_field(self, "phrase_count", len(phrases))
+        if self.fingerprint:
+            set_field(self, "label_counts", MappingProxyType(dict(self.label_counts)))
+        else:
+            set_field(self, "label_counts", MappingProxyType(dict(Counter(labels))))
+            set_field(self, "fingerprint", training_fingerprint(self.language, phrases, labels, self.engine))
+
+    def training_data(self) -> Tuple[Sequence[str], Sequence[str]]:
+        """
+        Retorna phrases e labels, lendo-as do armazenamento se não estiverem em memória
+        
+        Raises:
+            StaleTenantError: se o tenant foi alterado ou removido depois deste snapshot
+        """
+        if self.phrases is not None:
+            return self.phrases, self.labels
+        if self.loader is None:
+            return (), ()
+        return self.loader(self.tenant_id, self.version)
+
+    def latest(self) -> Optional["TenantConfig"]:
+        """
+        Retorna o snapshot gravado mais recente do tenant, publicando-o no gerenciador
+        
+        Sem armazenamento durável, retorna o próprio snapshot.
+        
+        Returns:
+            Snapshot mais recente, ou None se o tenant foi removido
+        """
+        if self.refresher is None:
+            return self
+        return self.refresher(self.tenant_id)
+
+
+def _remove_pairs(
+    phrases: Sequence[str],
+    labels: Sequence[str],
+    remove: Sequence[Tuple[str, str]],
+    tenant_id: str
+) -> Tuple[Tuple[str, ...], Tuple[str, ...]]:
+    """
+    Remove a primeira ocorrência de cada par de 'remove', sem percorrer o corpus em Python
+    
+    Raises:
+        ValueError: se algum par não existir no tenant
+    """
+    removed = set()
+    for phrase, label in remove:
+        start = 0
+        while True:
+            try:
+                index = phrases.index(phrase, start)
+            except ValueError:
+                raise ValueError(
+                    f"Phrase '{phrase}' com label '{label}' não encontrada no tenant '{tenant_id}'"
+                ) from None
+            if labels[index] == label and index not in removed:
+                break
+            start = index + 1
+        removed.add(index)
+    
+    # Concatena os trechos entre as posições removidas
+    bounds = [-1, *sorted(removed), len(phrases)]
+    spans = list(zip(bounds, bounds[1:]))
+    return (
+        tuple(itertools.chain.from_iterable(phrases[a + 1:b] for a, b in spans)),
+        tuple(itertools.chain.from_iterable(labels[a + 1:b] for a, b in spans)),
+    )
+
+
+def _count_labels(
+    label_counts: Mapping[str, int],
+    added: Sequence[Tuple[str, str]],
+    removed: Sequence[Tuple[str, str]]
+) -> Dict[str, int]:
+    """Contagens de phrases por label após adicionar e remover pares"""
+    counts = Counter(label_counts)
+    counts.update(label for _, label in added)
+    counts.subtract(label for _, label in removed)
+    return {label: count for label, count in counts.items() if count > 0}
+
+
+def append_change(
+    changes: Iterable[TenantChange],
+    change: TenantChange
+) -> Tuple[TenantChange, ...]:
+    """Novo histórico de alterações com 'change' no final, limitado a MAX_CHANGE_LOG itens"""
+    return (tuple(changes) + (change,))[-MAX_CHANGE_LOG:]
 
 
 class TenantManager:
-    """Gerenciador de tenants em memória"""
+    """
+    Gerenciador de tenants
+    
+    Os cabeçalhos dos tenants ficam em memória; cada alteração é gravada
+    no armazenamento configurado antes de ser publicada, trocando o
+    TenantConfig do tenant por um novo snapshot. Escritas são serializadas
+    por um lock; leituras (get_tenant, list_tenants) não usam esse lock.
     
-    def __init__(self):
+    Os IDs ficam também em uma lista ordenada, atualizada na criação e na
+    remoção, para que cada página da listagem custe O(log N + limit). Com um
+    armazenamento compartilhado entre processos, a listagem é paginada
+    diretamente no armazenamento.
+    """
+    
+    def __init__(self, storage: Optional[TenantStorage] = None):
+        self._storage = storage if storage is not None else create_storage(config.TENANT_DB_PATH)
         self._tenants: Dict[str, TenantConfig] = {}
-        self._initialize_default_tenant()
+        self._lock = threading.RLock()
+        # IDs em ordem, para a listagem paginada; protegidos por um lock próprio e breve
+        self._tenant_ids: List[str] = []
+        self._ids_lock = threading.Lock()
+        
+        for header in self._storage.load_tenants():
+            self._tenants[header["tenant_id"]] = self._from_header(header)
+        self._tenant_ids = sorted(self._tenants)
+        advance_versions(self._storage.max_version())
+        
+        if "default" not in self._tenants:
+            self._initialize_default_tenant()
+    
+    def _store_snapshot(self, tenant: TenantConfig):
+        """Publica o snapshot de um tenant, incluindo-o no índice ordenado se for novo; requer o lock"""
+        if tenant.tenant_id not in self._tenants:
+            with self._ids_lock:
+                bisect.insort(self._tenant_ids, tenant.tenant_id)
+        self._tenants[tenant.tenant_id] = tenant
+    
+    def _forget(self, tenant_id: str):
+        """Remove um tenant do dicionário e do índice ordenado; requer o lock"""
+        if self._tenants.pop(tenant_id, None) is not None:
+            with self._ids_lock:
+                index = bisect.bisect_left(self._tenant_ids, tenant_id)
+                if index < len(self._tenant_ids) and self._tenant_ids[index] == tenant_id:
+                    del self._tenant_ids[index]
+    
+    def _from_header(self, header: dict) -> TenantConfig:
+        """Cria um TenantConfig sem phrases em memória a partir de um cabeçalho armazenado"""
+        return TenantConfig(
+            phrases=None, labels=None, loader=self._storage.load_training_data, refresher=self.refresh_tenant, **header
+        )
+    
+    def _detach(self, tenant: TenantConfig) -> TenantConfig:
+        """Snapshot sem as phrases em memória, quando o armazenamento já as guarda"""
+        if self._storage.keeps_phrases_in_memory:
+            return tenant
+        return replace(
+            tenant, phrases=None, labels=None, loader=self._storage.load_training_data, refresher=self.refresh_tenant
+        )
     
     def _initialize_default_tenant(self):
         """Inicializa um tenant padrão com os dados originais"""
@@ -684,83 +912,337 @@ class TenantManager:
             phrases=default_phrases,
             labels=default_labels
         )
-        self._tenants["default"] = default_tenant
+        self._storage.insert_tenant(default_tenant, default_phrases, default_labels)
+        self._store_snapshot(self._detach(default_tenant))
     
     def create_tenant(
         self,
         tenant_id: str,
         language: str = "portuguese",
         phrases: Optional[List[str]] = None,
-        labels: Optional[List[str]] = None
+        labels: Optional[List[str]] = None,
+        engine: str = DEFAULT_ENGINE
     ) -> TenantConfig:
         """Cria um novo tenant"""
-        if tenant_id in self._tenants:
-            raise ValueError(f"Tenant '{tenant_id}' já existe")
+        with self._lock:
+            if self.tenant_exists(tenant_id):
+                raise ValueError(f"Tenant '{tenant_id}' já existe")
+            
+            tenant = TenantConfig(
+                tenant_id=tenant_id,
+                language=language,
+                engine=engine,
+                phrases=phrases or (),
+                labels=labels or ()
+            )
+            self._storage.insert_tenant(tenant, tenant.phrases, tenant.labels)
+            tenant = self._detach(tenant)
+            self._store_snapshot(tenant)
+            return tenant
+    
+    def create_tenants(self, definitions: Sequence[dict]) -> List[Tuple[Optional[TenantConfig], Optional[str]]]:
+        """
+        Cria vários tenants de uma vez, gravando-os em uma única operação no armazenamento
         
-        phrases = phrases or []
-        labels = labels or []
+        Definições inválidas ou de tenants que já existem (inclusive repetidos
+        no próprio lote) são recusadas individualmente, sem afetar as demais.
         
-        tenant = TenantConfig(
-            tenant_id=tenant_id,
-            language=language,
-            phrases=phrases,
-            labels=labels
-        )
-        self._tenants[tenant_id] = tenant
-        return tenant
+        Args:
+            definitions: Dicionários com tenant_id, language, engine (opcional), phrases e labels
+            
+        Returns:
+            Para cada definição, na mesma ordem, uma tupla (tenant criado, None)
+            ou (None, mensagem de erro)
+        """
+        results: List[Tuple[Optional[TenantConfig], Optional[str]]] = []
+        with self._lock:
+            batch_ids = set()
+            for definition in definitions:
+                tenant_id = definition["tenant_id"]
+                if tenant_id in batch_ids or self.tenant_exists(tenant_id):
+                    results.append((None, f"Tenant '{tenant_id}' já existe"))
+                    continue
+                try:
+                    tenant = TenantConfig(
+                        tenant_id=tenant_id,
+                        language=definition.get("language", "portuguese"),
+                        engine=definition.get("engine", DEFAULT_ENGINE),
+                        phrases=definition.get("phrases") or (),
+                        labels=definition.get("labels") or ()
+                    )
+                except ValueError as e:
+                    results.append((None, str(e)))
+                    continue
+                batch_ids.add(tenant_id)
+                results.append((tenant, None))
+            
+            self._storage.insert_tenants([tenant for tenant, _ in results if tenant is not None])
+            for index, (tenant, error) in enumerate(results):
+                if tenant is not None:
+                    tenant = self._detach(tenant)
+                    self._store_snapshot(tenant)
+                    results[index] = (tenant, None)
+        return results
     
     def get_tenant(self, tenant_id: str) -> Optional[TenantConfig]:
-        """Obtém um tenant pelo ID"""
-        return self._tenants.get(tenant_id)
+        """
+        Obtém um tenant pelo ID
+        
+        Com um armazenamento compartilhado entre processos, a versão gravada
+        é conferida a cada consulta (uma leitura pela chave primária) e o
+        snapshot é recarregado se outro processo criou, alterou ou removeu o
+        tenant, para que todos os workers usem a mesma configuração.
+        """
+        tenant = self._tenants.get(tenant_id)
+        if not self._storage.shared:
+            return tenant
+        if tenant is not None and self._storage.load_version(tenant_id) == tenant.version:
+            return tenant
+        return self.refresh_tenant(tenant_id)
+    
+    def refresh_tenant(self, tenant_id: str) -> Optional[TenantConfig]:
+        """
+        Recarrega o cabeçalho do tenant do armazenamento e o publica como o snapshot atual
+        
+        O snapshot em memória é mantido (com o seu histórico de alterações)
+        quando já está na versão gravada.
+        
+        Returns:
+            O snapshot atual, ou None se o tenant não existir mais
+        """
+        if not self._storage.shared:
+            return self._tenants.get(tenant_id)
+        # Sob o lock, para não ler o armazenamento no meio de uma escrita deste processo
+        with self._lock:
+            header = self._storage.load_tenant(tenant_id)
+            if header is None:
+                self._forget(tenant_id)
+                return None
+            return self._adopt(header)
+    
+    def _adopt(self, header: dict) -> TenantConfig:
+        """
+        Snapshot de um cabeçalho lido do armazenamento; requer o lock
+        
+        Mantém o snapshot em memória (com o seu histórico de alterações) se
+        ele já estiver na versão gravada; senão, publica o cabeçalho.
+        """
+        tenant = self._tenants.get(header["tenant_id"])
+        if tenant is None or tenant.version != header["version"]:
+            # Versões novas deste processo devem superar as gravadas pelos outros
+            advance_versions(header["version"])
+            tenant = self._from_header(header)
+            self._store_snapshot(tenant)
+        return tenant
     
     def update_tenant(
         self,
         tenant_id: str,
         language: Optional[str] = None,
         phrases: Optional[List[str]] = None,
-        labels: Optional[List[str]] = None
+        labels: Optional[List[str]] = None,
+        engine: Optional[str] = None
     ) -> TenantConfig:
         """Atualiza um tenant existente"""
-        tenant = self.get_tenant(tenant_id)
-        if not tenant:
-            raise ValueError(f"Tenant '{tenant_id}' não encontrado")
+        return self._write(
+            tenant_id, lambda tenant: self._update_snapshot(tenant, language, phrases, labels, engine)
+        )
+    
+    def _write(self, tenant_id: str, write: Callable[[TenantConfig], TenantConfig]) -> TenantConfig:
+        """
+        Aplica uma escrita ao snapshot atual do tenant, sob o lock
         
-        if language is not None:
-            tenant.language = language
-        if phrases is not None:
-            tenant.phrases = phrases
-        if labels is not None:
-            tenant.labels = labels
+        Se outro processo alterar o tenant entre a conferência de versão e a
+        leitura das phrases ou a gravação (que confere a versão de origem), a
+        escrita é repetida uma vez com o snapshot gravado.
+        
+        Raises:
+            ValueError: se o tenant não existir ou a escrita for inválida
+        """
+        with self._lock:
+            tenant = self.get_tenant(tenant_id)
+            for attempt in range(2):
+                if not tenant:
+                    raise ValueError(f"Tenant '{tenant_id}' não encontrado")
+                try:
+                    return write(tenant)
+                except StaleTenantError:
+                    if attempt:
+                        raise
+                    tenant = self.refresh_tenant(tenant_id)
+    
+    def _update_snapshot(
+        self,
+        tenant: TenantConfig,
+        language: Optional[str],
+        phrases: Optional[List[str]],
+        labels: Optional[List[str]],
+        engine: Optional[str]
+    ) -> TenantConfig:
+        """Corpo de update_tenant para um snapshot; requer o lock"""
+        tenant_id = tenant.tenant_id
+        language_changed = language is not None and language != tenant.language
+        engine_changed = engine is not None and engine != tenant.engine
+        model_changed = language_changed or engine_changed
+        data_changed = phrases is not None or labels is not None
+        version = next_version()
         
-        tenant.updated_at = datetime.now()
+        new_language = language if language is not None else tenant.language
+        new_engine = engine if engine is not None else tenant.engine
+        if data_changed:
+            old_phrases, old_labels = tenant.training_data()
+            new_phrases = phrases if phrases is not None else old_phrases
+            new_labels = labels if labels is not None else old_labels
+            fingerprint = ""
+        else:
+            new_phrases, new_labels = tenant.phrases, tenant.labels
+            fingerprint = tenant.fingerprint
+            if model_changed:
+                # Só o idioma ou o engine mudou: o fingerprint é ajustado sem ler as phrases
+                fingerprint = rebase_fingerprint(
+                    fingerprint, tenant.language, tenant.engine, new_language, new_engine
+                )
+                if fingerprint is None:
+                    new_phrases, new_labels = tenant.training_data()
+                    fingerprint = ""
         
-        # Valida novamente após atualização
-        if len(tenant.phrases) != len(tenant.labels):
-            raise ValueError(
-                f"O número de phrases ({len(tenant.phrases)}) deve ser igual ao número de labels ({len(tenant.labels)})"
-            )
+        if model_changed:
+            # Mudança de idioma ou de engine exige retreino completo
+            changes = ()
+        elif data_changed:
+            old_counts = Counter(zip(old_phrases, old_labels))
+            new_counts = Counter(zip(new_phrases, new_labels))
+            changes = append_change(tenant.changes, TenantChange(
+                tenant.version,
+                version,
+                added=tuple((new_counts - old_counts).elements()),
+                removed=tuple((old_counts - new_counts).elements())
+            ))
+        else:
+            changes = append_change(tenant.changes, TenantChange(tenant.version, version))
         
-        return tenant
+        # Valida e calcula o novo snapshot antes de gravar qualquer coisa
+        updated = replace(
+            tenant,
+            language=new_language,
+            engine=new_engine,
+            phrases=new_phrases,
+            labels=new_labels,
+            updated_at=datetime.now(),
+            version=version,
+            changes=changes,
+            fingerprint=fingerprint
+        )
+        
+        if data_changed:
+            self._storage.replace_tenant(updated, updated.phrases, updated.labels, expected_version=tenant.version)
+        else:
+            self._storage.save_header(updated, expected_version=tenant.version)
+        
+        updated = self._detach(updated)
+        self._tenants[tenant_id] = updated
+        return updated
+    
+    def modify_phrases(
+        self,
+        tenant_id: str,
+        add: Optional[List[Tuple[str, str]]] = None,
+        remove: Optional[List[Tuple[str, str]]] = None
+    ) -> TenantConfig:
+        """
+        Adiciona e/ou remove pares (phrase, label) de um tenant existente
+        
+        Cada par em 'remove' remove uma ocorrência do par correspondente.
+        A alteração é registrada para que o modelo seja atualizado de forma
+        incremental, sem retreino completo. As contagens por label e o
+        fingerprint são ajustados apenas com os pares alterados.
+        """
+        add = tuple(add or ())
+        remove = tuple(remove or ())
+        return self._write(tenant_id, lambda tenant: self._modify_snapshot(tenant, add, remove))
+    
+    def _modify_snapshot(
+        self,
+        tenant: TenantConfig,
+        add: Tuple[Tuple[str, str], ...],
+        remove: Tuple[Tuple[str, str], ...]
+    ) -> TenantConfig:
+        """Corpo de modify_phrases para um snapshot; requer o lock"""
+        tenant_id = tenant.tenant_id
+        
+        fingerprint = update_fingerprint(tenant.fingerprint, add, remove)
+        if self._storage.keeps_phrases_in_memory or fingerprint is None:
+            phrases, labels = tenant.training_data()
+            if remove:
+                phrases, labels = _remove_pairs(phrases, labels, remove, tenant_id)
+            phrases = tuple(phrases) + tuple(phrase for phrase, _ in add)
+            labels = tuple(labels) + tuple(label for _, label in add)
+            if fingerprint is None:
+                fingerprint = training_fingerprint(tenant.language, phrases, labels, tenant.engine)
+        else:
+            # O armazenamento remove as linhas (e confere se existem) sem que o corpus seja lido aqui
+            phrases = labels = None
+        
+        version = next_version()
+        updated = replace(
+            tenant,
+            phrases=phrases,
+            labels=labels,
+            updated_at=datetime.now(),
+            version=version,
+            changes=append_change(tenant.changes, TenantChange(tenant.version, version, add, remove)),
+            phrase_count=tenant.phrase_count + len(add) - len(remove),
+            label_counts=_count_labels(tenant.label_counts, add, remove),
+            fingerprint=fingerprint
+        )
+        
+        # Grava apenas as linhas alteradas
+        self._storage.apply_changes(updated, add, remove, expected_version=tenant.version)
+        updated = self._detach(updated)
+        self._tenants[tenant_id] = updated
+        return updated
     
     def delete_tenant(self, tenant_id: str) -> bool:
         """Remove um tenant"""
         if tenant_id == "default":
             raise ValueError("Não é possível deletar o tenant padrão")
         
-        if tenant_id in self._tenants:
-            del self._tenants[tenant_id]
-            return True
-        return False
+        with self._lock:
+            if self.tenant_exists(tenant_id):
+                self._storage.delete_tenant(tenant_id)
+                self._forget(tenant_id)
+                return True
+            return False
     
-    def list_tenants(self) -> List[TenantConfig]:
-        """Lista todos os tenants cadastrados"""
-        return list(self._tenants.values())
+    def list_tenants(self, after: Optional[str] = None, limit: Optional[int] = None) -> List[TenantConfig]:
+        """
+        Lista os tenants cadastrados em ordem de tenant_id
+        
+        Args:
+            after: Cursor; retorna apenas tenants com ID maior que este
+            limit: Número máximo de tenants retornados (None para todos)
+        """
+        if self._storage.shared:
+            # Inclui tenants criados ou alterados por outros processos
+            headers = self._storage.load_tenants(after, limit)
+            with self._lock:
+                return [self._adopt(header) for header in headers]
+        
+        with self._ids_lock:
+            start = bisect.bisect_right(self._tenant_ids, after) if after is not None else 0
+            end = start + limit if limit is not None else None
+            tenant_ids = self._tenant_ids[start:end]
+        tenants = (self._tenants.get(tenant_id) for tenant_id in tenant_ids)
+        return [tenant for tenant in tenants if tenant is not None]
+    
+    def count_tenants(self) -> int:
+        """Número de tenants cadastrados"""
+        return len(self._tenants)
     
     def tenant_exists(self, tenant_id: str) -> bool:
         """Verifica se um tenant existe"""
-        return tenant_id in self._tenants
+        return self.get_tenant(tenant_id) is not None
 
 
 # Instância global do gerenciador de tenants
 tenant_manager = TenantManager()
-
@@ -0,0 +1,508 @@
+"""
+Modelo de classificação de um tenant.
+Treino (TfidfVectorizer ou feature hashing + Naive Bayes), pontuação e
+atualizações incrementais. Este módulo não depende dos gerenciadores de
+tenants e modelos, então os processos do pool de treinamento o importam
+sem criar as instâncias globais deles.
+"""
+from typing import Dict, List, Optional, Sequence, Tuple, TYPE_CHECKING
+import copy
+import logging
+import mmap
+import sys
+
+import numpy as np
+
+from . import config, profiling
+from .prediction_cache import PredictionCache, normalize_message
+from .scorer import DEFAULT_ENGINE, ENGINES, CompiledScorer, HashedFeatures, Vocabulary, vectorize
+from .preprocessing import get_preprocessor
+
+# scikit-learn e SciPy são importados sob demanda, no primeiro treino,
+# para manter a inicialização do processo rápida
+if TYPE_CHECKING:
+    from sklearn.feature_extraction.text import TfidfVectorizer
+
+logger = logging.getLogger(__name__)
+
+# Suavização (alpha) do MultinomialNB, usada também nas atualizações incrementais
+NB_ALPHA = 1.0
+
+def _accumulate_counts(
+    feature_count: np.ndarray,
+    class_count: np.ndarray,
+    X,
+    rows: Sequence[int],
+    sign: float = 1.0
+):
+    """
+    Soma (ou subtrai, com sign=-1) as linhas de X às contagens do Naive Bayes
+    
+    Args:
+        feature_count: Contagens classe x feature, atualizadas no lugar
+        class_count: Exemplos por classe, atualizados no lugar
+        X: Matriz esparsa com uma linha por exemplo
+        rows: Índice da classe de cada linha de X
+        sign: 1.0 para adicionar os exemplos, -1.0 para removê-los
+    """
+    from scipy import sparse
+    
+    # Matriz indicadora classe x linha para somar as linhas por classe
+    Y = sparse.csr_matrix(
+        (np.full(len(rows), sign), (rows, np.arange(len(rows)))),
+        shape=(class_count.size, len(rows))
+    )
+    feature_count += (Y @ X).toarray()
+    class_count += np.asarray(Y.sum(axis=1)).ravel()
+
+
+def _naive_bayes(feature_count: np.ndarray, class_count: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Estatísticas do MultinomialNB a partir das contagens
+    
+    Returns:
+        Tupla (feature_log_prob, class_log_prior, soma suavizada por classe)
+    """
+    smoothed = feature_count + NB_ALPHA
+    totals = smoothed.sum(axis=1)
+    return (
+        np.log(smoothed) - np.log(totals)[:, None],
+        np.log(class_count) - np.log(class_count.sum()),
+        totals,
+    )
+
+
+def _private_nbytes(array: np.ndarray) -> int:
+    """Bytes de um array que pertencem ao processo (0 para arrays memory-mapped)"""
+    base = array
+    while base is not None:
+        if isinstance(base, (np.memmap, mmap.mmap)):
+            return 0
+        base = getattr(base, "base", None)
+    return array.nbytes
+
+
+class TenantModel:
+    """
+    Modelo de classificação para um tenant específico
+    
+    As phrases e labels são usadas apenas no treino e não ficam guardadas
+    no modelo; atualizações incrementais recebem somente as linhas alteradas.
+    
+    Após o treino, o TfidfVectorizer e o MultinomialNB do scikit-learn são
+    descartados: o modelo guarda apenas o CompiledScorer (vocabulário
+    compacto, IDF e log-probabilidades em float32) e, para as atualizações
+    incrementais, o número de exemplos de cada classe e a soma suavizada
+    das contagens de cada classe, das quais as contagens por feature são
+    reconstruídas a partir das log-probabilidades.
+    
+    Com o engine "hashing", as colunas vêm de feature hashing, sem
+    vocabulário nem IDF: a memória do modelo depende só do número de
+    classes e de HASHING_FEATURES, e as atualizações incrementais não
+    deixam vocabulário ou IDF defasados. As contagens, porém, continuam
+    sendo reconstruídas das log-probabilidades em float32, então o retreino
+    de INCREMENTAL_REFIT_RATIO vale também para esse engine.
+    """
+    
+    __slots__ = (
+        "tenant_id", "language", "engine", "version", "incremental_rows",
+        "scorer", "class_count", "feature_totals", "_cache", "_memory_bytes",
+    )
+    
+    def __init__(
+        self,
+        tenant_id: str,
+        language: str,
+        phrases: List[str],
+        labels: List[str],
+        version: int = 0,
+        engine: str = DEFAULT_ENGINE
+    ):
+        if engine not in ENGINES:
+            raise ValueError(f"Engine inválido: '{engine}' (use {' ou '.join(ENGINES)})")
+        self.tenant_id = tenant_id
+        self.language = language
+        self.engine = engine
+        self.version = version
+        # Phrases adicionadas/removidas incrementalmente desde o último treino completo
+        self.incremental_rows = 0
+        self.scorer: Optional[CompiledScorer] = None
+        # Exemplos por classe e soma de (contagem + alpha) por classe
+        self.class_count: Optional[np.ndarray] = None
+        self.feature_totals: Optional[np.ndarray] = None
+        self._cache = self._new_cache()
+        self._memory_bytes: Optional[int] = None
+        
+        if phrases and labels:
+            self._train(phrases, labels)
+    
+    @staticmethod
+    def _new_cache() -> Optional[PredictionCache]:
+        """Cria o cache de predições do modelo, se habilitado"""
+        if config.PREDICTION_CACHE_SIZE <= 0:
+            return None
+        return PredictionCache(config.PREDICTION_CACHE_SIZE, config.PREDICTION_CACHE_TTL)
+    
+    def _build_vectorizer(self) -> "TfidfVectorizer":
+        """
+        Cria o TfidfVectorizer com o analisador compartilhado do idioma do tenant
+        
+        O analisador (minúsculas, remoção de acentos, tokenização e
+        stopwords) vem do registro por idioma, então todos os tenants do
+        mesmo idioma usam as mesmas stopwords em memória.
+        """
+        from sklearn.feature_extraction.text import TfidfVectorizer
+        
+        return TfidfVectorizer(analyzer=get_preprocessor(self.language))
+    
+    def _train(self, phrases: List[str], labels: List[str]):
+        """Treina o modelo com as phrases e labels do tenant"""
+        if not phrases or not labels:
+            raise ValueError("Phrases e labels são necessários para treinar o modelo")
+        
+        if len(phrases) != len(labels):
+            raise ValueError(
+                f"O número de phrases ({len(phrases)}) deve ser igual ao número de labels ({len(labels)})"
+            )
+        
+        if self.engine == "hashing":
+            self._train_hashing(phrases, labels)
+            return
+        
+        vectorizer = self._build_vectorizer()
+        
+        # Transforma as phrases em vetores
+        X = vectorizer.fit_transform(phrases)
+        
+        # Cria e treina o modelo
+        from sklearn.naive_bayes import MultinomialNB
+        nb = MultinomialNB(alpha=NB_ALPHA)
+        nb.fit(X, labels)
+        
+        # Mantém apenas a forma compacta; o vetorizador e o NB são descartados
+        self.scorer = CompiledScorer.from_model(vectorizer, nb)
+        self.class_count = np.asarray(nb.class_count_, dtype=np.float64)
+        self.feature_totals = (nb.feature_count_ + NB_ALPHA).sum(axis=1)
+        self.incremental_rows = 0
+        self._memory_bytes = None
+        
+        logger.info(f"Modelo treinado para tenant '{self.tenant_id}' com {len(phrases)} exemplos")
+    
+    def _train_hashing(self, phrases: Sequence[str], labels: Sequence[str]):
+        """
+        Treina o modelo do engine "hashing", acumulando as contagens em partes
+        
+        As phrases são vetorizadas de HASHING_CHUNK_ROWS em HASHING_CHUNK_ROWS,
+        então a matriz esparsa do corpus inteiro nunca existe de uma vez.
+        """
+        features = HashedFeatures(config.HASHING_FEATURES)
+        analyzer = get_preprocessor(self.language)
+        classes = sorted(set(labels))
+        class_index = {label: i for i, label in enumerate(classes)}
+        feature_count = np.zeros((len(classes), features.n_features))
+        class_count = np.zeros(len(classes))
+        
+        chunk = max(1, config.HASHING_CHUNK_ROWS)
+        for start in range(0, len(phrases), chunk):
+            X = vectorize(analyzer, features, phrases[start:start + chunk])
+            rows = [class_index[label] for label in labels[start:start + chunk]]
+            _accumulate_counts(feature_count, class_count, X, rows)
+        
+        feature_log_prob, class_log_prior, totals = _naive_bayes(feature_count, class_count)
+        self.scorer = CompiledScorer(analyzer, features, None, feature_log_prob, class_log_prior, np.asarray(classes))
+        self.class_count = class_count
+        self.feature_totals = totals
+        self.incremental_rows = 0
+        self._memory_bytes = None
+        
+        logger.info(
+            f"Modelo (hashing, {features.n_features} features) treinado para tenant "
+            f"'{self.tenant_id}' com {len(phrases)} exemplos"
+        )
+    
+    def classify(self, message: str) -> Tuple[str, float]:
+        """
+        Classifica uma mensagem e retorna a categoria e probabilidade
+        
+        Args:
+            message: Mensagem a ser classificada
+            
+        Returns:
+            Tupla (classificação, probabilidade)
+        """
+        if self.scorer is None:
+            raise ValueError(f"Modelo do tenant '{self.tenant_id}' não foi treinado")
+        
+        # Mensagens repetidas são respondidas pelo cache
+        cache_key = None
+        if self._cache is not None:
+            with profiling.stage("cache"):
+                cache_key = normalize_message(message)
+                cached = self._cache.get(cache_key)
+            if cached is not None:
+                return cached
+        
+        # Pontua a mensagem com o modelo compilado
+        profile = profiling.current()
+        if profile is None:
+            classification, probability = self.scorer.top_k(message, 1)[0]
+        else:
+            with profile.stage("vectorize"):
+                features = self.scorer.features(message)
+            with profile.stage("score"):
+                classification, probability = self.scorer.top_k_features(features, 1)[0]
+        
+        if cache_key is not None:
+            self._cache.put(cache_key, (classification, probability))
+        
+        return classification, probability
+    
+    def classify_top_k(self, message: str, k: int) -> List[Tuple[str, float]]:
+        """
+        Retorna as k classificações mais prováveis para uma mensagem
+        
+        Args:
+            message: Mensagem a ser classificada
+            k: Número de classes retornadas
+            
+        Returns:
+            Lista de tuplas (classificação, probabilidade), da mais provável para a menos
+        """
+        if self.scorer is None:
+            raise ValueError(f"Modelo do tenant '{self.tenant_id}' não foi treinado")
+        
+        return self.scorer.top_k(message, k)
+    
+    def classify_batch(self, messages: List[str]) -> List[Tuple[str, float]]:
+        """
+        Classifica várias mensagens de uma só vez
+        
+        Todas as mensagens são vetorizadas em uma única matriz esparsa e
+        pontuadas com um único produto matricial.
+        
+        Args:
+            messages: Lista de mensagens a serem classificadas
+            
+        Returns:
+            Lista de tuplas (classificação, probabilidade), na mesma ordem das mensagens
+        """
+        if self.scorer is None:
+            raise ValueError(f"Modelo do tenant '{self.tenant_id}' não foi treinado")
+        
+        if not messages:
+            return []
+        
+        results: List[Optional[Tuple[str, float]]] = [None] * len(messages)
+        keys: List[Optional[str]] = [None] * len(messages)
+        pending = list(range(len(messages)))
+        
+        # Mensagens repetidas são respondidas pelo cache
+        if self._cache is not None:
+            pending = []
+            with profiling.stage("cache"):
+                for index, message in enumerate(messages):
+                    keys[index] = normalize_message(message)
+                    cached = self._cache.get(keys[index])
+                    if cached is not None:
+                        results[index] = cached
+                    else:
+                        pending.append(index)
+        
+        if pending:
+            # Transforma todas as mensagens restantes de uma vez
+            with profiling.stage("vectorize"):
+                msg_matrix = self.scorer.transform([messages[index] for index in pending])
+            
+            # Obtém as probabilidades de todas as mensagens e seleciona a
+            # classe de maior probabilidade por linha
+            with profiling.stage("score"):
+                probs = self.scorer.predict_proba_matrix(msg_matrix)
+                best = probs.argmax(axis=1)
+            classes = self.scorer.classes
+            
+            for row, (index, idx) in enumerate(zip(pending, best)):
+                results[index] = (classes[idx], float(probs[row, idx]))
+                if keys[index] is not None:
+                    self._cache.put(keys[index], results[index])
+        
+        return results
+    
+    def apply_changes(
+        self,
+        added: Sequence[Tuple[str, str]],
+        removed: Sequence[Tuple[str, str]],
+        version: int
+    ) -> "TenantModel":
+        """
+        Cria uma nova versão do modelo somando/subtraindo apenas as phrases alteradas
+        
+        As estatísticas suficientes do MultinomialNB são contagens por classe,
+        então basta ajustar as contagens por feature e por classe com as
+        linhas alteradas. As contagens por feature atuais são reconstruídas
+        das log-probabilidades e da soma suavizada de cada classe. No engine
+        TF-IDF, o vocabulário e o IDF permanecem os do último treino
+        completo: termos novos são ignorados até o próximo retreino. No
+        engine "hashing", termos novos já caem nas suas colunas. Em ambos, a
+        reconstrução passa pelo float32 e cada atualização acrescenta um
+        pequeno erro de arredondamento, limitado pelo retreino completo que o
+        ModelManager faz após INCREMENTAL_REFIT_RATIO do corpus. O modelo
+        atual não é modificado, permitindo a troca atômica.
+        
+        Args:
+            added: Pares (phrase, label) adicionados
+            removed: Pares (phrase, label) removidos
+            version: Versão da configuração após a alteração
+            
+        Returns:
+            Novo TenantModel com as contagens atualizadas
+        """
+        if self.scorer is None:
+            raise ValueError(f"Modelo do tenant '{self.tenant_id}' não foi treinado")
+        
+        scorer = self.scorer
+        current_classes = [str(label) for label in scorer.classes]
+        classes = sorted(set(current_classes).union(label for _, label in added))
+        class_index = {label: i for i, label in enumerate(classes)}
+        
+        # Reposiciona as contagens atuais na nova lista de classes
+        positions = [class_index[label] for label in current_classes]
+        feature_log_prob = scorer.arrays()["feature_log_prob"]
+        feature_count = np.zeros((len(classes), scorer.n_features))
+        class_count = np.zeros(len(classes))
+        feature_count[positions] = np.exp(feature_log_prob) * self.feature_totals[:, None] - NB_ALPHA
+        class_count[positions] = self.class_count
+        
+        for pairs, sign in ((added, 1.0), (removed, -1.0)):
+            if not pairs:
+                continue
+            X = scorer.transform([phrase for phrase, _ in pairs])
+            rows = [class_index[label] for _, label in pairs]
+            _accumulate_counts(feature_count, class_count, X, rows, sign)
+        
+        # Descarta classes sem exemplos e resíduos negativos de ponto flutuante
+        keep = class_count > 0.5
+        if not keep.any():
+            raise ValueError(f"Tenant '{self.tenant_id}' ficaria sem phrases de treinamento")
+        feature_count = np.maximum(feature_count[keep], 0.0)
+        class_count = class_count[keep]
+        
+        feature_log_prob, class_log_prior, totals = _naive_bayes(feature_count, class_count)
+        
+        updated = copy.copy(self)
+        updated._memory_bytes = None
+        updated._cache = self._new_cache()
+        updated.scorer = scorer.with_model(feature_log_prob, class_log_prior, np.asarray(classes)[keep])
+        updated.class_count = class_count
+        updated.feature_totals = totals
+        updated.version = version
+        updated.incremental_rows = self.incremental_rows + len(added) + len(removed)
+        
+        logger.info(
+            f"Modelo do tenant '{self.tenant_id}' atualizado incrementalmente "
+            f"(+{len(added)}/-{len(removed)} phrases)"
+        )
+        return updated
+    
+    def memory_bytes(self) -> int:
+        """
+        Estima a memória ocupada pelo estado treinado do modelo
+        
+        Considera os arrays do pontuador (vocabulário, IDF e estatísticas do
+        Naive Bayes), o índice de busca do vocabulário e as contagens por
+        classe. As stopwords pertencem ao pré-processador compartilhado
+        do idioma e não entram na conta. Arrays mapeados
+        de arquivos (memory-map) não contam, pois suas páginas são
+        compartilhadas entre processos pelo sistema operacional. O valor é
+        calculado uma vez e reaproveitado, pois o modelo não muda após o treino.
+        """
+        if self._memory_bytes is not None:
+            return self._memory_bytes
+        
+        total = sys.getsizeof(self)
+        if self.scorer is not None:
+            total += sys.getsizeof(self.scorer) + sys.getsizeof(self.scorer.vocabulary)
+            total += self.scorer.vocabulary.index_nbytes()
+            for array in (*self.scorer.arrays().values(), self.class_count, self.feature_totals):
+                total += _private_nbytes(array)
+        
+        self._memory_bytes = total
+        return total
+    
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        """
+        Exporta o estado treinado do modelo como arrays NumPy
+        
+        Returns:
+            Dicionário com o vocabulário (buffer UTF-8 dos termos e seus
+            deslocamentos), IDF, classes, log-probabilidades e as contagens
+            por classe; no engine "hashing", sem vocabulário e sem IDF
+        """
+        if self.scorer is None:
+            raise ValueError(f"Modelo do tenant '{self.tenant_id}' não foi treinado")
+        
+        return {
+            **self.scorer.arrays(),
+            "class_count": self.class_count,
+            "feature_totals": self.feature_totals,
+        }
+    
+    @classmethod
+    def from_arrays(
+        cls,
+        tenant_id: str,
+        language: str,
+        version: int,
+        arrays: Dict[str, np.ndarray],
+        incremental_rows: int = 0,
+        engine: str = DEFAULT_ENGINE
+    ) -> "TenantModel":
+        """
+        Reconstrói um modelo treinado a partir dos arrays de to_arrays, sem retreinar
+        
+        Os arrays podem ser memory-mapped (somente leitura): a classificação
+        apenas lê esses arrays e atualizações incrementais criam cópias novas.
+        Artefatos no formato anterior (vocabulário como array de strings e
+        feature_count em float64) também são aceitos e convertidos.
+        """
+        model = cls(tenant_id, language, [], [], version, engine)
+        model.incremental_rows = incremental_rows
+        
+        if engine == "hashing":
+            # O número de colunas é o do treino, mesmo que HASHING_FEATURES tenha mudado
+            vocabulary = HashedFeatures(arrays["feature_log_prob"].shape[1])
+            feature_totals = arrays["feature_totals"]
+        elif "term_bytes" in arrays:
+            vocabulary = Vocabulary(arrays["term_bytes"], arrays["term_offsets"])
+            feature_totals = arrays["feature_totals"]
+        else:
+            vocabulary = Vocabulary.from_terms([str(term) for term in arrays["vocabulary"]])
+            feature_totals = (arrays["feature_count"] + NB_ALPHA).sum(axis=1)
+        
+        model.scorer = CompiledScorer(
+            get_preprocessor(language),
+            vocabulary,
+            arrays.get("idf"),
+            arrays["feature_log_prob"],
+            arrays["class_log_prior"],
+            np.asarray(arrays["classes"]).astype(str),
+        )
+        model.class_count = np.asarray(arrays["class_count"], dtype=np.float64)
+        model.feature_totals = np.asarray(feature_totals, dtype=np.float64)
+        return model
+
+
+def fit_tenant_arrays(
+    tenant_id: str,
+    language: str,
+    phrases: List[str],
+    labels: List[str],
+    engine: str = DEFAULT_ENGINE
+) -> Dict[str, np.ndarray]:
+    """
+    Treina o modelo de um tenant e retorna apenas seus arrays
+    
+    Função de nível de módulo para poder ser executada em um processo do
+    pool de treinamento; o processo servidor reconstrói o modelo com
+    TenantModel.from_arrays.
+    """
+    return TenantModel(tenant_id, language, phrases, labels, engine=engine).to_arrays()
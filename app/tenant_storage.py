@@ -0,0 +1,424 @@
+"""
+Armazenamento durável de tenants.
+Guarda os metadados de cada tenant e suas linhas de treinamento (phrase,
+label), para que o conjunto de tenants sobreviva a reinícios. As phrases são
+lidas apenas quando um modelo precisa ser (re)treinado.
+"""
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple, TYPE_CHECKING
+import json
+import logging
+import os
+import sqlite3
+import threading
+
+if TYPE_CHECKING:
+    from .tenant_manager import TenantConfig
+
+logger = logging.getLogger(__name__)
+
+
+class StaleTenantError(ValueError):
+    """O tenant foi alterado ou removido depois do snapshot usado na leitura"""
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tenants (
+    tenant_id TEXT PRIMARY KEY,
+    language TEXT NOT NULL,
+    engine TEXT NOT NULL DEFAULT 'tfidf',
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    phrase_count INTEGER NOT NULL,
+    label_counts TEXT NOT NULL DEFAULT '{}',
+    fingerprint TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS training_rows (
+    tenant_id TEXT NOT NULL REFERENCES tenants(tenant_id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    phrase TEXT NOT NULL,
+    label TEXT NOT NULL,
+    PRIMARY KEY (tenant_id, position)
+);
+"""
+
+
+class TenantStorage:
+    """
+    Interface dos backends de armazenamento de tenants
+
+    Os métodos de leitura retornam cabeçalhos (dicionários com tenant_id,
+    language, engine, created_at, updated_at, version, phrase_count,
+    label_counts e fingerprint); as linhas de treinamento são lidas separadamente com
+    load_training_data.
+    """
+
+    # Indica se as phrases devem continuar residentes em memória no TenantConfig
+    keeps_phrases_in_memory = True
+
+    # Indica se outros processos podem alterar os tenants no mesmo armazenamento
+    shared = False
+
+    def load_tenants(self, after: Optional[str] = None, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Retorna os cabeçalhos dos tenants armazenados, em ordem de tenant_id
+
+        Args:
+            after: Retorna apenas tenants com ID maior que este
+            limit: Número máximo de cabeçalhos (None para todos)
+        """
+        return []
+
+    def load_tenant(self, tenant_id: str) -> Optional[Dict[str, Any]]:
+        """Retorna o cabeçalho de um tenant, ou None se não existir"""
+        return None
+
+    def load_version(self, tenant_id: str) -> Optional[int]:
+        """Versão gravada de um tenant, ou None se não existir"""
+        return None
+
+    def load_training_data(self, tenant_id: str, version: Optional[int] = None) -> Tuple[List[str], List[str]]:
+        """
+        Retorna as phrases e labels de um tenant, na ordem de inserção
+
+        Args:
+            tenant_id: ID do tenant
+            version: Versão esperada do tenant; None lê a versão atual
+
+        Raises:
+            StaleTenantError: se o tenant não estiver mais na versão esperada
+        """
+        return [], []
+
+    def insert_tenant(self, tenant: "TenantConfig", phrases: Sequence[str], labels: Sequence[str]):
+        """Grava um tenant novo com todas as suas linhas de treinamento"""
+
+    def insert_tenants(self, tenants: Sequence["TenantConfig"]):
+        """Grava vários tenants novos, com as phrases em memória, de uma só vez"""
+        for tenant in tenants:
+            self.insert_tenant(tenant, tenant.phrases, tenant.labels)
+
+    def replace_tenant(
+        self,
+        tenant: "TenantConfig",
+        phrases: Sequence[str],
+        labels: Sequence[str],
+        expected_version: Optional[int] = None
+    ):
+        """
+        Substitui o cabeçalho e todas as linhas de treinamento de um tenant
+
+        Args:
+            expected_version: Versão gravada sobre a qual a alteração foi
+                calculada; None grava sem conferir
+
+        Raises:
+            StaleTenantError: se o tenant não estiver mais na versão esperada
+        """
+
+    def save_header(self, tenant: "TenantConfig", expected_version: Optional[int] = None):
+        """
+        Atualiza apenas o cabeçalho de um tenant
+
+        Raises:
+            StaleTenantError: se o tenant não estiver mais na versão esperada
+        """
+
+    def apply_changes(
+        self,
+        tenant: "TenantConfig",
+        added: Sequence[Tuple[str, str]],
+        removed: Sequence[Tuple[str, str]],
+        expected_version: Optional[int] = None
+    ):
+        """
+        Atualiza o cabeçalho e grava apenas as linhas adicionadas/removidas
+
+        Cada par de 'removed' remove a primeira ocorrência do par.
+
+        Raises:
+            StaleTenantError: se o tenant não estiver mais na versão esperada
+            ValueError: se algum par de 'removed' não existir (nada é gravado)
+        """
+
+    def delete_tenant(self, tenant_id: str):
+        """Remove um tenant e suas linhas de treinamento"""
+
+    def max_version(self) -> int:
+        """Maior versão de configuração já gravada"""
+        return 0
+
+
+class MemoryTenantStorage(TenantStorage):
+    """Backend sem persistência: os tenants vivem apenas no TenantManager"""
+
+
+class SQLiteTenantStorage(TenantStorage):
+    """
+    Backend SQLite em modo WAL
+
+    Cada escrita roda em uma única transação, com as linhas de treinamento
+    inseridas em lote via executemany, em uma conexão protegida por um lock.
+    As leituras usam uma conexão por thread, sem esse lock: o modo WAL
+    permite leitores concorrentes entre si e com as escritas, inclusive
+    entre vários workers do uvicorn.
+    """
+
+    keeps_phrases_in_memory = False
+    shared = True
+
+    def __init__(self, path: str, timeout: float = 30.0):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._timeout = timeout
+        self._readers = threading.local()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            path,
+            timeout=timeout,
+            check_same_thread=False,
+            isolation_level=None
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        with self._transaction() as cursor:
+            for statement in SCHEMA.split(";"):
+                if statement.strip():
+                    cursor.execute(statement)
+            self._migrate(cursor)
+
+    @staticmethod
+    def _migrate(cursor: sqlite3.Cursor):
+        """Atualiza bancos criados por versões anteriores do esquema"""
+        columns = {row[1] for row in cursor.execute("PRAGMA table_info(tenants)")}
+        if "label_counts" not in columns:
+            cursor.execute("ALTER TABLE tenants ADD COLUMN label_counts TEXT NOT NULL DEFAULT '{}'")
+            rows = cursor.execute(
+                "SELECT tenant_id, label, COUNT(*) FROM training_rows GROUP BY tenant_id, label"
+            ).fetchall()
+            label_counts: Dict[str, Dict[str, int]] = {}
+            for tenant_id, label, count in rows:
+                label_counts.setdefault(tenant_id, {})[label] = count
+            cursor.executemany(
+                "UPDATE tenants SET label_counts = ? WHERE tenant_id = ?",
+                [(json.dumps(counts), tenant_id) for tenant_id, counts in label_counts.items()]
+            )
+        if "engine" not in columns:
+            cursor.execute("ALTER TABLE tenants ADD COLUMN engine TEXT NOT NULL DEFAULT 'tfidf'")
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Cursor]:
+        """Executa um bloco em uma transação de escrita (commit ou rollback ao final)"""
+        with self._lock:
+            cursor = self._conn.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            try:
+                yield cursor
+            except BaseException:
+                cursor.execute("ROLLBACK")
+                raise
+            else:
+                cursor.execute("COMMIT")
+            finally:
+                cursor.close()
+
+    def _reader(self) -> sqlite3.Connection:
+        """Conexão somente leitura da thread atual, criada no primeiro uso"""
+        conn = getattr(self._readers, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self._timeout, isolation_level=None)
+            conn.execute("PRAGMA query_only=ON")
+            self._readers.conn = conn
+        return conn
+
+    def _query(self, sql: str, params: Sequence = ()) -> List[tuple]:
+        return self._reader().execute(sql, params).fetchall()
+
+    @staticmethod
+    def _header(row: tuple) -> Dict[str, Any]:
+        tenant_id, language, engine, created_at, updated_at, version, phrase_count, label_counts, fingerprint = row
+        return {
+            "tenant_id": tenant_id,
+            "language": language,
+            "engine": engine,
+            "created_at": datetime.fromisoformat(created_at),
+            "updated_at": datetime.fromisoformat(updated_at),
+            "version": version,
+            "phrase_count": phrase_count,
+            "label_counts": json.loads(label_counts),
+            "fingerprint": fingerprint,
+        }
+
+    def load_tenants(self, after: Optional[str] = None, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        # Paginação pela chave primária: cada página lê apenas as suas linhas
+        rows = self._query(
+            "SELECT tenant_id, language, engine, created_at, updated_at, version, phrase_count, label_counts, fingerprint "
+            "FROM tenants WHERE tenant_id > ? ORDER BY tenant_id LIMIT ?",
+            (after if after is not None else "", limit if limit is not None else -1)
+        )
+        return [self._header(row) for row in rows]
+
+    def load_tenant(self, tenant_id: str) -> Optional[Dict[str, Any]]:
+        rows = self._query(
+            "SELECT tenant_id, language, engine, created_at, updated_at, version, phrase_count, label_counts, fingerprint "
+            "FROM tenants WHERE tenant_id = ?",
+            (tenant_id,)
+        )
+        return self._header(rows[0]) if rows else None
+
+    def load_version(self, tenant_id: str) -> Optional[int]:
+        rows = self._query("SELECT version FROM tenants WHERE tenant_id = ?", (tenant_id,))
+        return rows[0][0] if rows else None
+
+    def load_training_data(self, tenant_id: str, version: Optional[int] = None) -> Tuple[List[str], List[str]]:
+        # Versão e linhas lidas na mesma transação, sem escritas de outros workers no meio
+        cursor = self._reader().cursor()
+        cursor.execute("BEGIN")
+        try:
+            self._check_version(cursor, tenant_id, version)
+            rows = cursor.execute(
+                "SELECT phrase, label FROM training_rows WHERE tenant_id = ? ORDER BY position",
+                (tenant_id,)
+            ).fetchall()
+        finally:
+            cursor.execute("COMMIT")
+            cursor.close()
+        return [phrase for phrase, _ in rows], [label for _, label in rows]
+
+    @staticmethod
+    def _check_version(cursor: sqlite3.Cursor, tenant_id: str, version: Optional[int]):
+        """Confere, dentro da transação, se o tenant ainda está na versão esperada"""
+        if version is None:
+            return
+        row = cursor.execute("SELECT version FROM tenants WHERE tenant_id = ?", (tenant_id,)).fetchone()
+        if row is None or row[0] != version:
+            current = "removido" if row is None else f"na versão {row[0]}"
+            raise StaleTenantError(
+                f"Tenant '{tenant_id}' foi alterado: esperada a versão {version}, está {current}"
+            )
+
+    @staticmethod
+    def _write_header(cursor: sqlite3.Cursor, tenant: "TenantConfig"):
+        cursor.execute(
+            "INSERT INTO tenants "
+            "(tenant_id, language, engine, created_at, updated_at, version, phrase_count, label_counts, fingerprint) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(tenant_id) DO UPDATE SET "
+            "language = excluded.language, engine = excluded.engine, updated_at = excluded.updated_at, "
+            "version = excluded.version, phrase_count = excluded.phrase_count, "
+            "label_counts = excluded.label_counts, fingerprint = excluded.fingerprint",
+            (
+                tenant.tenant_id,
+                tenant.language,
+                tenant.engine,
+                tenant.created_at.isoformat(),
+                tenant.updated_at.isoformat(),
+                tenant.version,
+                tenant.phrase_count,
+                json.dumps(dict(tenant.label_counts), ensure_ascii=False),
+                tenant.fingerprint,
+            )
+        )
+
+    @staticmethod
+    def _insert_rows(
+        cursor: sqlite3.Cursor,
+        tenant_id: str,
+        pairs: Sequence[Tuple[str, str]],
+        start: int = 0
+    ):
+        cursor.executemany(
+            "INSERT INTO training_rows (tenant_id, position, phrase, label) VALUES (?, ?, ?, ?)",
+            ((tenant_id, start + offset, phrase, label) for offset, (phrase, label) in enumerate(pairs))
+        )
+
+    def insert_tenant(self, tenant: "TenantConfig", phrases: Sequence[str], labels: Sequence[str]):
+        with self._transaction() as cursor:
+            self._write_header(cursor, tenant)
+            self._insert_rows(cursor, tenant.tenant_id, list(zip(phrases, labels)))
+
+    def insert_tenants(self, tenants: Sequence["TenantConfig"]):
+        # Uma única transação para o lote inteiro
+        with self._transaction() as cursor:
+            for tenant in tenants:
+                self._write_header(cursor, tenant)
+                self._insert_rows(cursor, tenant.tenant_id, list(zip(tenant.phrases, tenant.labels)))
+
+    def replace_tenant(
+        self,
+        tenant: "TenantConfig",
+        phrases: Sequence[str],
+        labels: Sequence[str],
+        expected_version: Optional[int] = None
+    ):
+        with self._transaction() as cursor:
+            self._check_version(cursor, tenant.tenant_id, expected_version)
+            self._write_header(cursor, tenant)
+            cursor.execute("DELETE FROM training_rows WHERE tenant_id = ?", (tenant.tenant_id,))
+            self._insert_rows(cursor, tenant.tenant_id, list(zip(phrases, labels)))
+
+    def save_header(self, tenant: "TenantConfig", expected_version: Optional[int] = None):
+        with self._transaction() as cursor:
+            self._check_version(cursor, tenant.tenant_id, expected_version)
+            self._write_header(cursor, tenant)
+
+    def apply_changes(
+        self,
+        tenant: "TenantConfig",
+        added: Sequence[Tuple[str, str]],
+        removed: Sequence[Tuple[str, str]],
+        expected_version: Optional[int] = None
+    ):
+        with self._transaction() as cursor:
+            # Outro worker pode ter alterado o tenant depois do snapshot usado aqui
+            self._check_version(cursor, tenant.tenant_id, expected_version)
+            self._write_header(cursor, tenant)
+
+            # Remove a primeira ocorrência de cada par, como no TenantManager,
+            # sem ler as demais linhas do tenant
+            for phrase, label in removed:
+                cursor.execute(
+                    "DELETE FROM training_rows WHERE rowid = ("
+                    "SELECT rowid FROM training_rows WHERE tenant_id = ? AND phrase = ? AND label = ? "
+                    "ORDER BY position LIMIT 1)",
+                    (tenant.tenant_id, phrase, label)
+                )
+                if cursor.rowcount == 0:
+                    raise ValueError(
+                        f"Phrase '{phrase}' com label '{label}' não encontrada no tenant '{tenant.tenant_id}'"
+                    )
+
+            if added:
+                cursor.execute(
+                    "SELECT COALESCE(MAX(position), -1) FROM training_rows WHERE tenant_id = ?",
+                    (tenant.tenant_id,)
+                )
+                start = cursor.fetchone()[0] + 1
+                self._insert_rows(cursor, tenant.tenant_id, added, start)
+
+    def delete_tenant(self, tenant_id: str):
+        with self._transaction() as cursor:
+            cursor.execute("DELETE FROM training_rows WHERE tenant_id = ?", (tenant_id,))
+            cursor.execute("DELETE FROM tenants WHERE tenant_id = ?", (tenant_id,))
+
+    def max_version(self) -> int:
+        rows = self._query("SELECT COALESCE(MAX(version), 0) FROM tenants")
+        return rows[0][0]
+
+
+def create_storage(path: Optional[str]) -> TenantStorage:
+    """
+    Cria o backend de armazenamento de tenants
+
+    Args:
+        path: Caminho do banco SQLite; vazio ou None mantém os tenants apenas em memória
+    """
+    if not path:
+        return MemoryTenantStorage()
+    logger.info(f"Tenants armazenados em SQLite: '{path}'")
+    return SQLiteTenantStorage(path)
@@ -0,0 +1,4 @@
+"""
+Benchmarks de desempenho do classificador.
+Execute cada módulo com `python -m benchmarks.<nome>` a partir da raiz do projeto.
+"""
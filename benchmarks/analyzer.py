@@ -0,0 +1,166 @@
+"""
+Benchmark do analisador de texto (minúsculas, acentos, tokens e stopwords).
+
+Compara o analisador padrão do TfidfVectorizer (lowercase +
+strip_accents='unicode' + token_pattern + stop_words) com o
+LanguagePreprocessor, que faz minúsculas e remoção de acentos em uma única
+passada de str.translate. Verifica antes que os dois produzem exatamente os
+mesmos tokens para o corpus do tenant padrão, para textos aleatórios com
+caracteres Unicode variados e, com --exhaustive, para cada code point
+isolado. Termina com código 1 se houver divergência.
+
+Mede:
+  - analyzer: tempo por mensagem de cada analisador;
+  - training: fit_transform do corpus com cada analisador;
+  - inference: CompiledScorer.top_k com cada analisador.
+
+Uso:
+    python -m benchmarks.analyzer --repeat 5000 --exhaustive
+"""
+import argparse
+import json
+import random
+import statistics
+import sys
+import time
+
+from sklearn.feature_extraction.text import TfidfVectorizer, strip_accents_unicode
+
+from app.tenant_model import TenantModel
+from app.preprocessing import fold_text, get_preprocessor
+from app.scorer import CompiledScorer
+from app.tenant_manager import tenant_manager
+
+# Caracteres que exercitam os casos difíceis: acentos combinantes, ligaduras,
+# sigma final, I com ponto, dígitos de compatibilidade, Hangul e planos astrais
+ALPHABET = (
+    "aáàâãäeéêëiíîïoóôõöuúûüçñ AÁÀÂÃEÉÊIÍOÓÔÕUÚÇÑ "
+    "ßẞﬁﬂİıΣσςΑΒΓ ǅǈ ²³½Ⅻⅻ①㎏ 한국어 日本語 "
+    "̧́̈ \U0001d400\U0001d7ce\U0001f600 _-.,!?¿¡'\"0123456789"
+)
+
+
+def sklearn_analyzer(language: str):
+    """Analisador do TfidfVectorizer com a configuração usada antes do LanguagePreprocessor"""
+    stop_words = sorted(get_preprocessor(language).stop_words)
+    return TfidfVectorizer(stop_words=stop_words, strip_accents="unicode", lowercase=True).build_analyzer()
+
+
+def random_texts(count: int, seed: int = 0):
+    """Gera textos aleatórios com os caracteres de ALPHABET"""
+    rnd = random.Random(seed)
+    return ["".join(rnd.choice(ALPHABET) for _ in range(rnd.randint(0, 60))) for _ in range(count)]
+
+
+def check_equivalence(reference, analyzer, texts, exhaustive: bool):
+    """Compara os tokens dos dois analisadores e, opcionalmente, o fold de cada code point"""
+    mismatches = [text for text in texts if reference(text) != analyzer(text)]
+    result = {"texts": len(texts), "mismatches": len(mismatches)}
+    if mismatches:
+        result["example"] = mismatches[0]
+
+    if exhaustive:
+        bad = []
+        for codepoint in range(sys.maxunicode + 1):
+            text = f"x{chr(codepoint)}Y"
+            if fold_text(text) != strip_accents_unicode(text.lower()):
+                bad.append(codepoint)
+        result["codepoints"] = sys.maxunicode + 1
+        result["codepoint_mismatches"] = len(bad)
+        if bad:
+            result["codepoint_example"] = hex(bad[0])
+    return result
+
+
+def measure(fn, items, repeat):
+    """Latência por chamada (em microssegundos) aplicando fn aos itens em ciclo"""
+    samples = []
+    for i in range(repeat):
+        item = items[i % len(items)]
+        start = time.perf_counter()
+        fn(item)
+        samples.append((time.perf_counter() - start) * 1e6)
+    samples.sort()
+    return {
+        "p50_us": statistics.median(samples),
+        "p99_us": samples[int(len(samples) * 0.99) - 1],
+        "mean_us": statistics.fmean(samples),
+    }
+
+
+def measure_training(analyzer, phrases, runs):
+    """Melhor tempo (em ms) de fit_transform do corpus com o analisador informado"""
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        TfidfVectorizer(analyzer=analyzer).fit_transform(phrases)
+        timings.append((time.perf_counter() - start) * 1000)
+    return {"best_ms": min(timings), "median_ms": statistics.median(timings)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5000, help="Número de chamadas medidas por analisador")
+    parser.add_argument("--train-runs", type=int, default=20, help="Número de treinos medidos por analisador")
+    parser.add_argument("--scale", type=int, default=10, help="Quantas vezes o corpus padrão é repetido no treino")
+    parser.add_argument("--exhaustive", action="store_true", help="Verifica também cada code point Unicode")
+    args = parser.parse_args()
+
+    tenant = tenant_manager.get_tenant("default")
+    phrases, labels = tenant.training_data()
+    reference = sklearn_analyzer(tenant.language)
+    fast = get_preprocessor(tenant.language)
+
+    equivalence = check_equivalence(reference, fast, list(phrases) + random_texts(20000), args.exhaustive)
+
+    messages = list(phrases)
+    accented = [message for message in messages if not message.isascii()]
+
+    model = TenantModel(tenant.tenant_id, tenant.language, phrases, labels)
+    fast_scorer = model.scorer
+    arrays = fast_scorer.arrays()
+    reference_scorer = CompiledScorer(
+        reference,
+        fast_scorer.vocabulary,
+        arrays["idf"],
+        arrays["feature_log_prob"],
+        arrays["class_log_prior"],
+        arrays["classes"],
+    )
+
+    corpus = list(phrases) * args.scale
+    result = {
+        "equivalence": equivalence,
+        "analyzer": {
+            "sklearn": measure(reference, messages, args.repeat),
+            "translate": measure(fast, messages, args.repeat),
+            "sklearn_accented": measure(reference, accented, args.repeat),
+            "translate_accented": measure(fast, accented, args.repeat),
+        },
+        "training": {
+            "phrases": len(corpus),
+            "sklearn": measure_training(reference, corpus, args.train_runs),
+            "translate": measure_training(fast, corpus, args.train_runs),
+        },
+        "inference": {
+            "sklearn": measure(lambda m: reference_scorer.top_k(m, 1), messages, args.repeat),
+            "translate": measure(lambda m: fast_scorer.top_k(m, 1), messages, args.repeat),
+        },
+    }
+    result["analyzer"]["speedup_p50"] = (
+        result["analyzer"]["sklearn"]["p50_us"] / result["analyzer"]["translate"]["p50_us"]
+    )
+    result["training"]["speedup"] = (
+        result["training"]["sklearn"]["best_ms"] / result["training"]["translate"]["best_ms"]
+    )
+    result["inference"]["speedup_p50"] = (
+        result["inference"]["sklearn"]["p50_us"] / result["inference"]["translate"]["p50_us"]
+    )
+    print(json.dumps(result, indent=2))
+
+    if equivalence["mismatches"] or equivalence.get("codepoint_mismatches"):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,243 @@
+"""
+Teste de estresse do treinamento concorrente (single-flight por tenant).
+
+Cenários:
+  - cold: várias threads classificam ao mesmo tempo tenants ainda sem
+    modelo; cada tenant deve ser treinado exatamente uma vez e todas as
+    threads devem receber a mesma predição de um modelo treinado à parte;
+  - updates: enquanto threads classificam sem parar, os tenants são
+    atualizados várias vezes; nenhuma versão pode ser treinada mais de uma
+    vez, toda predição servida deve ser a de alguma versão publicada e, ao
+    final, o modelo de cada tenant deve estar na versão mais recente.
+
+Com --db, os tenants ficam em um banco SQLite e as phrases são lidas sob
+demanda, conferindo a versão de cada snapshot.
+
+Imprime o resultado em JSON e termina com código 1 se alguma verificação
+falhar.
+
+Uso:
+    python -m benchmarks.concurrency --threads 32 --tenants 8 --updates 10
+    python -m benchmarks.concurrency --db /tmp/concurrency.db
+"""
+from collections import Counter
+from typing import Dict, List, Tuple
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+
+from app.model import ModelManager
+from app.model_store import ModelStore
+from app.tenant_manager import TenantManager
+from app.tenant_model import TenantModel
+from app.tenant_storage import MemoryTenantStorage, SQLiteTenantStorage, TenantStorage
+from benchmarks.corpus import generate_corpus, generate_messages
+
+PROBE_COUNT = 20
+
+
+class CountingModelManager(ModelManager):
+    """ModelManager que conta os treinos completos por (tenant, versão)"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fits: Counter = Counter()
+        self._fits_lock = threading.Lock()
+
+    def _train(self, tenant):
+        with self._fits_lock:
+            self.fits[(tenant.tenant_id, tenant.version)] += 1
+        return super()._train(tenant)
+
+
+def create_storage(args, name: str) -> TenantStorage:
+    """Armazenamento dos tenants de um cenário: em memória ou em um banco SQLite novo"""
+    if not args.db:
+        return MemoryTenantStorage()
+    root, extension = os.path.splitext(args.db)
+    path = f"{root}-{name}{extension}"
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    return SQLiteTenantStorage(path)
+
+
+def reference_predictions(tenant, probes: List[str]) -> Tuple[Tuple[str, float], ...]:
+    """Predições das mensagens de sonda por um modelo treinado fora do ModelManager"""
+    phrases, labels = tenant.training_data()
+    model = TenantModel(tenant.tenant_id, tenant.language, phrases, labels, tenant.version)
+    return tuple(model.classify(message) for message in probes)
+
+
+def run_threads(count: int, target) -> List[BaseException]:
+    """Executa 'target(index)' em 'count' threads e devolve as exceções levantadas"""
+    errors: List[BaseException] = []
+
+    def wrapper(index: int):
+        try:
+            target(index)
+        except BaseException as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=wrapper, args=(index,)) for index in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return errors
+
+
+def cold_stampede(args, probes: List[str]) -> dict:
+    """Threads simultâneas classificam tenants sem modelo"""
+    tenants = TenantManager(storage=create_storage(args, "cold"))
+    configs = []
+    for index in range(args.tenants):
+        phrases, labels = generate_corpus(args.phrases, args.labels, args.vocabulary, seed=index)
+        configs.append(tenants.create_tenant(f"cold_{index}", "portuguese", phrases, labels))
+    expected = {tenant.tenant_id: reference_predictions(tenant, probes) for tenant in configs}
+
+    manager = CountingModelManager(store=ModelStore(None), training_workers=4)
+    barrier = threading.Barrier(args.threads)
+    observed: Dict[str, set] = {tenant.tenant_id: set() for tenant in configs}
+    lock = threading.Lock()
+
+    def worker(index: int):
+        barrier.wait()
+        for offset in range(len(configs)):
+            tenant = configs[(index + offset) % len(configs)]
+            model = manager.get_or_create_model(tenant)
+            predictions = tuple(model.classify(message) for message in probes)
+            with lock:
+                observed[tenant.tenant_id].add(predictions)
+
+    start = time.perf_counter()
+    errors = run_threads(args.threads, worker)
+    elapsed = time.perf_counter() - start
+
+    fits = {tenant.tenant_id: manager.fits[(tenant.tenant_id, tenant.version)] for tenant in configs}
+    inconsistent = [
+        tenant_id for tenant_id, results in observed.items()
+        if results != {expected[tenant_id]}
+    ]
+    return {
+        "threads": args.threads,
+        "tenants": len(configs),
+        "seconds": elapsed,
+        "fits": sum(fits.values()),
+        "tenants_trained_more_than_once": [tenant_id for tenant_id, count in fits.items() if count != 1],
+        "inconsistent_tenants": inconsistent,
+        "errors": [repr(e) for e in errors[:5]],
+        "ok": not errors and not inconsistent and all(count == 1 for count in fits.values()),
+    }
+
+
+def updates_under_load(args, probes: List[str]) -> dict:
+    """Atualizações sucessivas dos tenants enquanto threads classificam sem parar"""
+    tenants = TenantManager(storage=create_storage(args, "updates"))
+    tenant_ids = [f"update_{index}" for index in range(args.tenants)]
+    valid: Dict[str, set] = {}
+    versions: Dict[str, List[int]] = {}
+
+    def register(tenant):
+        valid.setdefault(tenant.tenant_id, set()).add(reference_predictions(tenant, probes))
+        versions.setdefault(tenant.tenant_id, []).append(tenant.version)
+
+    for index, tenant_id in enumerate(tenant_ids):
+        phrases, labels = generate_corpus(args.phrases, args.labels, args.vocabulary, seed=1000 + index)
+        register(tenants.create_tenant(tenant_id, "portuguese", phrases, labels))
+
+    manager = CountingModelManager(store=ModelStore(None), training_workers=4)
+    for tenant_id in tenant_ids:
+        manager.get_or_create_model(tenants.get_tenant(tenant_id))
+
+    stop = threading.Event()
+    observed: Dict[str, Counter] = {tenant_id: Counter() for tenant_id in tenant_ids}
+    lock = threading.Lock()
+
+    def reader(index: int):
+        position = index
+        while not stop.is_set():
+            tenant_id = tenant_ids[position % len(tenant_ids)]
+            position += 1
+            # Um único modelo por rodada, para que todas as sondas venham da mesma versão
+            model = manager.get_or_create_model(tenants.get_tenant(tenant_id))
+            predictions = tuple(model.classify(message) for message in probes)
+            with lock:
+                observed[tenant_id][predictions] += 1
+
+    def writer(_):
+        try:
+            for round_index in range(args.updates):
+                for index, tenant_id in enumerate(tenant_ids):
+                    seed = 2000 + round_index * len(tenant_ids) + index
+                    phrases, labels = generate_corpus(args.phrases, args.labels, args.vocabulary, seed=seed)
+                    tenant = tenants.update_tenant(tenant_id, phrases=phrases, labels=labels)
+                    register(tenant)
+                    manager.schedule_training(tenant)
+                time.sleep(args.update_interval)
+        finally:
+            stop.set()
+
+    start = time.perf_counter()
+    errors = run_threads(args.threads, lambda index: writer(index) if index == 0 else reader(index))
+    elapsed = time.perf_counter() - start
+
+    # Aguarda os treinos pendentes e confere a versão final de cada tenant
+    for tenant_id in tenant_ids:
+        state = manager.get_training_state(tenant_id)
+        if state is not None and state.future is not None:
+            state.future.result()
+    stale = [
+        tenant_id for tenant_id in tenant_ids
+        if manager.get_model(tenant_id).version != tenants.get_tenant(tenant_id).version
+    ]
+
+    duplicated = [f"{tenant_id}@{version}" for (tenant_id, version), count in manager.fits.items() if count > 1]
+    unexpected = {
+        tenant_id: sum(count for predictions, count in results.items() if predictions not in valid[tenant_id])
+        for tenant_id, results in observed.items()
+    }
+    classifications = sum(sum(results.values()) for results in observed.values())
+    return {
+        "threads": args.threads,
+        "tenants": len(tenant_ids),
+        "versions": sum(len(items) for items in versions.values()),
+        "seconds": elapsed,
+        "classifications": classifications * len(probes),
+        "fits": sum(manager.fits.values()),
+        "versions_trained_more_than_once": duplicated,
+        "unexpected_predictions": sum(unexpected.values()),
+        "stale_tenants": stale,
+        "errors": [repr(e) for e in errors[:5]],
+        "ok": not errors and not duplicated and not any(unexpected.values()) and not stale,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, default=32, help="Threads simultâneas")
+    parser.add_argument("--tenants", type=int, default=8, help="Tenants em cada cenário")
+    parser.add_argument("--phrases", type=int, default=300, help="Phrases por tenant")
+    parser.add_argument("--labels", type=int, default=5, help="Labels distintas por tenant")
+    parser.add_argument("--vocabulary", type=int, default=1000, help="Tamanho do vocabulário sintético")
+    parser.add_argument("--updates", type=int, default=10, help="Rodadas de atualização de todos os tenants")
+    parser.add_argument("--update-interval", type=float, default=0.01, help="Pausa, em segundos, entre as rodadas")
+    parser.add_argument("--db", default="", help="Caminho base dos bancos SQLite (padrão: tenants em memória)")
+    args = parser.parse_args()
+
+    probes = generate_messages(PROBE_COUNT, args.vocabulary)
+    result = {
+        "cold": cold_stampede(args, probes),
+        "updates": updates_under_load(args, probes),
+    }
+    print(json.dumps(result, indent=2))
+
+    if not all(scenario["ok"] for scenario in result.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
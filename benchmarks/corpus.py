@@ -0,0 +1,99 @@
+"""
+Gerador de tenants e corpora sintéticos para os benchmarks.
+
+As palavras são sequências pronunciáveis geradas a partir de uma semente, e
+cada label tem um subconjunto preferido do vocabulário, de modo que o modelo
+treinado tenha algo a aprender. Com a mesma semente, o corpus gerado é
+sempre o mesmo.
+"""
+from typing import List, Tuple
+import random
+
+CONSONANTS = "bcdfglmnprstvz"
+VOWELS = "aeiou"
+
+
+def generate_vocabulary(size: int, seed: int = 0) -> List[str]:
+    """Gera 'size' palavras distintas com 2 a 4 sílabas"""
+    rnd = random.Random(seed)
+    words = set()
+    while len(words) < size:
+        syllables = rnd.randint(2, 4)
+        words.add("".join(rnd.choice(CONSONANTS) + rnd.choice(VOWELS) for _ in range(syllables)))
+    return sorted(words)
+
+
+def generate_corpus(
+    phrases: int,
+    labels: int,
+    vocabulary: int,
+    words_per_phrase: int = 8,
+    topic_share: float = 0.6,
+    seed: int = 0
+) -> Tuple[List[str], List[str]]:
+    """
+    Gera um corpus de treinamento sintético
+
+    Args:
+        phrases: Número de phrases
+        labels: Número de labels distintas
+        vocabulary: Tamanho do vocabulário
+        words_per_phrase: Número médio de palavras por phrase
+        topic_share: Fração das palavras de cada phrase tirada do tópico da label
+        seed: Semente do gerador
+
+    Returns:
+        Tupla (phrases, labels)
+    """
+    rnd = random.Random(seed)
+    # O vocabulário é o mesmo para todas as sementes, como tenants de um mesmo idioma
+    words = generate_vocabulary(vocabulary)
+    label_names = [f"label_{index}" for index in range(labels)]
+    topic_size = max(1, len(words) // max(labels, 1))
+    topics = {
+        label: words[index * topic_size:(index + 1) * topic_size] or words
+        for index, label in enumerate(label_names)
+    }
+
+    corpus_phrases = []
+    corpus_labels = []
+    for index in range(phrases):
+        label = label_names[index % labels]
+        length = max(2, int(rnd.gauss(words_per_phrase, 2)))
+        tokens = [
+            rnd.choice(topics[label]) if rnd.random() < topic_share else rnd.choice(words)
+            for _ in range(length)
+        ]
+        corpus_phrases.append(" ".join(tokens))
+        corpus_labels.append(label)
+    return corpus_phrases, corpus_labels
+
+
+def generate_messages(count: int, vocabulary: int, words_per_message: int = 6, seed: int = 1) -> List[str]:
+    """Gera mensagens a classificar com palavras do mesmo vocabulário dos corpora"""
+    rnd = random.Random(seed)
+    words = generate_vocabulary(vocabulary)
+    return [
+        " ".join(rnd.choice(words) for _ in range(max(1, int(rnd.gauss(words_per_message, 2)))))
+        for _ in range(count)
+    ]
+
+
+def generate_tenants(
+    count: int,
+    phrases: int,
+    labels: int,
+    vocabulary: int,
+    prefix: str = "bench",
+    seed: int = 0
+) -> List[Tuple[str, List[str], List[str]]]:
+    """
+    Gera vários tenants sintéticos, cada um com o seu corpus
+
+    Returns:
+        Lista de tuplas (tenant_id, phrases, labels)
+    """
+    return [
+        (f"{prefix}_{index}", *generate_corpus(phrases, labels, vocabulary, seed=seed + index))
+        for index in range(count)
+    ]
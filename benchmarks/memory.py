@@ -0,0 +1,104 @@
+"""
+Benchmark da memória por tenant do modelo residente.
+
+Compara, para os mesmos tenants sintéticos, a representação anterior do
+modelo (TfidfVectorizer + MultinomialNB do scikit-learn mantidos após o
+treino, com o vocabulário em um dicionário de str e os arrays em float64)
+com a representação compacta do TenantModel (vocabulário em um buffer
+UTF-8, IDF e log-probabilidades em float32, sem o estado de treino). Mede
+também o engine "hashing", cuja memória não depende do vocabulário.
+
+A memória é medida com tracemalloc: o que continua alocado depois de
+treinar os 'count' modelos e manter uma referência a cada um. Também
+confere que as duas representações escolhem as mesmas classes. Imprime o
+resultado em JSON e termina com código 1 se a representação compacta não
+for menor ou se as classes divergirem.
+
+Uso:
+    python -m benchmarks.memory --tenants 100 --phrases 500 --labels 10 --vocabulary 2000
+"""
+from typing import Callable, List
+import argparse
+import gc
+import json
+import sys
+import tracemalloc
+
+from app.tenant_model import TenantModel
+from benchmarks.corpus import generate_messages, generate_tenants
+from benchmarks.scoring import sklearn_classify, sklearn_reference
+
+
+def retained_bytes(build: Callable[[str, List[str], List[str]], object], tenants) -> dict:
+    """Bytes que continuam alocados após construir (e manter) um modelo por tenant"""
+    gc.collect()
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    models = [build(tenant_id, phrases, labels) for tenant_id, phrases, labels in tenants]
+    gc.collect()
+    after, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "models": models,
+        "bytes_per_tenant": (after - before) / len(tenants),
+        "peak_bytes": peak - before,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tenants", type=int, default=100, help="Número de tenants")
+    parser.add_argument("--phrases", type=int, default=500, help="Phrases por tenant")
+    parser.add_argument("--labels", type=int, default=10, help="Labels distintas por tenant")
+    parser.add_argument("--vocabulary", type=int, default=2000, help="Tamanho do vocabulário sintético")
+    args = parser.parse_args()
+
+    tenants = list(generate_tenants(args.tenants, args.phrases, args.labels, args.vocabulary, "memory"))
+    # Carrega o pré-processador do idioma e o scikit-learn fora da medição
+    _, phrases, labels = tenants[0]
+    TenantModel("warmup", "portuguese", phrases, labels)
+
+    sklearn = retained_bytes(lambda tenant_id, p, l: sklearn_reference("portuguese", p, l), tenants)
+    compact = retained_bytes(lambda tenant_id, p, l: TenantModel(tenant_id, "portuguese", p, l), tenants)
+    hashing = retained_bytes(
+        lambda tenant_id, p, l: TenantModel(tenant_id, "portuguese", p, l, engine="hashing"), tenants
+    )
+
+    messages = generate_messages(50, args.vocabulary)
+    divergent = sum(
+        sklearn_classify(reference, message)[0] != model.classify(message)[0]
+        for reference, model in zip(sklearn["models"], compact["models"])
+        for message in messages
+    )
+    features = sum(model.scorer.n_features for model in compact["models"]) / len(tenants)
+    estimated = sum(model.memory_bytes() for model in compact["models"]) / len(tenants)
+
+    result = {
+        "tenants": args.tenants,
+        "phrases_per_tenant": args.phrases,
+        "labels": args.labels,
+        "features_per_tenant": features,
+        "sklearn": {
+            "bytes_per_tenant": sklearn["bytes_per_tenant"],
+            "peak_bytes": sklearn["peak_bytes"],
+        },
+        "compact": {
+            "bytes_per_tenant": compact["bytes_per_tenant"],
+            "estimated_bytes_per_tenant": estimated,
+            "peak_bytes": compact["peak_bytes"],
+        },
+        "hashing": {
+            "bytes_per_tenant": hashing["bytes_per_tenant"],
+            "n_features": hashing["models"][0].scorer.n_features,
+        },
+        "reduction": sklearn["bytes_per_tenant"] / compact["bytes_per_tenant"],
+        "divergent_predictions": divergent,
+    }
+    print(json.dumps(result, indent=2))
+
+    if divergent or result["reduction"] <= 1:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
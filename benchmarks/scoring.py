@@ -0,0 +1,116 @@
+"""
+Benchmark da latência de classificação de uma mensagem.
+
+Compara o caminho original (TfidfVectorizer.transform + predict_proba +
+dict/max) com o pontuador compilado (CompiledScorer) usando o corpus do
+tenant padrão, e verifica que ambos produzem as mesmas classes e as mesmas
+probabilidades, até a precisão de float32 usada pelo pontuador. Termina com
+código 1 se houver divergência.
+
+Uso:
+    python -m benchmarks.scoring --repeat 2000
+"""
+import argparse
+import json
+import statistics
+import sys
+import time
+from typing import Tuple
+
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.naive_bayes import MultinomialNB
+
+from app.tenant_model import NB_ALPHA, TenantModel
+from app.preprocessing import get_preprocessor
+from app.tenant_manager import tenant_manager
+
+# Diferença máxima aceita entre as probabilidades (IDF e log-probabilidades em float32)
+TOLERANCE = 1e-5
+
+
+def sklearn_reference(language: str, phrases, labels) -> Tuple[TfidfVectorizer, MultinomialNB]:
+    """TfidfVectorizer e MultinomialNB treinados como em TenantModel, que não os guarda"""
+    vectorizer = TfidfVectorizer(analyzer=get_preprocessor(language))
+    nb = MultinomialNB(alpha=NB_ALPHA).fit(vectorizer.fit_transform(phrases), labels)
+    return vectorizer, nb
+
+
+def sklearn_classify(reference, message: str):
+    """Caminho de classificação anterior ao pontuador compilado"""
+    vectorizer, nb = reference
+    probs = nb.predict_proba(vectorizer.transform([message]))[0]
+    result = dict(zip(nb.classes_, probs))
+    classification = max(result, key=result.get)
+    return classification, result[classification]
+
+
+def measure(fn, messages, repeat):
+    """Latência por chamada (em microssegundos) ao classificar as mensagens em ciclo"""
+    samples = []
+    for i in range(repeat):
+        message = messages[i % len(messages)]
+        start = time.perf_counter()
+        fn(message)
+        samples.append((time.perf_counter() - start) * 1e6)
+    samples.sort()
+    return {
+        "p50_us": statistics.median(samples),
+        "p99_us": samples[int(len(samples) * 0.99) - 1],
+        "mean_us": statistics.fmean(samples),
+    }
+
+
+def check_equivalence(model: TenantModel, reference, messages):
+    """Compara probabilidades e classes do pontuador com as do scikit-learn"""
+    vectorizer, nb = reference
+    expected = nb.predict_proba(vectorizer.transform(messages))
+    actual = np.vstack([model.scorer.predict_proba(message) for message in messages])
+    same_class = all(
+        sklearn_classify(reference, message)[0] == model.scorer.top_k(message, 1)[0][0]
+        for message in messages
+    )
+    return {
+        "messages": len(messages),
+        "max_abs_diff": float(np.abs(expected - actual).max()),
+        "same_classes": same_class,
+        "batch_max_abs_diff": float(np.abs(
+            expected - model.scorer.predict_proba_matrix(model.scorer.transform(messages))
+        ).max()),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=2000, help="Número de classificações medidas por caminho")
+    args = parser.parse_args()
+
+    tenant = tenant_manager.get_tenant("default")
+    phrases, labels = tenant.training_data()
+    model = TenantModel(tenant.tenant_id, tenant.language, phrases, labels)
+    reference = sklearn_reference(tenant.language, phrases, labels)
+    messages = list(phrases) + [
+        "Olá, qual é o prazo de entrega para São Paulo?",
+        "mensagem sem nenhuma palavra conhecida xyzzy",
+        "",
+    ]
+
+    equivalence = check_equivalence(model, reference, messages)
+    result = {
+        "equivalence": equivalence,
+        "sklearn": measure(lambda m: sklearn_classify(reference, m), messages, args.repeat),
+        "compiled": measure(model.scorer.top_k, messages, args.repeat),
+    }
+    result["speedup_p50"] = result["sklearn"]["p50_us"] / result["compiled"]["p50_us"]
+    print(json.dumps(result, indent=2))
+
+    if (
+        not equivalence["same_classes"]
+        or equivalence["max_abs_diff"] > TOLERANCE
+        or equivalence["batch_max_abs_diff"] > TOLERANCE
+    ):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
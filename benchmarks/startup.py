@@ -0,0 +1,66 @@
+"""
+Benchmark do tempo de inicialização.
+
+Mede, em subprocessos novos, o tempo para importar a aplicação e o tempo
+até a primeira classificação (que inclui importar o scikit-learn e treinar
+o tenant padrão). O resultado é impresso em JSON.
+
+Uso:
+    NLTK_OFFLINE=1 python -m benchmarks.startup --runs 5
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+IMPORT_SNIPPET = """
+import time
+start = time.perf_counter()
+import app.main
+print(time.perf_counter() - start)
+"""
+
+FIRST_CLASSIFY_SNIPPET = """
+import time
+start = time.perf_counter()
+from app.model import classify_message
+classify_message("Qual o prazo de entrega?")
+print(time.perf_counter() - start)
+"""
+
+
+def run_snippet(snippet: str) -> float:
+    """Executa o trecho em um interpretador novo e retorna o tempo medido por ele"""
+    output = subprocess.run(
+        [sys.executable, "-c", snippet],
+        check=True,
+        capture_output=True,
+        text=True
+    ).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def summarize(samples):
+    return {
+        "median_s": statistics.median(samples),
+        "min_s": min(samples),
+        "max_s": max(samples),
+        "runs": len(samples),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="Número de execuções de cada medição")
+    args = parser.parse_args()
+
+    result = {
+        "import_app": summarize([run_snippet(IMPORT_SNIPPET) for _ in range(args.runs)]),
+        "first_classify": summarize([run_snippet(FIRST_CLASSIFY_SNIPPET) for _ in range(args.runs)]),
+    }
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
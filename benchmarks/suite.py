@@ -0,0 +1,371 @@
+"""
+Suíte de benchmarks do classificador com tenants sintéticos.
+
+Mede, com corpora gerados por benchmarks.corpus:
+  - http_classify: latência de POST /classify (p50/p99) por um cliente ASGI
+    em processo, sem rede, e a vazão com requisições concorrentes;
+  - http_batch: vazão de POST /classify/batch por tamanho de lote;
+  - model_classify: latência de TenantModel.classify;
+  - training: tempo de treino (TenantModel._train) por tamanho de corpus;
+  - memory: memória alocada por tenant (tracemalloc e RSS) comparada à
+    estimativa do ModelManager;
+  - scaling: comportamento do ModelManager conforme o número de tenants
+    cresce (treino a frio, classificação a quente, memória e, com limite de
+    modelos residentes, descartes e recarregamentos).
+
+O resultado é impresso em JSON e, com --output, salvo em arquivo para
+comparar execuções.
+
+Uso:
+    python -m benchmarks.suite --phrases 500 --labels 10 --vocabulary 2000 \\
+        --scale-tenants 10,100,500 --output bench-results.json
+"""
+from typing import Dict, List, Sequence, Tuple
+import argparse
+import asyncio
+import datetime
+import gc
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from app.main import app
+from app.model import ModelManager
+from app.model_store import ModelStore
+from app.tenant_manager import TenantConfig, tenant_manager
+from app.tenant_model import TenantModel
+from benchmarks.corpus import generate_corpus, generate_messages, generate_tenants
+
+
+def percentiles(samples_us: List[float]) -> Dict[str, float]:
+    """p50, p99 e média de uma lista de latências em microssegundos"""
+    samples = sorted(samples_us)
+    return {
+        "p50_us": statistics.median(samples),
+        "p99_us": samples[max(0, int(len(samples) * 0.99) - 1)],
+        "mean_us": statistics.fmean(samples),
+        "samples": len(samples),
+    }
+
+
+def resident_memory_bytes() -> int:
+    """Memória residente (RSS) atual do processo"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        import resource
+
+        # Sem /proc, usa o pico de RSS (em KB no Linux, em bytes no macOS)
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+async def asgi_request(method: str, path: str, payload=None) -> Tuple[int, bytes]:
+    """Executa uma requisição diretamente na aplicação ASGI, sem servidor nem rede"""
+    body = json.dumps(payload).encode("utf-8") if payload is not None else b""
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode("ascii"),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [
+            (b"host", b"benchmark"),
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode("ascii")),
+        ],
+        "client": ("127.0.0.1", 0),
+        "server": ("benchmark", 80),
+    }
+    pending = [{"type": "http.request", "body": body, "more_body": False}]
+    disconnected = asyncio.Event()
+
+    async def receive():
+        if pending:
+            return pending.pop()
+        await disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    status = 0
+    chunks = []
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+
+    await app(scope, receive, send)
+    disconnected.set()
+    return status, b"".join(chunks)
+
+
+def register_tenants(tenants: Sequence[Tuple[str, List[str], List[str]]]) -> List[TenantConfig]:
+    """Cadastra os tenants sintéticos no gerenciador global e treina seus modelos"""
+    from app.model import model_manager
+
+    configs = []
+    for tenant_id, phrases, labels in tenants:
+        if tenant_manager.tenant_exists(tenant_id):
+            tenant_manager.delete_tenant(tenant_id)
+            model_manager.remove_model(tenant_id)
+        tenant = tenant_manager.create_tenant(tenant_id, "portuguese", phrases, labels)
+        model_manager.get_or_create_model(tenant)
+        configs.append(tenant)
+    return configs
+
+
+def cleanup_tenants(tenants: Sequence[TenantConfig]):
+    """Remove os tenants sintéticos do gerenciador global"""
+    from app.model import model_manager
+
+    for tenant in tenants:
+        tenant_manager.delete_tenant(tenant.tenant_id)
+        model_manager.remove_model(tenant.tenant_id)
+
+
+async def bench_http_classify(tenant_ids: List[str], messages: List[str], requests: int, concurrency: int) -> dict:
+    """Latência sequencial e vazão concorrente de POST /classify"""
+    samples = []
+    for index in range(requests):
+        payload = {"message": messages[index % len(messages)], "tenant_id": tenant_ids[index % len(tenant_ids)]}
+        start = time.perf_counter()
+        status, _ = await asgi_request("POST", "/classify", payload)
+        samples.append((time.perf_counter() - start) * 1e6)
+        if status != 200:
+            raise RuntimeError(f"/classify retornou {status}")
+
+    async def worker(offset: int):
+        for index in range(offset, requests, concurrency):
+            await asgi_request(
+                "POST", "/classify",
+                {"message": messages[index % len(messages)], "tenant_id": tenant_ids[index % len(tenant_ids)]}
+            )
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(offset) for offset in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    return {
+        "sequential": percentiles(samples),
+        "concurrent": {
+            "concurrency": concurrency,
+            "requests": requests,
+            "requests_per_s": requests / elapsed,
+        },
+    }
+
+
+async def bench_http_batch(tenant_id: str, messages: List[str], batch_sizes: List[int], rounds: int) -> dict:
+    """Vazão de POST /classify/batch para cada tamanho de lote"""
+    result = {}
+    for size in batch_sizes:
+        batch = [messages[index % len(messages)] for index in range(size)]
+        samples = []
+        for _ in range(rounds):
+            start = time.perf_counter()
+            status, _ = await asgi_request("POST", "/classify/batch", {"tenant_id": tenant_id, "messages": batch})
+            samples.append((time.perf_counter() - start) * 1e6)
+            if status != 200:
+                raise RuntimeError(f"/classify/batch retornou {status}")
+        stats = percentiles(samples)
+        stats["messages_per_s"] = size / (stats["p50_us"] / 1e6)
+        result[str(size)] = stats
+    return result
+
+
+def bench_model_classify(model: TenantModel, messages: List[str], repeat: int) -> dict:
+    """Latência de TenantModel.classify, sem a camada HTTP"""
+    samples = []
+    for index in range(repeat):
+        message = messages[index % len(messages)]
+        start = time.perf_counter()
+        model.classify(message)
+        samples.append((time.perf_counter() - start) * 1e6)
+    return percentiles(samples)
+
+
+def bench_training(sizes: List[int], labels: int, vocabulary: int, runs: int) -> List[dict]:
+    """Tempo de treino de um modelo para cada tamanho de corpus"""
+    result = []
+    for size in sizes:
+        phrases, corpus_labels = generate_corpus(size, labels, vocabulary, seed=size)
+        timings = []
+        model = None
+        for _ in range(runs):
+            start = time.perf_counter()
+            model = TenantModel("bench_training", "portuguese", phrases, corpus_labels)
+            timings.append((time.perf_counter() - start) * 1000)
+        best = min(timings)
+        result.append({
+            "phrases": size,
+            "features": model.scorer.n_features,
+            "best_ms": best,
+            "median_ms": statistics.median(timings),
+            "ms_per_1k_phrases": best / size * 1000,
+        })
+    return result
+
+
+def bench_memory(count: int, phrases: int, labels: int, vocabulary: int) -> dict:
+    """Memória alocada por tenant ao treinar 'count' modelos em um ModelManager novo"""
+    tenants = [
+        TenantConfig(tenant_id, "portuguese", tenant_phrases, tenant_labels)
+        for tenant_id, tenant_phrases, tenant_labels in generate_tenants(count, phrases, labels, vocabulary, "mem")
+    ]
+    manager = ModelManager(store=ModelStore(None), max_resident_models=0, memory_budget_bytes=0)
+    # Carrega o pré-processador do idioma e o scikit-learn fora da medição
+    TenantModel("warmup", "portuguese", tenants[0].phrases, tenants[0].labels)
+
+    gc.collect()
+    rss_before = resident_memory_bytes()
+    tracemalloc.start()
+    traced_before, _ = tracemalloc.get_traced_memory()
+    for tenant in tenants:
+        manager.get_or_create_model(tenant)
+    gc.collect()
+    traced_after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    rss_after = resident_memory_bytes()
+
+    stats = manager.stats()
+    return {
+        "tenants": count,
+        "phrases_per_tenant": phrases,
+        "traced_bytes_per_tenant": (traced_after - traced_before) / count,
+        "rss_bytes_per_tenant": (rss_after - rss_before) / count,
+        "estimated_bytes_per_tenant": stats["estimated_memory_bytes"] / count,
+    }
+
+
+def bench_scaling(
+    counts: List[int],
+    phrases: int,
+    labels: int,
+    vocabulary: int,
+    messages: List[str],
+    lookups: int,
+    max_resident_ratio: float
+) -> List[dict]:
+    """Treino a frio, classificação a quente e memória do ModelManager por número de tenants"""
+    rnd = random.Random(0)
+    result = []
+    for count in counts:
+        tenants = [
+            TenantConfig(tenant_id, "portuguese", tenant_phrases, tenant_labels)
+            for tenant_id, tenant_phrases, tenant_labels in generate_tenants(count, phrases, labels, vocabulary, "scale")
+        ]
+        limits = [0] + ([max(1, int(count * max_resident_ratio))] if max_resident_ratio > 0 else [])
+        for max_resident in limits:
+            manager = ModelManager(store=ModelStore(None), max_resident_models=max_resident, memory_budget_bytes=0)
+            gc.collect()
+            rss_before = resident_memory_bytes()
+
+            cold = []
+            for tenant in tenants:
+                start = time.perf_counter()
+                manager.classify_message(tenant, messages[0])
+                cold.append((time.perf_counter() - start) * 1e6)
+
+            warm = []
+            for index in range(lookups):
+                tenant = tenants[rnd.randrange(count)]
+                start = time.perf_counter()
+                manager.classify_message(tenant, messages[index % len(messages)])
+                warm.append((time.perf_counter() - start) * 1e6)
+
+            stats = manager.stats()
+            result.append({
+                "tenants": count,
+                "max_resident_models": max_resident,
+                "cold_classify": percentiles(cold),
+                "warm_classify": percentiles(warm),
+                "resident_models": stats["resident_models"],
+                "estimated_memory_bytes": stats["estimated_memory_bytes"],
+                "rss_delta_bytes": resident_memory_bytes() - rss_before,
+                "evictions": stats["evictions"],
+                "reloads": stats["reloads"],
+            })
+    return result
+
+
+def parse_sizes(value: str) -> List[int]:
+    return [int(item) for item in value.split(",") if item.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tenants", type=int, default=10, help="Tenants usados nos benchmarks HTTP")
+    parser.add_argument("--phrases", type=int, default=500, help="Phrases por tenant")
+    parser.add_argument("--labels", type=int, default=10, help="Labels distintas por tenant")
+    parser.add_argument("--vocabulary", type=int, default=2000, help="Tamanho do vocabulário sintético")
+    parser.add_argument("--requests", type=int, default=2000, help="Requisições medidas em /classify")
+    parser.add_argument("--concurrency", type=int, default=32, help="Requisições simultâneas no teste de vazão")
+    parser.add_argument("--batch-sizes", type=parse_sizes, default=[1, 16, 128, 1024], help="Tamanhos de lote de /classify/batch")
+    parser.add_argument("--train-sizes", type=parse_sizes, default=[100, 1000, 5000, 20000], help="Tamanhos de corpus do benchmark de treino")
+    parser.add_argument("--train-runs", type=int, default=3, help="Treinos medidos por tamanho de corpus")
+    parser.add_argument("--memory-tenants", type=int, default=50, help="Tenants treinados na medição de memória")
+    parser.add_argument("--scale-tenants", type=parse_sizes, default=[10, 100, 500], help="Números de tenants do teste de escala")
+    parser.add_argument("--scale-phrases", type=int, default=100, help="Phrases por tenant no teste de escala")
+    parser.add_argument("--max-resident-ratio", type=float, default=0.25, help="Fração de tenants residentes na rodada com limite LRU")
+    parser.add_argument("--output", help="Arquivo onde o resultado em JSON é salvo")
+    args = parser.parse_args()
+
+    import sklearn
+
+    messages = generate_messages(1000, args.vocabulary)
+    synthetic = generate_tenants(args.tenants, args.phrases, args.labels, args.vocabulary)
+    configs = register_tenants(synthetic)
+    tenant_ids = [tenant.tenant_id for tenant in configs]
+
+    try:
+        http_classify = asyncio.run(bench_http_classify(tenant_ids, messages, args.requests, args.concurrency))
+        http_batch = asyncio.run(bench_http_batch(tenant_ids[0], messages, args.batch_sizes, rounds=20))
+    finally:
+        cleanup_tenants(configs)
+
+    _, phrases, labels = synthetic[0]
+    model = TenantModel("bench_model", "portuguese", phrases, labels)
+
+    result = {
+        "meta": {
+            "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "numpy": np.__version__,
+            "scikit_learn": sklearn.__version__,
+            "args": {name: value for name, value in vars(args).items() if name != "output"},
+        },
+        "http_classify": http_classify,
+        "http_batch": http_batch,
+        "model_classify": bench_model_classify(model, messages, args.requests),
+        "training": bench_training(args.train_sizes, args.labels, args.vocabulary, args.train_runs),
+        "memory": bench_memory(args.memory_tenants, args.phrases, args.labels, args.vocabulary),
+        "scaling": bench_scaling(
+            args.scale_tenants, args.scale_phrases, args.labels, args.vocabulary,
+            messages, args.requests, args.max_resident_ratio
+        ),
+    }
+
+    output = json.dumps(result, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+
+
+if __name__ == "__main__":
+    main()
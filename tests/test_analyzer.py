@@ -0,0 +1,99 @@
+"""
+Equivalência entre o LanguagePreprocessor (tabela de str.translate) e o
+analisador padrão do TfidfVectorizer usado antes dele (lowercase +
+strip_accents='unicode' + token_pattern + stop_words).
+"""
+import pickle
+
+import pytest
+from sklearn.feature_extraction.text import strip_accents_unicode
+
+from app.preprocessing import _FOLD_CACHE_LIMIT, fold_text, get_preprocessor
+from app.tenant_manager import tenant_manager
+from benchmarks.analyzer import random_texts, sklearn_analyzer
+
+# O scikit-learn avisa que as stopwords com acento não batem com os tokens
+# sem acento; é o comportamento original que está sendo reproduzido
+pytestmark = pytest.mark.filterwarnings("ignore:Your stop_words may be inconsistent")
+
+# Casos difíceis do fold: sigma final, I com ponto, ß maiúsculo, ligaduras,
+# dígrafos titlecase, compatibilidade, marcas combinantes soltas, Hangul e
+# caracteres fora do plano básico
+EDGE_CASES = [
+    "ΟΔΥΣΣΕΥΣ", "ΌΣΟΣ Σ σς", "Σ.", "aΣb", "İstanbul", "DİYARBAKIR ıi",
+    "STRAẞE straße", "ﬁnal ﬂuxo ﬃ", "ǅemal ǈubljana ǋ", "x²³ ½ Ⅻⅻ ① ㎏ ™",
+    "é", "ção", "̧́̈ só marcas", "á̧b", "한국어 텍스트",
+    "日本語のテキスト", "\U0001d400\U0001d7ce \U0001f600", "ＡＢＣ ｆｕｌｌ",
+    "ﬅ ﬆ Å Ω K", "", "   ",
+]
+
+LANGUAGE_TEXTS = {
+    "portuguese": [
+        "Olá, qual é o prazo de entrega para São Paulo?",
+        "NÃO consigo acessar a minha conta e o pedido não chegou",
+        "Vocês têm promoção para os produtos que estão no carrinho?",
+    ],
+    "english": [
+        "What is the price of the product?",
+        "I have NOT been able to log into my account since yesterday",
+        "Why don't you ship to the islands?",
+    ],
+    "spanish": [
+        "¿Cuál es el precio del producto?",
+        "Mi pedido no ha llegado y nadie me responde",
+        "Quiero cancelar la suscripción que tengo con ustedes",
+    ],
+}
+
+
+def reference_fold(text):
+    return strip_accents_unicode(text.lower())
+
+
+@pytest.mark.parametrize("text", EDGE_CASES)
+def test_fold_matches_sklearn_on_edge_cases(text):
+    assert fold_text(text) == reference_fold(text)
+
+
+def test_fold_table_matches_sklearn_for_every_cached_codepoint():
+    # Apenas os code points abaixo do limite ficam na tabela; acima dele o
+    # fold é calculado diretamente e coberto pelos casos acima
+    bad = [
+        hex(codepoint) for codepoint in range(_FOLD_CACHE_LIMIT)
+        if fold_text(f"x{chr(codepoint)}Y") != reference_fold(f"x{chr(codepoint)}Y")
+    ]
+    assert bad == []
+
+
+@pytest.mark.parametrize("language", sorted(LANGUAGE_TEXTS))
+def test_tokens_match_sklearn(language):
+    reference = sklearn_analyzer(language)
+    preprocessor = get_preprocessor(language)
+    texts = LANGUAGE_TEXTS[language] + EDGE_CASES + random_texts(2000, seed=len(language))
+    mismatches = [text for text in texts if preprocessor(text) != reference(text)]
+    assert mismatches == []
+
+
+@pytest.mark.parametrize("language", sorted(LANGUAGE_TEXTS))
+def test_stopwords_are_removed(language):
+    preprocessor = get_preprocessor(language)
+    if not preprocessor.stop_words:
+        pytest.skip(f"stopwords de '{language}' não instaladas")
+    for text in LANGUAGE_TEXTS[language]:
+        tokens = preprocessor(text)
+        removed = set(preprocessor.tokenize(preprocessor.preprocess(text))) - set(tokens)
+        assert removed, text
+        assert not set(tokens) & preprocessor.stop_words
+
+
+def test_default_tenant_corpus_matches_sklearn():
+    tenant = tenant_manager.get_tenant("default")
+    phrases, _ = tenant.training_data()
+    reference = sklearn_analyzer(tenant.language)
+    preprocessor = get_preprocessor(tenant.language)
+    assert [preprocessor(phrase) for phrase in phrases] == [reference(phrase) for phrase in phrases]
+
+
+def test_language_aliases_share_one_preprocessor():
+    assert get_preprocessor("português") is get_preprocessor("portuguese")
+    assert pickle.loads(pickle.dumps(get_preprocessor("english"))) is get_preprocessor("english")
@@ -0,0 +1,57 @@
+"""
+Micro-batching das requisições de /classify.
+"""
+import asyncio
+import gc
+import threading
+
+from app.batching import MicroBatcher
+
+
+def echo_batch(context, messages):
+    return [(f"{context}:{message}", 1.0) for message in messages]
+
+
+def test_concurrent_requests_share_a_batch():
+    batcher = MicroBatcher(echo_batch, window_ms=5, max_batch_size=64)
+    
+    async def main():
+        return await asyncio.gather(*(batcher.submit("t", "t", str(i)) for i in range(10)))
+    
+    results = asyncio.run(main())
+    assert results == [(f"t:{i}", 1.0) for i in range(10)]
+    assert batcher.batch_sizes.as_dict()["count"] == 1
+
+
+def test_in_flight_batch_survives_garbage_collection():
+    release = threading.Event()
+    
+    def slow_batch(context, messages):
+        release.wait(5)
+        return echo_batch(context, messages)
+    
+    batcher = MicroBatcher(slow_batch, window_ms=1000, max_batch_size=2)
+    
+    async def main():
+        waiters = [asyncio.ensure_future(batcher.submit("t", "t", str(i))) for i in range(2)]
+        await asyncio.sleep(0.05)
+        # O lote em andamento é referenciado apenas pelo MicroBatcher
+        assert len(batcher._tasks) == 1
+        gc.collect()
+        release.set()
+        return await asyncio.gather(*waiters)
+    
+    assert asyncio.run(main()) == [("t:0", 1.0), ("t:1", 1.0)]
+    assert not batcher._tasks
+
+
+def test_close_flushes_pending_groups():
+    batcher = MicroBatcher(echo_batch, window_ms=60_000, max_batch_size=64)
+    
+    async def main():
+        waiter = asyncio.ensure_future(batcher.submit("t", "t", "x"))
+        await asyncio.sleep(0)
+        await batcher.close()
+        return await waiter
+    
+    assert asyncio.run(main()) == ("t:x", 1.0)
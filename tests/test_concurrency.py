@@ -0,0 +1,106 @@
+"""
+Treinamento single-flight sob carga: /classify e PUT concorrentes em um
+mesmo tenant (versão reduzida do cenário de benchmarks/concurrency.py).
+"""
+from collections import Counter
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.model import model_manager
+from app.tenant_manager import tenant_manager
+from app.tenant_model import TenantModel
+from benchmarks.concurrency import run_threads
+from benchmarks.corpus import generate_corpus, generate_messages
+
+TENANT_ID = "concurrency-test"
+THREADS = 16
+ROUNDS = 5
+
+
+def expected_responses(phrases, labels, probes):
+    """Resposta de /classify de cada sonda, com um modelo treinado fora do ModelManager"""
+    model = TenantModel(TENANT_ID, "portuguese", phrases, labels)
+    predictions = model.classify_batch(probes)
+    return {message: (label, round(probability, 2)) for message, (label, probability) in zip(probes, predictions)}
+
+
+@pytest.fixture
+def fits(monkeypatch):
+    """Conta os treinos completos do model_manager global por (tenant, versão)"""
+    counts = Counter()
+    lock = threading.Lock()
+    train = model_manager._train
+
+    def counting_train(tenant):
+        with lock:
+            counts[(tenant.tenant_id, tenant.version)] += 1
+        return train(tenant)
+
+    monkeypatch.setattr(model_manager, "_train", counting_train)
+    return counts
+
+
+def test_concurrent_classify_and_put_train_each_version_once(fits):
+    phrases, labels = generate_corpus(300, 5, 500, seed=11)
+    # A versão nova troca as labels entre si, para que cada sonda mude de classe
+    names = sorted(set(labels))
+    renamed = dict(zip(names, names[1:] + names[:1]))
+    new_labels = [renamed[label] for label in labels]
+    probes = generate_messages(10, 500, seed=3)
+    valid = {
+        "old": expected_responses(phrases, labels, probes),
+        "new": expected_responses(phrases, new_labels, probes),
+    }
+
+    with TestClient(app) as client:
+        created = client.post("/tenants", json={"tenant_id": TENANT_ID, "phrases": phrases, "labels": labels})
+        assert created.status_code == 201
+        try:
+            barrier = threading.Barrier(THREADS + 1)
+            responses = []
+            updated = []
+            lock = threading.Lock()
+
+            def worker(index):
+                barrier.wait()
+                if index == THREADS:
+                    updated.append(client.put(f"/tenants/{TENANT_ID}", json={"phrases": phrases, "labels": new_labels}))
+                    return
+                for round_index in range(ROUNDS):
+                    message = probes[(index + round_index) % len(probes)]
+                    response = client.post("/classify", json={"tenant_id": TENANT_ID, "message": message})
+                    with lock:
+                        responses.append((message, response))
+
+            errors = run_threads(THREADS + 1, worker)
+            assert errors == []
+            assert updated[0].status_code == 200
+
+            state = model_manager.get_training_state(TENANT_ID)
+            if state is not None and state.future is not None:
+                state.future.result()
+            latest = tenant_manager.get_tenant(TENANT_ID)
+            assert model_manager.get_model(TENANT_ID).version == latest.version
+
+            # Cada versão foi treinada no máximo uma vez, e a versão final exatamente uma
+            assert all(count == 1 for count in fits.values()), fits
+            assert fits[(TENANT_ID, latest.version)] == 1
+            assert {tenant_id for tenant_id, _ in fits} == {TENANT_ID}
+
+            # Toda resposta veio inteira de um dos dois modelos publicados
+            assert len(responses) == THREADS * ROUNDS
+            for message, response in responses:
+                assert response.status_code == 200
+                body = response.json()
+                answer = (body["classification"], body["probability"])
+                assert answer in (valid["old"][message], valid["new"][message])
+
+            # Depois do retreino, só o modelo novo responde
+            for message in probes:
+                body = client.post("/classify", json={"tenant_id": TENANT_ID, "message": message}).json()
+                assert (body["classification"], body["probability"]) == valid["new"][message]
+        finally:
+            client.delete(f"/tenants/{TENANT_ID}")
@@ -0,0 +1,145 @@
+"""
+Engine "hashing": equivalência do treino em partes com o scikit-learn
+(HashingVectorizer + MultinomialNB), ida e volta pelo ModelStore e troca de
+engine pela API.
+"""
+from collections import Counter
+import threading
+import zlib
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.naive_bayes import MultinomialNB
+
+from app import config
+from app.main import app
+from app.model import model_manager
+from app.model_store import ModelStore, training_fingerprint
+from app.preprocessing import get_preprocessor
+from app.scorer import HashedFeatures
+from app.tenant_model import NB_ALPHA, TenantModel
+from benchmarks.corpus import generate_corpus, generate_messages
+
+TENANT_ID = "hashing-test"
+TOLERANCE = 1e-5
+
+
+@pytest.fixture(scope="module")
+def corpus():
+    return generate_corpus(300, 5, 300, seed=13)
+
+
+def probabilities(model, messages):
+    return np.array([model.scorer.predict_proba(message) for message in messages])
+
+
+def test_matches_sklearn_hashing_pipeline(corpus, monkeypatch):
+    # Partes pequenas para acumular as contagens em várias etapas, e colunas
+    # suficientes para que nenhum termo do teste colida
+    monkeypatch.setattr(config, "HASHING_CHUNK_ROWS", 7)
+    monkeypatch.setattr(config, "HASHING_FEATURES", 2 ** 20)
+    phrases, labels = corpus
+    analyzer = get_preprocessor("portuguese")
+    messages = generate_messages(50, 300, seed=4)
+
+    # O CRC32 e o murmurhash do scikit-learn levam os termos a colunas
+    # diferentes; sem colisões em nenhum dos dois, o Naive Bayes é o mesmo
+    terms = {token for text in list(phrases) + messages for token in analyzer(text)}
+    vectorizer = HashingVectorizer(
+        analyzer=analyzer, n_features=config.HASHING_FEATURES, alternate_sign=False, norm="l2"
+    )
+    sklearn_columns = set(vectorizer.transform(sorted(terms)).indices.tolist())
+    crc_columns = {zlib.crc32(term.encode("utf-8")) % config.HASHING_FEATURES for term in terms}
+    assert len(sklearn_columns) == len(crc_columns) == len(terms)
+
+    nb = MultinomialNB(alpha=NB_ALPHA).fit(vectorizer.transform(phrases), labels)
+    model = TenantModel("t", "portuguese", phrases, labels, engine="hashing")
+
+    assert list(model.scorer.classes) == list(nb.classes_)
+    assert isinstance(model.scorer.vocabulary, HashedFeatures)
+    np.testing.assert_allclose(
+        probabilities(model, messages), nb.predict_proba(vectorizer.transform(messages)), atol=TOLERANCE
+    )
+    np.testing.assert_allclose(model.class_count, nb.class_count_)
+
+
+def test_round_trip_through_model_store(corpus, tmp_path, monkeypatch):
+    phrases, labels = corpus
+    model = TenantModel("t", "portuguese", phrases, labels, engine="hashing")
+    fingerprint = training_fingerprint("portuguese", phrases, labels, "hashing")
+    store = ModelStore(str(tmp_path / "models"))
+    store.save("t", fingerprint, "portuguese", model.to_arrays(), engine="hashing")
+    added = [("mensagem totalmente nova", labels[0])]
+    fresh = TenantModel("t", "portuguese", list(phrases) + [added[0][0]], list(labels) + [labels[0]], engine="hashing")
+
+    # O modelo salvo mantém as suas colunas mesmo que HASHING_FEATURES mude
+    monkeypatch.setattr(config, "HASHING_FEATURES", 2 ** 10)
+    artifact = store.load("t", fingerprint)
+    assert artifact["engine"] == "hashing"
+    assert "term_bytes" not in artifact["arrays"] and "idf" not in artifact["arrays"]
+    loaded = TenantModel.from_arrays("t", "portuguese", 0, artifact["arrays"], engine=artifact["engine"])
+
+    assert loaded.engine == "hashing"
+    assert len(loaded.scorer.vocabulary) == len(model.scorer.vocabulary)
+    messages = generate_messages(30, 300, seed=8)
+    np.testing.assert_allclose(probabilities(loaded, messages), probabilities(model, messages), atol=TOLERANCE)
+
+    # Atualizações incrementais partem do modelo carregado (arrays somente leitura)
+    updated = loaded.apply_changes(added, [], 1)
+    np.testing.assert_allclose(probabilities(updated, messages), probabilities(fresh, messages), atol=TOLERANCE)
+
+
+@pytest.fixture
+def fits(monkeypatch):
+    """Conta os treinos completos do model_manager global por (tenant, versão)"""
+    counts = Counter()
+    lock = threading.Lock()
+    train = model_manager._train
+
+    def counting_train(tenant):
+        with lock:
+            counts[(tenant.tenant_id, tenant.version)] += 1
+        return train(tenant)
+
+    monkeypatch.setattr(model_manager, "_train", counting_train)
+    return counts
+
+
+def wait_for_training(tenant_id):
+    state = model_manager.get_training_state(tenant_id)
+    if state is not None and state.future is not None:
+        state.future.result()
+
+
+def test_engine_change_retrains(corpus, fits):
+    phrases, labels = corpus
+    message = generate_messages(1, 300, seed=9)[0]
+
+    with TestClient(app) as client:
+        created = client.post("/tenants", json={"tenant_id": TENANT_ID, "phrases": phrases, "labels": labels})
+        assert created.status_code == 201
+        assert created.json()["engine"] == "tfidf"
+        try:
+            assert client.post("/classify", json={"tenant_id": TENANT_ID, "message": message}).status_code == 200
+            assert model_manager.get_model(TENANT_ID).engine == "tfidf"
+
+            # Mesmas phrases, engine diferente: exige um treino completo
+            updated = client.put(f"/tenants/{TENANT_ID}", json={"engine": "hashing"})
+            assert updated.status_code == 200
+            assert updated.json()["engine"] == "hashing"
+            wait_for_training(TENANT_ID)
+
+            model = model_manager.get_model(TENANT_ID)
+            assert model.engine == "hashing"
+            assert model.incremental_rows == 0
+            assert isinstance(model.scorer.vocabulary, HashedFeatures)
+            assert fits[(TENANT_ID, model.version)] == 1
+            assert sum(fits.values()) == 2
+
+            body = client.post("/classify", json={"tenant_id": TENANT_ID, "message": message}).json()
+            expected = TenantModel(TENANT_ID, "portuguese", phrases, labels, engine="hashing").classify(message)
+            assert (body["classification"], body["probability"]) == (expected[0], round(expected[1], 2))
+        finally:
+            client.delete(f"/tenants/{TENANT_ID}")
@@ -0,0 +1,203 @@
+"""
+Atualizações incrementais: TenantModel.apply_changes, impressão digital
+aditiva, PATCH /tenants/{tenant_id}/phrases e o retreino completo após
+INCREMENTAL_REFIT_RATIO.
+"""
+import random
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from app import config
+from app.main import app
+from app.model import ModelManager
+from app.model_store import ModelStore, rebase_fingerprint, training_fingerprint, update_fingerprint
+from app.tenant_manager import TenantManager
+from app.tenant_model import TenantModel
+from app.tenant_storage import MemoryTenantStorage, SQLiteTenantStorage
+from benchmarks.corpus import generate_corpus, generate_messages
+
+ENGINES = ["tfidf", "hashing"]
+TOLERANCE = 1e-5
+
+
+def probabilities(model, messages):
+    return np.array([model.scorer.predict_proba(message) for message in messages])
+
+
+@pytest.fixture(scope="module")
+def corpus():
+    return generate_corpus(200, 4, 400, seed=21)
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_add_then_remove_restores_probabilities(corpus, engine):
+    phrases, labels = corpus
+    model = TenantModel("t", "portuguese", phrases, labels, engine=engine)
+    added = [(phrase, labels[index]) for index, phrase in enumerate(phrases[:20])] + [
+        ("mensagem de uma classe nova", "nova"),
+    ]
+    messages = generate_messages(30, 400, seed=5)
+
+    restored = model.apply_changes(added, [], 1).apply_changes([], added, 2)
+
+    assert list(restored.scorer.classes) == list(model.scorer.classes)
+    np.testing.assert_allclose(probabilities(restored, messages), probabilities(model, messages), atol=TOLERANCE)
+    # O modelo original não é alterado
+    assert model.version == 0 and model.incremental_rows == 0
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_class_without_phrases_is_dropped(corpus, engine):
+    phrases, labels = corpus
+    phrases = list(phrases) + ["primeira frase rara", "segunda frase rara"]
+    labels = list(labels) + ["rara", "rara"]
+    model = TenantModel("t", "portuguese", phrases, labels, engine=engine)
+    assert "rara" in model.scorer.classes
+
+    updated = model.apply_changes([], [(phrases[-2], "rara"), (phrases[-1], "rara")], 1)
+
+    assert "rara" not in updated.scorer.classes
+    assert len(updated.scorer.classes) == len(model.scorer.classes) - 1
+    if engine == "hashing":
+        # Sem vocabulário nem IDF, o resultado é o de um treino do zero
+        fresh = TenantModel("t", "portuguese", phrases[:-2], labels[:-2], engine=engine)
+        messages = generate_messages(30, 400, seed=6)
+        np.testing.assert_allclose(probabilities(updated, messages), probabilities(fresh, messages), atol=TOLERANCE)
+
+
+def test_removing_every_phrase_is_rejected(corpus):
+    phrases, labels = corpus
+    model = TenantModel("t", "portuguese", phrases[:4], labels[:4])
+    with pytest.raises(ValueError):
+        model.apply_changes([], list(zip(phrases[:4], labels[:4])), 1)
+
+
+def test_update_fingerprint_matches_full_recompute(corpus):
+    phrases, labels = corpus
+    pairs = list(zip(phrases, labels))
+    # Remove pares (inclusive uma das cópias de um par repetido) e adiciona outros
+    pairs.append(pairs[0])
+    removed = [pairs[0], pairs[5], pairs[17]]
+    added = [("frase adicionada", "nova"), pairs[3], ("outra frase", labels[1])]
+    remaining = list(pairs)
+    for pair in removed:
+        remaining.remove(pair)
+    result = remaining + added
+    random.Random(3).shuffle(result)
+
+    before = training_fingerprint("portuguese", [p for p, _ in pairs], [l for _, l in pairs], "tfidf")
+    after = training_fingerprint("portuguese", [p for p, _ in result], [l for _, l in result], "tfidf")
+
+    assert update_fingerprint(before, added, removed) == after
+    assert update_fingerprint(after, removed, added) == before
+    assert update_fingerprint(before) == before
+
+
+def test_rebase_fingerprint_matches_full_recompute(corpus):
+    phrases, labels = corpus
+    fingerprint = training_fingerprint("portuguese", phrases, labels, "tfidf")
+    for language, engine in (("english", "tfidf"), ("portuguese", "hashing"), ("Spanish", "hashing")):
+        expected = training_fingerprint(language, phrases, labels, engine)
+        assert rebase_fingerprint(fingerprint, "portuguese", "tfidf", language, engine) == expected
+        assert rebase_fingerprint(expected, language, engine, "portuguese", "tfidf") == fingerprint
+
+
+def test_previous_fingerprint_format_requires_recompute():
+    legacy = "0" * 64
+    assert update_fingerprint(legacy, [("a", "b")]) is None
+    assert rebase_fingerprint(legacy, "portuguese", "tfidf", "english", "tfidf") is None
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def manager(request, tmp_path):
+    if request.param == "memory":
+        return TenantManager(MemoryTenantStorage())
+    return TenantManager(SQLiteTenantStorage(str(tmp_path / "tenants.db")))
+
+
+def test_removing_missing_pair_changes_nothing(manager, corpus):
+    phrases, labels = corpus
+    tenant = manager.create_tenant("t", "portuguese", phrases[:50], labels[:50])
+
+    with pytest.raises(ValueError, match="não encontrada"):
+        manager.modify_phrases("t", add=[("nova", "x")], remove=[(phrases[0], labels[0]), ("inexistente", "x")])
+
+    current = manager.get_tenant("t")
+    assert current.version == tenant.version
+    assert current.phrase_count == 50
+    assert current.fingerprint == tenant.fingerprint
+    assert dict(current.label_counts) == dict(tenant.label_counts)
+    current_phrases, current_labels = current.training_data()
+    assert list(current_phrases) == list(phrases[:50])
+    assert list(current_labels) == list(labels[:50])
+
+
+def test_patch_missing_pair_returns_400():
+    tenant_id = "incremental-test"
+    with TestClient(app) as client:
+        created = client.post("/tenants", json={
+            "tenant_id": tenant_id,
+            "phrases": ["qual o preço", "quero cancelar"],
+            "labels": ["pergunta", "cancelamento"],
+        })
+        assert created.status_code == 201
+        try:
+            response = client.patch(f"/tenants/{tenant_id}/phrases", json={
+                "add": [{"phrase": "nova frase", "label": "pergunta"}],
+                "remove": [{"phrase": "não existe", "label": "pergunta"}],
+            })
+            assert response.status_code == 400
+
+            current = client.get(f"/tenants/{tenant_id}").json()
+            assert current["phrases"] == created.json()["phrases"]
+            assert current["labels"] == created.json()["labels"]
+            assert current["updated_at"] == created.json()["updated_at"]
+        finally:
+            client.delete(f"/tenants/{tenant_id}")
+
+
+class CountingModelManager(ModelManager):
+    """ModelManager que conta os treinos completos"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fits = 0
+
+    def _train(self, tenant):
+        self.fits += 1
+        return super()._train(tenant)
+
+
+def wait_for_training(models, tenant_id):
+    state = models.get_training_state(tenant_id)
+    if state is not None and state.future is not None:
+        state.future.result()
+
+
+def test_refit_after_incremental_ratio(corpus, monkeypatch):
+    monkeypatch.setattr(config, "INCREMENTAL_REFIT_RATIO", 0.2)
+    phrases, labels = corpus
+    tenants = TenantManager(MemoryTenantStorage())
+    models = CountingModelManager(store=ModelStore(None))
+    tenant = tenants.create_tenant("t", "portuguese", phrases[:50], labels[:50])
+    models.get_or_create_model(tenant)
+    assert models.fits == 1
+
+    # 5 de 55 phrases: abaixo do limite, atualização incremental
+    extra = list(zip(phrases[50:], labels[50:]))
+    tenant = tenants.modify_phrases("t", add=extra[:5])
+    models.schedule_training(tenant)
+    wait_for_training(models, "t")
+    model = models.get_model("t")
+    assert models.fits == 1
+    assert model.version == tenant.version and model.incremental_rows == 5
+
+    # Mais 10 (15 de 65): passa do limite, retreino completo
+    tenant = tenants.modify_phrases("t", add=extra[5:15])
+    models.schedule_training(tenant)
+    wait_for_training(models, "t")
+    model = models.get_model("t")
+    assert models.fits == 2
+    assert model.version == tenant.version and model.incremental_rows == 0
@@ -0,0 +1,118 @@
+"""
+Layout do ModelStore em disco: IDs de tenant arbitrários nunca podem
+apontar para fora do diretório do tenant. Também cobre o warm start, que
+respeita os limites de modelos residentes.
+"""
+import os
+import shutil
+
+import numpy as np
+import pytest
+
+from app.model import ModelManager
+from app.model_store import ModelStore
+from app.tenant_manager import TenantManager
+from app.tenant_storage import MemoryTenantStorage
+
+FINGERPRINT = "0" * 32
+OTHER = "1" * 32
+
+
+def arrays(value: float):
+    return {"feature_log_prob": np.full((2, 3), value, dtype=np.float32)}
+
+
+@pytest.fixture
+def store(tmp_path):
+    sibling = tmp_path / "sibling"
+    sibling.mkdir()
+    (sibling / "data.txt").write_text("não apagar")
+    store = ModelStore(str(tmp_path / "store"))
+    store.save("outro", FINGERPRINT, "portuguese", arrays(7.0))
+    return store
+
+
+def assert_untouched(store):
+    root = os.path.dirname(store.root)
+    assert os.path.isdir(store.root)
+    assert open(os.path.join(root, "sibling", "data.txt")).read() == "não apagar"
+    other = store.load("outro", FINGERPRINT)
+    assert other is not None and float(other["arrays"]["feature_log_prob"][0, 0]) == 7.0
+
+
+@pytest.mark.parametrize("tenant_id", ["", ".", "..", "a/b", "../sibling", "t-" + "0" * 32])
+def test_unusual_tenant_ids_stay_inside_their_directory(store, tenant_id):
+    store.save(tenant_id, FINGERPRINT, "portuguese", arrays(1.0))
+    # Um segundo artefato remove o anterior do mesmo tenant
+    store.save(tenant_id, OTHER, "portuguese", arrays(2.0))
+    assert_untouched(store)
+    assert store.load(tenant_id, FINGERPRINT) is None
+    assert float(store.load(tenant_id, OTHER)["arrays"]["feature_log_prob"][0, 0]) == 2.0
+
+    with store.training_lock(tenant_id):
+        pass
+    store.remove(tenant_id)
+    assert store.load(tenant_id, OTHER) is None
+    assert_untouched(store)
+
+
+def test_invalid_fingerprint_is_rejected(store):
+    for fingerprint in ("", ".", "..", "../outro"):
+        store.save("t", fingerprint, "portuguese", arrays(1.0))
+        assert store.load("t", fingerprint) is None
+    assert_untouched(store)
+
+
+def test_previous_layout_is_loaded_and_removed(store, tmp_path):
+    # Monta o layout anterior: diretório com o tenant_id codificado
+    scratch = ModelStore(str(tmp_path / "scratch"))
+    scratch.save("tenant antigo", FINGERPRINT, "portuguese", arrays(3.0))
+    legacy = os.path.join(store.root, "tenant%20antigo")
+    shutil.copytree(scratch._tenant_dir("tenant antigo"), legacy)
+
+    loaded = store.load("tenant antigo", FINGERPRINT)
+    assert float(loaded["arrays"]["feature_log_prob"][0, 0]) == 3.0
+
+    store.remove("tenant antigo")
+    assert not os.path.exists(legacy)
+    assert_untouched(store)
+
+
+@pytest.fixture
+def saved_tenants(tmp_path):
+    """Quatro tenants com o modelo já salvo no armazenamento em disco"""
+    tenants = TenantManager(MemoryTenantStorage())
+    store = ModelStore(str(tmp_path / "models"))
+    trainer = ModelManager(store=store)
+    for index in range(4):
+        tenant = tenants.create_tenant(
+            f"t{index}", "english", ["hello there", "buy cheap pills", f"word{index} again"], ["g", "s", "g"]
+        )
+        trainer.get_or_create_model(tenant)
+    return tenants, store
+
+
+def test_warm_start_stops_at_max_resident_models(saved_tenants):
+    tenants, store = saved_tenants
+    models = ModelManager(store=store, max_resident_models=2)
+
+    assert models.warm_start(tenants.list_tenants()) == 2
+    assert models.stats()["resident_models"] == 2
+    assert models.stats()["evictions"] == 0
+
+    # Os tenants não carregados vêm do disco na primeira requisição, sem contar como recarga
+    pending = [f"t{index}" for index in range(4) if models.get_model(f"t{index}") is None]
+    assert len(pending) == 2
+    for tenant_id in pending:
+        models.classify_message(tenants.get_tenant(tenant_id), "hello")
+    assert models.stats()["reloads"] == 0
+
+
+def test_warm_start_stops_at_memory_budget(saved_tenants):
+    tenants, store = saved_tenants
+    size = ModelManager(store=store).get_or_create_model(tenants.get_tenant("t0")).memory_bytes()
+    models = ModelManager(store=store, memory_budget_bytes=int(size * 2.5))
+
+    assert models.warm_start(tenants.list_tenants()) == 2
+    assert models.stats()["evictions"] == 0
+    assert models.stats()["estimated_memory_bytes"] <= size * 2.5
@@ -0,0 +1,100 @@
+"""
+Equivalência entre o pontuador compilado (CompiledScorer) e o caminho
+original do scikit-learn (TfidfVectorizer.transform + predict_proba).
+"""
+import numpy as np
+import pytest
+
+from app.tenant_model import TenantModel
+from app.tenant_manager import tenant_manager
+from benchmarks.corpus import generate_corpus, generate_messages
+from benchmarks.scoring import TOLERANCE, sklearn_classify, sklearn_reference
+
+ENGLISH = (
+    [
+        "What is the price of the product?", "How much does shipping cost?",
+        "Do you accept credit cards?", "My order has not arrived yet",
+        "The website keeps crashing", "I cannot log into my account",
+        "Great service, thank you!", "I love this product",
+    ],
+    ["question", "question", "question", "problem", "problem", "problem", "praise", "praise"],
+)
+
+SPANISH = (
+    [
+        "¿Cuál es el precio del producto?", "¿Cuánto cuesta el envío?",
+        "Mi pedido no ha llegado", "La página no carga",
+        "Quiero cancelar mi suscripción", "Necesito cancelar el pedido",
+    ],
+    ["pregunta", "pregunta", "problema", "problema", "cancelación", "cancelación"],
+)
+
+
+def default_corpus():
+    phrases, labels = tenant_manager.get_tenant("default").training_data()
+    return list(phrases), list(labels)
+
+
+TENANTS = {
+    "portuguese-default": lambda: ("portuguese", *default_corpus()),
+    "english": lambda: ("english", *ENGLISH),
+    "spanish": lambda: ("spanish", *SPANISH),
+    "synthetic": lambda: ("portuguese", *generate_corpus(300, 5, 500, seed=7)),
+}
+
+
+@pytest.fixture(params=sorted(TENANTS), scope="module")
+def trained(request):
+    language, phrases, labels = TENANTS[request.param]()
+    model = TenantModel(request.param, language, phrases, labels)
+    reference = sklearn_reference(language, phrases, labels)
+    messages = list(phrases) + generate_messages(20, 500) + [
+        "Olá, qual é o prazo de entrega para São Paulo?",
+        "mensagem sem nenhuma palavra conhecida xyzzy",
+        "",
+    ]
+    return model, reference, messages
+
+
+def test_same_classes_as_sklearn(trained):
+    model, reference, messages = trained
+    for message in messages:
+        assert model.classify(message)[0] == sklearn_classify(reference, message)[0], message
+
+
+def test_probabilities_close_to_sklearn(trained):
+    model, (vectorizer, nb), messages = trained
+    expected = nb.predict_proba(vectorizer.transform(messages))
+    
+    single = np.vstack([model.scorer.predict_proba(message) for message in messages])
+    batch = model.scorer.predict_proba_matrix(model.scorer.transform(messages))
+    
+    assert list(model.scorer.classes) == list(nb.classes_)
+    np.testing.assert_allclose(single, expected, atol=TOLERANCE)
+    np.testing.assert_allclose(batch, expected, atol=TOLERANCE)
+
+
+def test_batch_matches_single(trained):
+    model, _, messages = trained
+    batch = model.classify_batch(messages)
+    for message, (classification, probability) in zip(messages, batch):
+        expected_class, expected_probability = model.scorer.top_k(message, 1)[0]
+        assert classification == expected_class
+        assert probability == pytest.approx(expected_probability, abs=1e-9)
+
+
+@pytest.mark.parametrize("message", ["", "xyzzy plugh", "price broken"])
+def test_tie_break_picks_first_class(message):
+    # Classes empatadas (mesmas phrases e mesmo prior): vence a primeira em ordem, como no max() original
+    phrases = ["price cost", "price cost", "broken error", "broken error"]
+    labels = ["zeta", "alfa", "zeta", "alfa"]
+    model = TenantModel("tie", "english", phrases, labels)
+    reference = sklearn_reference("english", phrases, labels)
+    
+    expected_class, expected_probability = sklearn_classify(reference, message)
+    classification, probability = model.classify(message)
+    
+    assert classification == expected_class == "alfa"
+    assert probability == pytest.approx(expected_probability, abs=TOLERANCE)
+    assert model.classify_batch([message])[0][0] == "alfa"
+    assert model.classify_top_k(message, 2)[0][0] == "alfa"
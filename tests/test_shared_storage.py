@@ -0,0 +1,72 @@
+"""
+Vários workers sobre o mesmo banco SQLite: um snapshot defasado em um
+worker não pode travar o treino nem as escritas do tenant, e as consultas
+de versão não esperam pelas escritas.
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.model import ModelManager
+from app.model_store import ModelStore
+from app.tenant_manager import TenantManager
+from app.tenant_storage import SQLiteTenantStorage
+from benchmarks.corpus import generate_corpus
+
+
+@pytest.fixture
+def workers(tmp_path):
+    """Dois TenantManager (um por "worker") sobre o mesmo banco"""
+    path = str(tmp_path / "tenants.db")
+    first = TenantManager(SQLiteTenantStorage(path))
+    second = TenantManager(SQLiteTenantStorage(path))
+    phrases, labels = generate_corpus(60, 3, 200, seed=5)
+    first.create_tenant("shared", "portuguese", phrases, labels)
+    return first, second
+
+
+def test_stale_snapshot_trains_the_stored_version(workers):
+    first, second = workers
+    stale = first.get_tenant("shared")
+    updated = second.modify_phrases("shared", add=[("frase nova do outro worker", "extra")])
+
+    model = ModelManager(store=ModelStore(None)).get_or_create_model(stale)
+
+    assert model.version == updated.version
+    assert "extra" in model.scorer.classes
+    # O snapshot gravado passa a ser o publicado no primeiro worker
+    assert first._tenants["shared"].version == updated.version
+
+
+def test_write_over_stale_snapshot_is_retried(workers, monkeypatch):
+    first, second = workers
+    first.get_tenant("shared")
+    second.modify_phrases("shared", add=[("frase do segundo worker", "extra")])
+    # Simula a escrita do outro worker entre a conferência de versão e a gravação
+    stale_version = first._tenants["shared"].version
+    monkeypatch.setattr(first._storage, "load_version", lambda tenant_id: stale_version)
+
+    updated = first.modify_phrases("shared", add=[("frase do primeiro worker", "extra")])
+
+    phrases, labels = updated.training_data()
+    assert updated.phrase_count == len(phrases) == 62
+    assert updated.label_counts["extra"] == labels.count("extra") == 2
+    assert second.get_tenant("shared").version == updated.version
+
+
+def test_lookups_do_not_wait_for_the_write_lock(workers):
+    first, second = workers
+    version = first.get_tenant("shared").version
+    storage = first._storage
+    updated = second.modify_phrases("shared", add=[("frase nova do outro worker", "extra")])
+
+    # Com o lock de escrita ocupado, as leituras de outras threads seguem
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        with storage._lock:
+            lookups = [pool.submit(first.get_tenant, "shared") for _ in range(8)]
+            results = [lookup.result(timeout=5) for lookup in lookups]
+
+    assert {tenant.version for tenant in results} == {updated.version}
+    assert updated.version != version
+    phrases, _ = results[0].training_data()
+    assert len(phrases) == 61
@@ -0,0 +1,60 @@
+"""
+Streaming NDJSON de /classify/stream.
+"""
+import asyncio
+import json
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+
+
+def test_stream_classifies_lines_in_order():
+    body = "\n".join([
+        json.dumps({"message": "Quero cancelar minha assinatura"}),
+        "não é json",
+        json.dumps({"message": "Qual o preço?", "tenant_id": "inexistente"}),
+    ])
+    with TestClient(app) as client:
+        response = client.post("/classify/stream", content=body)
+    
+    assert response.status_code == 200
+    results = [json.loads(line) for line in response.text.splitlines()]
+    assert len(results) == 3
+    assert results[0]["tenant_id"] == "default" and "classification" in results[0]
+    assert results[1]["line"] == 2 and "error" in results[1]
+    assert results[2]["tenant_id"] == "inexistente" and "error" in results[2]
+
+
+def test_client_disconnect_mid_body_ends_stream_cleanly():
+    # O cliente envia uma parte do corpo e aborta o envio
+    events = [
+        {"type": "http.request", "body": json.dumps({"message": "Qual o preço?"}).encode() + b"\n", "more_body": True},
+        {"type": "http.disconnect"},
+    ]
+    sent = []
+    
+    async def receive():
+        return events.pop(0) if events else {"type": "http.disconnect"}
+    
+    async def send(message):
+        sent.append(message)
+    
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0", "spec_version": "2.4"},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": "/classify/stream",
+        "raw_path": b"/classify/stream",
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(b"content-type", b"application/x-ndjson")],
+        "client": ("test", 1),
+        "server": ("test", 80),
+    }
+    asyncio.run(app(scope, receive, send))
+    
+    assert sent[0]["type"] == "http.response.start" and sent[0]["status"] == 200
+    assert sent[-1]["type"] == "http.response.body" and not sent[-1].get("more_body", False)